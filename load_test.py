@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Load generator for the TimeSaver API.
+
+Simulates many devices sending a weighted mix of analyze, start/progress,
+history, search and bookmark requests. Arrivals are open-loop: requests are
+scheduled as a Poisson process at the target rate whether or not earlier
+ones have finished, and latency is measured from the scheduled time, so a
+slow server shows up as latency instead of a lower request rate. Reports
+p50/p95/p99 latency, throughput and the 429 rate per endpoint.
+
+Run the server against local stand-ins for YouTube and Gemini first:
+
+    cd timesaver_backend
+    TIMESAVER_PROVIDER_STUBS=1 python manage.py runserver --noreload
+
+    python load_test.py --rps 50 --duration 60 --devices 2000
+
+For a quick check of the analyze rate limit alone, see test_rate_limiting.py.
+"""
+import argparse
+import bisect
+import collections
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = "http://127.0.0.1:8000/api"
+
+DEFAULT_MIX = "analyze=5,start=2,progress=6,history=35,search=25,bookmark=12,bookmarks=15"
+
+# Words the server's provider stand-ins put into highlights
+SEARCH_TERMS = ['python', 'django', 'database', 'caching', 'latency', 'security', 'testing', 'design', 'nothingmatches']
+
+# A request that starts this late has waited for a free client worker
+LATE_START_SECONDS = 0.1
+
+
+class Stats:
+    """Latencies and outcomes per endpoint label (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.outcomes = collections.defaultdict(collections.Counter)
+        self.late_starts = 0
+
+    def record(self, label, latency, outcome):
+        with self._lock:
+            self.latencies[label].append(latency)
+            self.outcomes[label][outcome] += 1
+
+    def late(self):
+        with self._lock:
+            self.late_starts += 1
+
+
+def _outcome(status_code):
+    if status_code == 429:
+        return '429'
+    return f"{status_code // 100}xx"
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LoadTest:
+    """Shared state of one run: devices, what they own, and open jobs."""
+
+    def __init__(self, base_url, devices, videos, timeout, seed):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        rng = random.Random(seed)
+        self.devices = [f"loadtest-{rng.getrandbits(64):016x}-{index:06d}" for index in range(devices)]
+        # 11-character ids like YouTube's; fewer videos means more shared cache hits
+        self.video_ids = [f"lt{index:09d}" for index in range(videos)]
+        self._lock = threading.Lock()
+        self.analyses = collections.defaultdict(list)  # device -> analysis ids it owns
+        self.jobs = collections.deque(maxlen=1000)
+        self._local = threading.local()
+        self.stats = Stats()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _request(self, method, path, device, **kwargs):
+        headers = {'X-Device-ID': device}
+        return self._session().request(method, self.base_url + path, headers=headers, timeout=self.timeout, **kwargs)
+
+    # --- Actions: each makes one request and returns (label, response) ---
+
+    def analyze(self, device, rng):
+        url = f"https://www.youtube.com/watch?v={rng.choice(self.video_ids)}"
+        response = self._request('POST', '/analyze/', device, json={'url': url})
+        if response.status_code == 200:
+            analysis_id = response.json().get('id')
+            if analysis_id:
+                with self._lock:
+                    self.analyses[device].append(analysis_id)
+        return 'analyze', response
+
+    def start(self, device, rng):
+        url = f"https://www.youtube.com/watch?v={rng.choice(self.video_ids)}"
+        response = self._request('POST', '/start/', device, json={'url': url})
+        if response.status_code == 200:
+            self.jobs.append(response.json().get('job_id'))
+        return 'start', response
+
+    def progress(self, device, rng):
+        try:
+            job_id = rng.choice(self.jobs)
+        except IndexError:
+            return self.start(device, rng)
+        return 'progress', self._request('GET', f'/progress/{job_id}/', device)
+
+    def history(self, device, rng):
+        return 'history', self._request('GET', '/history/', device, params={'limit': 20})
+
+    def search(self, device, rng):
+        return 'search', self._request('GET', '/search/', device, params={'q': rng.choice(SEARCH_TERMS)})
+
+    def bookmark(self, device, rng):
+        with self._lock:
+            owned = self.analyses.get(device)
+            analysis_id = rng.choice(owned) if owned else None
+        if analysis_id is None:
+            return self.bookmarks(device, rng)
+        return 'bookmark', self._request('POST', '/bookmark/', device, json={'analysis_id': analysis_id})
+
+    def bookmarks(self, device, rng):
+        return 'bookmarks', self._request('GET', '/bookmarks/', device)
+
+    ACTIONS = ('analyze', 'start', 'progress', 'history', 'search', 'bookmark', 'bookmarks')
+
+    def fire(self, action, device, scheduled_at, seed):
+        started_at = time.perf_counter()
+        if started_at - scheduled_at > LATE_START_SECONDS:
+            self.stats.late()
+        label = action
+        try:
+            label, response = getattr(self, action)(device, random.Random(seed))
+            outcome = _outcome(response.status_code)
+        except requests.RequestException as e:
+            outcome = f"error:{type(e).__name__}"
+        self.stats.record(label, time.perf_counter() - scheduled_at, outcome)
+
+
+def parse_mix(text):
+    """'analyze=5,history=40' -> ([actions], [cumulative weights])."""
+    actions, cumulative, total = [], [], 0.0
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in LoadTest.ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (choose from {', '.join(LoadTest.ACTIONS)})")
+        try:
+            weight = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight for {name!r}")
+        if weight > 0:
+            total += weight
+            actions.append(name)
+            cumulative.append(total)
+    if not actions:
+        raise argparse.ArgumentTypeError("mix has no positive weights")
+    return actions, cumulative
+
+
+def run(test, mix, rps, duration, workers, seed):
+    """Schedule Poisson arrivals at rps for duration seconds. Returns the elapsed seconds."""
+    actions, cumulative = mix
+    rng = random.Random(seed)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='load')
+    started = time.perf_counter()
+    scheduled_at = started
+    try:
+        while True:
+            scheduled_at += rng.expovariate(rps)
+            if scheduled_at - started >= duration:
+                break
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            action = actions[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+            executor.submit(test.fire, action, rng.choice(test.devices), scheduled_at, rng.getrandbits(32))
+    except KeyboardInterrupt:
+        print("Interrupted; waiting for requests in flight...")
+        executor.shutdown(wait=True, cancel_futures=True)
+        return time.perf_counter() - started
+    executor.shutdown(wait=True)
+    return time.perf_counter() - started
+
+
+def report(stats, elapsed):
+    """Per-endpoint summary rows, plus a TOTAL row."""
+    rows = []
+    labels = sorted(stats.latencies)
+    all_latencies = []
+    all_outcomes = collections.Counter()
+    for label in labels + ['TOTAL']:
+        if label == 'TOTAL':
+            latencies, outcomes = sorted(all_latencies), all_outcomes
+        else:
+            latencies, outcomes = sorted(stats.latencies[label]), stats.outcomes[label]
+            all_latencies.extend(latencies)
+            all_outcomes.update(outcomes)
+        count = len(latencies)
+        errors = sum(value for key, value in outcomes.items() if key.startswith('error'))
+        rows.append({
+            'endpoint': label,
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round((latencies[-1] if latencies else 0.0) * 1000, 1),
+            '2xx': outcomes['2xx'],
+            '429': outcomes['429'],
+            '4xx': outcomes['4xx'],
+            '5xx': outcomes['5xx'],
+            'errors': errors,
+            'rate_limited_pct': round(100 * outcomes['429'] / count, 2) if count else 0.0,
+        })
+    return rows
+
+
+def print_report(rows, elapsed, late_starts):
+    columns = ['endpoint', 'requests', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+               '2xx', '429', '4xx', '5xx', 'errors', 'rate_limited_pct']
+    headers = ['endpoint', 'reqs', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', '2xx', '429', '4xx', '5xx', 'err', '429 %']
+    print(f"\n{elapsed:.1f}s elapsed")
+    print(f"{headers[0]:<10}" + "".join(f"{header:>9}" for header in headers[1:]))
+    for row in rows:
+        print(f"{row['endpoint']:<10}" + "".join(f"{row[column]:>9}" for column in columns[1:]))
+    if late_starts:
+        print(f"\n{late_starts} requests started over {LATE_START_SECONDS * 1000:.0f} ms late: "
+              "the client ran out of workers (raise --workers); their wait is included in latency")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default=BASE_URL, help=f'API root (default {BASE_URL})')
+    parser.add_argument('--rps', type=float, default=20.0, help='Target requests per second (default 20)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to generate load (default 30)')
+    parser.add_argument('--devices', type=int, default=2000, help='Simulated devices (default 2000)')
+    parser.add_argument('--videos', type=int, default=500, help='Distinct videos analyzed (default 500)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'Action weights (default {DEFAULT_MIX})')
+    parser.add_argument('--workers', type=int, default=256, help='Max requests in flight (default 256)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds (default 30)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed, for repeatable runs (default 1)')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    test = LoadTest(args.base_url, args.devices, args.videos, args.timeout, args.seed)
+    print(f"Load testing {test.base_url}: {args.rps} req/s for {args.duration}s across {args.devices} devices")
+    elapsed = run(test, args.mix, args.rps, args.duration, args.workers, args.seed)
+    rows = report(test.stats, elapsed)
+    print_report(rows, elapsed, test.stats.late_starts)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({
+                'config': {key: value for key, value in vars(args).items() if key not in ('mix', 'json_path')},
+                'elapsed_seconds': round(elapsed, 3),
+                'late_starts': test.stats.late_starts,
+                'results': rows,
+            }, f, indent=2)
+        print(f"Wrote results to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,69 @@
 # analysis_api/analysis_core.py
 
+import copy
 import os
 import re
 import json
+import logging
 import requests
 from youtube_transcript_api import YouTubeTranscriptApi
 from pytube import YouTube
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from . import metrics
+from . import quota
+from . import timestamp_index
+from . import log_events as events
+from .log_events import log_event
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
 # --- Configuration ---
+GEMINI_MODEL = 'gemini-2.5-flash'
+# Bump when _build_agent_prompt changes, so results of the old prompt
+# stop being shared with devices that analyze the same video
+PROMPT_VERSION = '1'
+
+# Stand-ins used when the metadata, transcript or Gemini call is
+# unavailable; results containing them are not real analyses
+PLACEHOLDER_TITLE = 'Sample Video Title'
+PLACEHOLDER_TRANSCRIPT = "This is a sample video transcript for demonstration purposes. The video contains educational content about technology and programming."
+FALLBACK_HIGHLIGHTS = [
+    {
+        "agent": "The Teacher",
+        "timestamp": "01:30",
+        "title": "Key Learning Concept",
+        "description": "This section contains important educational content that viewers should focus on."
+    },
+    {
+        "agent": "The Analyst", 
+        "timestamp": "03:45",
+        "title": "Important Metric",
+        "description": "A significant data point or statistic is presented here that supports the video's main argument."
+    },
+    {
+        "agent": "The Explorer",
+        "timestamp": "05:20", 
+        "title": "Next Steps",
+        "description": "The video provides actionable advice or resources for viewers to explore further."
+    }
+]
+
+
+def unusable_reason(title, transcript, highlights):
+    """Why a result built on stand-in data must not be shared, or None for a real analysis."""
+    if transcript == PLACEHOLDER_TRANSCRIPT:
+        return "No transcript available"
+    if highlights == FALLBACK_HIGHLIGHTS:
+        return "Gemini call failed"
+    if title == PLACEHOLDER_TITLE:
+        return "No video metadata available"
+    return None
+
 # Initialize the Gemini Client
 try:
     # Make sure the API key is available
@@ -24,12 +75,12 @@ try:
     genai.configure(api_key=api_key)
     
     # Test the connection
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    print(f"Gemini client initialized successfully with model: gemini-2.5-flash")
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    log_event(logger, events.GEMINI_INITIALIZED, model=GEMINI_MODEL)
     client_initialized = True
     
 except Exception as e:
-    print(f"Error initializing Gemini client: {e}")
+    log_event(logger, events.GEMINI_INIT_FAILED, level=logging.ERROR, error=e)
     model = None
     client_initialized = False
 
@@ -47,7 +98,9 @@ def get_youtube_metadata_fallback(video_id: str) -> dict:
     try:
         # YouTube oEmbed API is more reliable
         oembed_url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-        response = requests.get(oembed_url, timeout=10)
+        with metrics.stage_timer('oembed'):
+            quota.record_fetch()
+            response = requests.get(oembed_url, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -57,7 +110,9 @@ def get_youtube_metadata_fallback(video_id: str) -> dict:
             try:
                 # Use YouTube Data API v3 approach by scraping page
                 video_url = f"https://www.youtube.com/watch?v={video_id}"
-                page_response = requests.get(video_url, timeout=10)
+                with metrics.stage_timer('watch_page'):
+                    quota.record_fetch()
+                    page_response = requests.get(video_url, timeout=10)
                 if page_response.status_code == 200:
                     # Look for duration in the page content
                     duration_match = re.search(r'"lengthSeconds":"(\d+)"', page_response.text)
@@ -72,6 +127,8 @@ def get_youtube_metadata_fallback(video_id: str) -> dict:
                     duration = "10:30"  # Default fallback
             except:
                 duration = "10:30"  # Default fallback
+            if duration == "10:30":
+                metrics.inc(metrics.FALLBACKS, kind='default_duration')
             
             # Generate thumbnail URL with fallback strategy
             # Try maxresdefault first, but most videos have hqdefault
@@ -83,15 +140,29 @@ def get_youtube_metadata_fallback(video_id: str) -> dict:
                 'thumbnail_url': thumbnail_url,
             }
     except Exception as e:
-        print(f"oEmbed fallback failed: {e}")
+        log_event(logger, events.METADATA_FALLBACK, level=logging.WARNING, source='oembed', video_id=video_id, error=e)
     
     # Ultimate fallback
+    metrics.inc(metrics.FALLBACKS, kind='placeholder_metadata')
     return {
-        'title': 'Sample Video Title',
+        'title': PLACEHOLDER_TITLE,
         'duration': '10:30',
         'thumbnail_url': f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
     }
 
+def _format_transcript(snippets) -> str:
+    """Joins caption snippets into one text, each prefixed with its [MM:SS] start time."""
+    # Include timestamps in the transcript text for better analysis
+    transcript_entries = []
+    for snippet in snippets:
+        # Convert seconds to MM:SS format
+        start_time = snippet.start
+        minutes = int(start_time // 60)
+        seconds = int(start_time % 60)
+        timestamp = f"{minutes:02d}:{seconds:02d}"
+        transcript_entries.append(f"[{timestamp}] {snippet.text}")
+    return " ".join(transcript_entries)
+
 def get_transcript_and_metadata(video_id: str) -> dict:
     """Fetches transcript, title, and duration.""" 
     # Try multiple methods to get metadata
@@ -99,22 +170,26 @@ def get_transcript_and_metadata(video_id: str) -> dict:
     
     # Method 1: Try pytube (original)
     try:
-        yt = YouTube(f'https://www.youtube.com/watch?v={video_id}')
-        metadata = {
-            'title': yt.title or "Sample Video Title",
-            'duration': f"{int(yt.length // 60)}:{int(yt.length % 60):02d}" if yt.length else "10:30",
-            'thumbnail_url': yt.thumbnail_url or f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
-        }
-        print(f"Successfully fetched YouTube metadata with pytube: {metadata['title']}")
+        with metrics.stage_timer('pytube'):
+            quota.record_fetch()
+            yt = YouTube(f'https://www.youtube.com/watch?v={video_id}')
+            metadata = {
+                'title': yt.title or PLACEHOLDER_TITLE,
+                'duration': f"{int(yt.length // 60)}:{int(yt.length % 60):02d}" if yt.length else "10:30",
+                'thumbnail_url': yt.thumbnail_url or f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+            }
+        log_event(logger, events.METADATA_FETCHED, source='pytube', video_id=video_id)
     except Exception as yt_error:
-        print(f"Pytube failed: {yt_error}")
+        log_event(logger, events.METADATA_FALLBACK, source='pytube', video_id=video_id, error=yt_error)
         
         # Method 2: Try oEmbed API fallback
+        metrics.inc(metrics.FALLBACKS, kind='oembed_metadata')
         metadata = get_youtube_metadata_fallback(video_id)
-        print(f"Using oEmbed fallback metadata: {metadata['title']}")
+        log_event(logger, events.METADATA_FETCHED, source='oembed', video_id=video_id)
     
     # Try to get transcript
-    transcript_text = "This is a sample video transcript for demonstration purposes. The video contains educational content about technology and programming."
+    transcript_text = PLACEHOLDER_TRANSCRIPT
+    segments = []  # (start seconds, text) of each caption, for snapping highlights
     try:
         api = YouTubeTranscriptApi()
         # Try multiple approaches - auto-generated captions should work
@@ -126,46 +201,47 @@ def get_transcript_and_metadata(video_id: str) -> dict:
         
         for languages in language_attempts:
             try:
-                transcript_obj = api.fetch(video_id, languages=languages)
+                with metrics.stage_timer('transcript_probe'):
+                    quota.record_fetch()
+                    transcript_obj = api.fetch(video_id, languages=languages)
                 transcript_list = transcript_obj.snippets
-                # Include timestamps in the transcript text for better analysis
-                transcript_entries = []
-                for snippet in transcript_list:
-                    # Convert seconds to MM:SS format
-                    start_time = snippet.start
-                    minutes = int(start_time // 60)
-                    seconds = int(start_time % 60)
-                    timestamp = f"{minutes:02d}:{seconds:02d}"
-                    transcript_entries.append(f"[{timestamp}] {snippet.text}")
-                
-                transcript_text = " ".join(transcript_entries)
-                print(f"Successfully fetched transcript with timestamps for languages: {languages}")
+                transcript_text = _format_transcript(transcript_list)
+                segments = [(snippet.start, snippet.text) for snippet in transcript_list]
+                log_event(logger, events.TRANSCRIPT_FETCHED, video_id=video_id, languages=languages[0], segments=len(transcript_list))
                 break
             except Exception as lang_error:
-                print(f"Failed with languages {languages}: {lang_error}")
+                log_event(logger, events.TRANSCRIPT_PROBE_FAILED, level=logging.DEBUG, video_id=video_id, languages=languages[0], error_class=type(lang_error).__name__)
                 continue
                 
         # If all specific languages fail, try to get ANY available transcript
         if "sample video transcript" in transcript_text:
+            metrics.inc(metrics.FALLBACKS, kind='transcript_list')
             try:
-                # List all available transcripts and pick the first English one (including auto-generated)
-                transcript_list_obj = api.list(video_id)
-                available_transcripts = transcript_list_obj.transcripts
-                
-                # Look for any English transcript (manual or auto-generated)
-                for transcript in available_transcripts:
-                    if transcript.language_code.startswith('en'):
-                        print(f"Found transcript: {transcript.language_code}, generated: {transcript.is_generated}")
-                        fetched = transcript.fetch()
-                        transcript_text = " ".join([snippet.text for snippet in fetched.snippets])
-                        break
+                with metrics.stage_timer('transcript_list'):
+                    # List all available transcripts and pick the first English one (including auto-generated)
+                    quota.record_fetch()
+                    transcript_list_obj = api.list(video_id)
+                    available_transcripts = transcript_list_obj.transcripts
+                    
+                    # Look for any English transcript (manual or auto-generated)
+                    for transcript in available_transcripts:
+                        if transcript.language_code.startswith('en'):
+                            log_event(logger, events.TRANSCRIPT_FETCHED, video_id=video_id, languages=transcript.language_code, generated=transcript.is_generated)
+                            quota.record_fetch()
+                            fetched = transcript.fetch()
+                            transcript_text = " ".join([snippet.text for snippet in fetched.snippets])
+                            segments = [(snippet.start, snippet.text) for snippet in fetched.snippets]
+                            break
             except Exception as list_error:
-                print(f"Failed to list available transcripts: {list_error}")
+                log_event(logger, events.TRANSCRIPT_FALLBACK, level=logging.WARNING, video_id=video_id, source='list', error=list_error)
                 
     except Exception as transcript_error:
-        print(f"All transcript methods failed: {transcript_error}")
+        log_event(logger, events.TRANSCRIPT_FALLBACK, level=logging.WARNING, video_id=video_id, source='all', error=transcript_error)
         # Keep the fallback transcript text
     
+    if "sample video transcript" in transcript_text:
+        metrics.inc(metrics.FALLBACKS, kind='placeholder_transcript')
+    
     # Combine metadata and transcript
     result = {
         'title': metadata['title'],
@@ -173,6 +249,7 @@ def get_transcript_and_metadata(video_id: str) -> dict:
         'thumbnailUrl': metadata['thumbnail_url'],  # Use the frontend expected field name
         'thumbnail_url': metadata['thumbnail_url'],  # Also include the original for compatibility
         'transcript': transcript_text,
+        'segments': segments,
     }
     return result
 
@@ -212,14 +289,9 @@ def _sample_transcript_strategically(transcript_text: str, max_chars: int = 1800
     
     return sampled
 
-def run_gemini_agent_workflow(transcript_text: str, video_title: str, video_duration: str = "Unknown") -> list:
-    """
-    Runs a single Gemini call that synthesizes the debate from the three agents
-    and returns a structured JSON list of highlights.
-    """
-    
-    # Construct the detailed prompt
-    prompt = f"""
+def _build_agent_prompt(transcript_text: str, video_title: str, video_duration: str) -> str:
+    """Builds the three-agent manager prompt around a sampled transcript."""
+    return f"""
 You are an AI Manager overseeing three specialized agents: 'The Teacher', 'The Analyst', and 'The Explorer'.
 
 Your task is to review the video transcript and synthesize their findings into 5-7 key highlights.
@@ -285,68 +357,94 @@ Focus on the most valuable, actionable, and interesting moments distributed thro
 Return only valid JSON, no other text.
 """
 
+def _parse_highlights(response_text: str) -> list:
+    """Extracts the JSON highlights list from the model's response text."""
+    response_text = response_text.strip()
+    
+    # Sometimes the model wraps JSON in markdown code blocks
+    if response_text.startswith('```json'):
+        response_text = response_text.replace('```json', '').replace('```', '').strip()
+    elif response_text.startswith('```'):
+        response_text = response_text.replace('```', '').strip()
+        
+    return json.loads(response_text)
+
+def run_gemini_agent_workflow(transcript_text: str, video_title: str, video_duration: str = "Unknown") -> list:
+    """
+    Runs a single Gemini call that synthesizes the debate from the three agents
+    and returns a structured JSON list of highlights.
+    """
+    
+    # Construct the detailed prompt
+    with metrics.stage_timer('prompt_build'):
+        prompt = _build_agent_prompt(transcript_text, video_title, video_duration)
+
     try:
-        response = model.generate_content(prompt)
+        with metrics.stage_timer('gemini'):
+            response = model.generate_content(prompt)
         
-        # Try to extract JSON from the response
-        response_text = response.text.strip()
+        # Report token usage for work-unit quotas
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            quota.record_tokens(usage.prompt_token_count, usage.candidates_token_count)
         
-        # Sometimes the model wraps JSON in markdown code blocks
-        if response_text.startswith('```json'):
-            response_text = response_text.replace('```json', '').replace('```', '').strip()
-        elif response_text.startswith('```'):
-            response_text = response_text.replace('```', '').strip()
-            
-        return json.loads(response_text)
+        with metrics.stage_timer('response_parse'):
+            return _parse_highlights(response.text)
         
     except Exception as e:
-        print(f"Gemini API call failed: {e}")
+        log_event(logger, events.GEMINI_FAILED, level=logging.ERROR, error_class=type(e).__name__, error=e)
+        metrics.inc(metrics.FALLBACKS, kind='gemini_fallback_highlights')
         # Return fallback data
-        return [
-            {
-                "agent": "The Teacher",
-                "timestamp": "01:30",
-                "title": "Key Learning Concept",
-                "description": "This section contains important educational content that viewers should focus on."
-            },
-            {
-                "agent": "The Analyst", 
-                "timestamp": "03:45",
-                "title": "Important Metric",
-                "description": "A significant data point or statistic is presented here that supports the video's main argument."
-            },
-            {
-                "agent": "The Explorer",
-                "timestamp": "05:20", 
-                "title": "Next Steps",
-                "description": "The video provides actionable advice or resources for viewers to explore further."
-            }
-        ]
+        return copy.deepcopy(FALLBACK_HIGHLIGHTS)
+
+def snap_to_transcript(highlights: list, segments: list) -> list:
+    """
+    Moves highlight timestamps onto the nearest real transcript segment,
+    adding exact seconds and the caption excerpt (see timestamp_index).
+    Fallback highlights and videos without captions are left as they are.
+    """
+    if not segments or highlights == FALLBACK_HIGHLIGHTS:
+        return highlights
+    with metrics.stage_timer('timestamp_snap'):
+        return timestamp_index.TimestampIndex(segments).snap(highlights)
 
 # --- Main Orchestration Function ---
 
-def orchestrate_analysis(youtube_url: str) -> dict:
-    """Main function to run the full video analysis process."""
+def orchestrate_analysis(youtube_url: str, with_segments: bool = False) -> dict:
+    """
+    Main function to run the full video analysis process.
+    with_segments adds the caption segments as 'segments', for indexing
+    (see transcript_index), and unusable_reason() as 'unusable_reason', for
+    deciding whether the result may be shared; callers drop both before
+    responding.
+    """
     if not client_initialized:
         raise Exception("Gemini client not initialized. Please check your GEMINI_API_KEY.")
     
     try:
         video_id = extract_youtube_id(youtube_url)
-        metadata = get_transcript_and_metadata(video_id)
+        with metrics.stage_timer('transcript_and_metadata'):
+            metadata = get_transcript_and_metadata(video_id)
         
         # Run the Gemini call to get highlights
-        highlights = run_gemini_agent_workflow(
-            metadata['transcript'], 
-            metadata['title'],
-            metadata['duration']
-        )
+        with metrics.stage_timer('agent_workflow'):
+            highlights = run_gemini_agent_workflow(
+                metadata['transcript'], 
+                metadata['title'],
+                metadata['duration']
+            )
+        highlights = snap_to_transcript(highlights, metadata['segments'])
 
-        return {
+        result = {
             "title": metadata['title'],
             "duration": metadata['duration'],
             "thumbnailUrl": metadata['thumbnailUrl'],
             "highlights": highlights,
             "status": "Success",
         }
+        if with_segments:
+            result['segments'] = metadata['segments']
+            result['unusable_reason'] = unusable_reason(metadata['title'], metadata['transcript'], highlights)
+        return result
     except Exception as e:
         raise Exception(f"Orchestration Error: {e}")
\ No newline at end of file
@@ -3,10 +3,15 @@
 import os
 import asyncio
 import json
+import logging
 import time
 from datetime import datetime
 from typing import Dict, Any
 from .analysis_core import orchestrate_analysis
+from . import log_events as events
+from .log_events import log_event
+
+logger = logging.getLogger(__name__)
 
 # In-memory storage for progress tracking (in production, use Redis/database)
 analysis_progress = {}
@@ -39,7 +44,7 @@ class AnalysisProgressTracker:
         if status:
             analysis_progress[self.job_id][status_key] = status
             
-        print(f"[{self.job_id}] {agent} progress: {progress:.2f} - {status}")
+        log_event(logger, events.JOB_PROGRESS, level=logging.DEBUG, job_id=self.job_id, agent=agent, progress=round(progress, 2))
 
 def get_progress_status(progress: float) -> str:
     """Convert progress float to status text"""
@@ -83,7 +88,7 @@ async def run_analysis_with_progress(job_id: str, youtube_url: str):
     try:
         # Check if job exists (should be initialized by start_analysis)
         if job_id not in analysis_progress:
-            print(f"[{job_id}] Error: Job not found in progress tracker")
+            log_event(logger, events.JOB_NOT_FOUND, level=logging.WARNING, job_id=job_id)
             return
             
         tracker = AnalysisProgressTracker(job_id)
@@ -100,29 +105,27 @@ async def run_analysis_with_progress(job_id: str, youtube_url: str):
         await asyncio.gather(teacher_task, analyst_task, explorer_task)
         
         # Once all agents complete, run the actual backend analysis
-        print(f"[{job_id}] All agents complete, running actual analysis...")
+        log_event(logger, events.ANALYSIS_STARTED, job_id=job_id)
         result = orchestrate_analysis(youtube_url)
         
         # Store the result
         analysis_progress[job_id]['result'] = result
         analysis_progress[job_id]['overall_status'] = 'completed'
         
-        print(f"[{job_id}] Analysis completed successfully")
+        log_event(logger, events.JOB_COMPLETED, job_id=job_id)
         
     except Exception as e:
-        print(f"[{job_id}] Analysis failed: {str(e)}")
+        log_event(logger, events.JOB_FAILED, level=logging.ERROR, job_id=job_id, error=e)
         if job_id in analysis_progress:
             analysis_progress[job_id]['error'] = str(e)
             analysis_progress[job_id]['overall_status'] = 'failed'
         else:
-            print(f"[{job_id}] Could not update progress - job not found")
+            log_event(logger, events.JOB_NOT_FOUND, level=logging.WARNING, job_id=job_id)
 
 def start_analysis(youtube_url: str) -> str:
     """Start async analysis and return job ID"""
     job_id = f"job_{int(time.time() * 1000)}"  # Simple job ID
     
-    print(f"[DEBUG] Creating job: {job_id}")
-    
     # Initialize job data FIRST to prevent race condition
     analysis_progress[job_id] = {
         'teacher_progress': 0.0,
@@ -134,7 +137,7 @@ def start_analysis(youtube_url: str) -> str:
         'start_time': time.time()
     }
     
-    print(f"[DEBUG] Job {job_id} initialized. Current jobs: {list(analysis_progress.keys())}")
+    log_event(logger, events.JOB_CREATED, job_id=job_id, active_jobs=len(analysis_progress))
     
     # Start the async analysis in background thread
     import threading
@@ -144,20 +147,16 @@ def start_analysis(youtube_url: str) -> str:
     thread.daemon = True
     thread.start()
     
-    print(f"[DEBUG] Thread started for job: {job_id}")
     return job_id
 
 def get_analysis_progress(job_id: str) -> Dict[str, Any]:
     """Get current progress for a job"""
-    print(f"[DEBUG] Looking for job: {job_id}")
-    print(f"[DEBUG] Available jobs: {list(analysis_progress.keys())}")
-    
     if job_id not in analysis_progress:
-        print(f"[DEBUG] Job {job_id} not found in progress tracker")
+        log_event(logger, events.JOB_NOT_FOUND, level=logging.DEBUG, job_id=job_id)
         return {'error': f'Job {job_id} not found'}
     
     progress_data = analysis_progress[job_id]
-    print(f"[DEBUG] Returning progress for {job_id}: {progress_data}")
+    log_event(logger, events.JOB_POLLED, level=logging.DEBUG, job_id=job_id, status=progress_data.get('overall_status'))
     return progress_data
 
 def cleanup_old_jobs():
@@ -170,5 +169,4 @@ def cleanup_old_jobs():
             expired_jobs.append(job_id)
     
     for job_id in expired_jobs:
-        del analysis_progress[job_id]
-        print(f"Cleaned up expired job: {job_id}")
\ No newline at end of file
+        del analysis_progress[job_id]
\ No newline at end of file
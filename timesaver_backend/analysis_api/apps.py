@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AnalysisApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "analysis_api"
+
+    def ready(self):
+        # Connect signal handlers that maintain derived tables
+        from . import signals  # noqa: F401
+
+        # Fake YouTube/Gemini for load tests (see provider_stubs.py)
+        if getattr(settings, 'PROVIDER_STUBS', {}).get('ENABLED'):
+            from . import provider_stubs
+            provider_stubs.install()
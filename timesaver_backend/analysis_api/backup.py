@@ -0,0 +1,315 @@
+# analysis_api/backup.py
+"""
+Export and import of a device's history as NDJSON (one JSON object per line).
+
+An export is a header line, one line per analysis, one per bookmark and an
+end line with the counts, so a truncated file can be told from a complete
+one. It is streamed from chunked iterators, so memory stays flat however
+long the history is.
+
+Imports read the same format line by line and write in batches of
+IMPORT_BATCH_SIZE rows, one transaction per batch. Videos the device already
+has are skipped, so re-running an import is harmless. Imported results are
+stored without a model name: they came from the client, so they are never
+reused for other devices (see video_content.reusable). bulk_create skips
+signals, so the search index, change log and device stats are updated here.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import device_stats, embeddings, search_index, sync, video_content
+from .models import ChangeLogEntry, VideoAnalysis, VideoBookmark
+from .renderers import dumps, loads
+
+FORMAT = 'timesaver-history'
+FORMAT_VERSION = 1
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+ITERATOR_CHUNK_SIZE = 500
+
+IMPORT_BATCH_SIZE = 500
+MAX_LINE_BYTES = 1024 * 1024
+MAX_IMPORT_ROWS = 100_000  # Per kind (analyses, bookmarks) and import
+MAX_REPORTED_ERRORS = 20
+
+
+class InvalidImport(ValueError):
+    """The upload is not an export this server can read."""
+
+
+# --- Export ---
+
+def _analysis_record(analysis):
+    record = {'type': 'analysis', **analysis.to_dict()}
+    record['video_id'] = analysis.video_id
+    record['analysis_summary'] = analysis.analysis_summary
+    return record
+
+
+def export_lines(device_id):
+    """Yield the device's history as NDJSON, in chunks of about EXPORT_CHUNK_BYTES."""
+    chunk = [dumps({
+        'type': 'header',
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'exported_at': timezone.now().isoformat(),
+    }) + b'\n']
+    size = len(chunk[0])
+    counts = {'analyses': 0, 'bookmarks': 0}
+
+    analyses = (
+        VideoAnalysis.objects.filter(device_id=device_id).select_related('content')
+        .order_by('id').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+    bookmarks = (
+        VideoBookmark.objects.filter(session_id=device_id).order_by('id')
+        .values_list('video_analysis_id', 'bookmarked_at').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+    records = [
+        ('analyses', (_analysis_record(analysis) for analysis in analyses)),
+        ('bookmarks', (
+            {'type': 'bookmark', 'analysis_id': analysis_id, 'bookmarked_at': bookmarked_at.isoformat()}
+            for analysis_id, bookmarked_at in bookmarks
+        )),
+    ]
+    for kind, lines in records:
+        for record in lines:
+            line = dumps(record) + b'\n'
+            chunk.append(line)
+            size += len(line)
+            counts[kind] += 1
+            if size >= EXPORT_CHUNK_BYTES:
+                yield b''.join(chunk)
+                chunk, size = [], 0
+
+    chunk.append(dumps({'type': 'end', **counts}) + b'\n')
+    yield b''.join(chunk)
+
+
+# --- Import ---
+
+def read_lines(stream):
+    """Lines of an uploaded file, refusing any longer than MAX_LINE_BYTES."""
+    for line in iter(lambda: stream.readline(MAX_LINE_BYTES + 1), b''):
+        if len(line) > MAX_LINE_BYTES:
+            raise InvalidImport(f"Line longer than {MAX_LINE_BYTES} bytes")
+        yield line
+
+
+def _string(record, key, max_length, required=True):
+    value = record.get(key, '')
+    if not isinstance(value, str) or (required and not value):
+        raise ValueError(f"'{key}' must be a non-empty string" if required else f"'{key}' must be a string")
+    if len(value) > max_length:
+        raise ValueError(f"'{key}' is longer than {max_length} characters")
+    return value
+
+
+def _timestamp(record, key):
+    value = record.get(key)
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError(f"'{key}' must be an ISO 8601 timestamp")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def _parse_analysis(record):
+    """The fields of an analysis line; ValueError if it's malformed."""
+    highlights = record.get('highlights')
+    if not isinstance(highlights, list):
+        raise ValueError("'highlights' must be a list")
+    source_id = record.get('id')
+    if not isinstance(source_id, int):
+        raise ValueError("'id' must be an integer")
+    video_id = _string(record, 'video_id', 20)
+    return {
+        'source_id': source_id,
+        'video_id': video_id,
+        'video_url': _string(record, 'video_url', 500),
+        'created_at': _timestamp(record, 'created_at'),
+        'content': {
+            'video_id': video_id,
+            'title': _string(record, 'title', 500),
+            'duration': _string(record, 'duration', 20, required=False),
+            'thumbnail_url': _string(record, 'thumbnailUrl', 500, required=False),
+            'highlights': highlights,
+            'analysis_summary': _string(record, 'analysis_summary', 100_000, required=False),
+        },
+    }
+
+
+def _parse_bookmark(record):
+    source_id = record.get('analysis_id')
+    if not isinstance(source_id, int):
+        raise ValueError("'analysis_id' must be an integer")
+    return source_id, _timestamp(record, 'bookmarked_at')
+
+
+def _restore_timestamps(model, field_name, values):
+    """
+    Write values ({pk: datetime}) to a field bulk_create stamped with the
+    current time (auto_now_add). One executemany: bulk_update builds a CASE
+    over every row, which costs seconds per few thousand rows.
+    """
+    field = model._meta.get_field(field_name)
+    quote = connection.ops.quote_name
+    sql = (
+        f"UPDATE {quote(model._meta.db_table)} SET {quote(field.column)} = %s "
+        f"WHERE {quote(model._meta.pk.column)} = %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (field.get_db_prep_value(value, connection), pk) for pk, value in values.items()
+        ])
+
+
+def _import_analyses(device_id, parsed, id_map, summary):
+    """Create one batch of analyses; maps their export ids to ids on this server."""
+    with transaction.atomic():
+        existing = dict(VideoAnalysis.objects.filter(
+            device_id=device_id, video_id__in={row['video_id'] for row in parsed}
+        ).values_list('video_id', 'id'))
+        new = {}
+        for row in parsed:
+            if row['video_id'] in existing or row['video_id'] in new:
+                summary['skipped']['analyses'] += 1
+            else:
+                new[row['video_id']] = row
+        if new:
+            rows = list(new.values())
+            contents = video_content.store_many([row['content'] for row in rows])
+            analyses = {
+                row['video_id']: VideoAnalysis(
+                    device_id=device_id, video_id=row['video_id'], video_url=row['video_url'], content=content
+                )
+                for row, content in zip(rows, contents)
+            }
+            # ignore_conflicts: a concurrent request may add one of the videos
+            VideoAnalysis.objects.bulk_create(analyses.values(), ignore_conflicts=True)
+            created = VideoAnalysis.objects.filter(device_id=device_id, video_id__in=list(new)).values_list('video_id', 'id')
+            for video_id, analysis_id in created:
+                analyses[video_id].id = analysis_id
+                existing[video_id] = analysis_id
+            _restore_timestamps(VideoAnalysis, 'created_at', {
+                analysis.id: new[video_id]['created_at'] for video_id, analysis in analyses.items()
+            })
+            search_index.index_analyses(analyses.values())
+            imported = list(analyses.values())
+            transaction.on_commit(lambda: embeddings.append_analyses(imported))
+            sync.record(device_id, ChangeLogEntry.KIND_ANALYSIS, [analysis.id for analysis in analyses.values()], ChangeLogEntry.OP_CREATE)
+            summary['imported']['analyses'] += len(analyses)
+    for row in parsed:
+        id_map[row['source_id']] = existing[row['video_id']]
+
+
+def _import_bookmarks(device_id, bookmarks, summary):
+    """Create the bookmarks ({analysis id: bookmarked_at}) the device doesn't have yet."""
+    analysis_ids = list(bookmarks)
+    for start in range(0, len(analysis_ids), IMPORT_BATCH_SIZE):
+        batch = analysis_ids[start:start + IMPORT_BATCH_SIZE]
+        with transaction.atomic():
+            existing = set(VideoBookmark.objects.filter(
+                session_id=device_id, video_analysis_id__in=batch
+            ).values_list('video_analysis_id', flat=True))
+            added = [analysis_id for analysis_id in batch if analysis_id not in existing]
+            summary['skipped']['bookmarks'] += len(batch) - len(added)
+            if not added:
+                continue
+            VideoBookmark.objects.bulk_create(
+                [VideoBookmark(session_id=device_id, video_analysis_id=analysis_id) for analysis_id in added],
+                ignore_conflicts=True,
+            )
+            created = dict(VideoBookmark.objects.filter(
+                session_id=device_id, video_analysis_id__in=added
+            ).values_list('id', 'video_analysis_id'))
+            _restore_timestamps(VideoBookmark, 'bookmarked_at', {
+                bookmark_id: bookmarks[analysis_id] for bookmark_id, analysis_id in created.items()
+            })
+            sync.record(device_id, ChangeLogEntry.KIND_BOOKMARK, list(created), ChangeLogEntry.OP_CREATE)
+            summary['imported']['bookmarks'] += len(created)
+
+
+def import_lines(device_id, lines):
+    """
+    Import an export (an iterable of its lines) into the device's history.
+    Malformed lines are skipped and reported; InvalidImport is raised if the
+    input isn't an export at all. Returns a summary of what was done.
+    """
+    summary = {
+        'imported': {'analyses': 0, 'bookmarks': 0},
+        'skipped': {'analyses': 0, 'bookmarks': 0},
+        'errors': [],
+        'error_count': 0,
+        'complete': False,
+    }
+
+    def reject(line_number, error):
+        summary['error_count'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'line': line_number, 'error': str(error)})
+
+    id_map = {}  # Analysis id in the export -> id on this server
+    pending = []
+    bookmarks = []
+    analysis_count = 0
+    header_seen = False
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except ValueError:
+            if not header_seen:
+                raise InvalidImport("Not an NDJSON history export")
+            reject(line_number, "Invalid JSON")
+            continue
+        kind = record.get('type') if isinstance(record, dict) else None
+
+        if not header_seen:
+            if kind != 'header' or record.get('format') != FORMAT:
+                raise InvalidImport("Missing history export header")
+            if record.get('version') != FORMAT_VERSION:
+                raise InvalidImport(f"Unsupported export version: {record.get('version')}")
+            header_seen = True
+            continue
+
+        try:
+            if kind == 'analysis':
+                analysis_count += 1
+                if analysis_count > MAX_IMPORT_ROWS:
+                    raise ValueError(f"More than {MAX_IMPORT_ROWS} analyses")
+                pending.append(_parse_analysis(record))
+                if len(pending) >= IMPORT_BATCH_SIZE:
+                    _import_analyses(device_id, pending, id_map, summary)
+                    pending = []
+            elif kind == 'bookmark':
+                if len(bookmarks) >= MAX_IMPORT_ROWS:
+                    raise ValueError(f"More than {MAX_IMPORT_ROWS} bookmarks")
+                bookmarks.append((line_number, *_parse_bookmark(record)))
+            elif kind == 'end':
+                summary['complete'] = True
+                break
+            else:
+                raise ValueError(f"Unknown record type: {kind!r}")
+        except ValueError as e:
+            reject(line_number, e)
+
+    if not header_seen:
+        raise InvalidImport("Empty upload")
+    if pending:
+        _import_analyses(device_id, pending, id_map, summary)
+
+    # Bookmarks come after all analyses in an export, so every target is known by now
+    targets = {}
+    for line_number, source_id, bookmarked_at in bookmarks:
+        if source_id not in id_map:
+            reject(line_number, f"Bookmark of unknown analysis {source_id}")
+        else:
+            targets.setdefault(id_map[source_id], bookmarked_at)
+    _import_bookmarks(device_id, targets, summary)
+
+    if summary['imported']['analyses'] or summary['imported']['bookmarks']:
+        # Also bumps the device's version, so cached responses revalidate
+        device_stats.rebuild([device_id])
+    return summary
@@ -0,0 +1,51 @@
+# analysis_api/benchmarks/__init__.py
+"""
+Microbenchmarks for the backend's hot paths.
+
+Suites register themselves with @suite and are run through
+`python manage.py benchmark [suite ...]`. Each suite yields result dicts
+produced by measure(), so every benchmark reports the same fields.
+"""
+import statistics
+import timeit
+
+SUITES = {}
+
+
+def suite(name, needs_db=False):
+    """Register a benchmark suite. Suites that need_db run against a throwaway test database."""
+    def register(func):
+        SUITES[name] = {'run': func, 'needs_db': needs_db, 'doc': (func.__doc__ or '').strip()}
+        return func
+    return register
+
+
+def measure(name, func, repeat=5, info=None, **params):
+    """
+    Time func() with timeit, auto-ranging the loop count so each sample
+    takes at least ~0.2 s, and report per-call times in microseconds.
+
+    params identify the case (a baseline is matched on name + params);
+    info carries measured side facts such as output size, which may change
+    between runs without making it a different case.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    samples = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'benchmark': name,
+        'params': params,
+        'info': info or {},
+        'calls': number,
+        'min_us': round(min(samples), 3),
+        'median_us': round(statistics.median(samples), 3),
+    }
+
+
+def load_suites():
+    """Import the suite modules so their @suite decorators run."""
+    from . import (  # noqa: F401
+        cold_storage, core_helpers, middleware, pipeline, queries, rate_limiting, search, semantic, serialization,
+        transcripts,
+    )
+    return SUITES
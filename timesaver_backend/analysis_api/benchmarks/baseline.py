@@ -0,0 +1,98 @@
+# analysis_api/benchmarks/baseline.py
+"""
+Saved benchmark results and regression checks against them.
+
+`benchmark --json PATH` writes a results file; any such file can serve as
+a baseline for `compare_benchmarks BASELINE CURRENT`. Results are matched
+on benchmark name + params. Timings only compare meaningfully between
+runs on the same machine, so each file records where it was produced.
+"""
+import json
+import os
+import platform
+
+import django
+from django.utils import timezone
+
+METRICS = ('min_us', 'median_us')
+
+
+def _processor():
+    # platform.processor() is empty on most Linux builds
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def _memory_gb():
+    try:
+        return round(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 2 ** 30, 1)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def environment(note=''):
+    return {
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'machine': platform.node(),
+        'processor': _processor(),
+        'cpu_count': os.cpu_count(),
+        'memory_gb': _memory_gb(),
+        'note': note,
+    }
+
+
+def dump(results, path, options=None, note=''):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(note), 'options': options or {}, 'results': results}, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def case_key(result):
+    return (result['benchmark'], tuple(sorted((key, str(value)) for key, value in result['params'].items())))
+
+
+def compare(baseline_results, current_results, threshold=0.10, metric='min_us'):
+    """
+    One row per case in either run, with status 'regressed' or 'improved'
+    when current differs from baseline by more than threshold (a fraction),
+    'unchanged' otherwise, or 'new'/'missing' when only one run has it.
+    """
+    baseline = {case_key(result): result for result in baseline_results}
+    current = {case_key(result): result for result in current_results}
+    rows = []
+    for key in list(baseline) + [key for key in current if key not in baseline]:
+        before, after = baseline.get(key), current.get(key)
+        row = {
+            'benchmark': key[0],
+            'params': dict(key[1]),
+            'baseline_us': before[metric] if before else None,
+            'current_us': after[metric] if after else None,
+            'change': None,
+        }
+        if before is None:
+            row['status'] = 'new'
+        elif after is None:
+            row['status'] = 'missing'
+        else:
+            row['change'] = after[metric] / before[metric] - 1 if before[metric] else 0.0
+            if row['change'] > threshold:
+                row['status'] = 'regressed'
+            elif row['change'] < -threshold:
+                row['status'] = 'improved'
+            else:
+                row['status'] = 'unchanged'
+        rows.append(row)
+    return rows
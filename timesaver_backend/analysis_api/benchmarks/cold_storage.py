@@ -0,0 +1,55 @@
+# analysis_api/benchmarks/cold_storage.py
+from django.db import connection
+from django.utils import timezone
+
+from .. import video_content
+from ..models import VideoAnalysis, VideoContent
+from . import measure, suite
+from .fixtures import seed_analyses
+
+
+def _database_bytes():
+    with connection.cursor() as cursor:
+        cursor.execute("VACUUM")
+        cursor.execute("PRAGMA page_count")
+        page_count = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return page_count * cursor.fetchone()[0]
+
+
+@suite('cold_storage', needs_db=True)
+def cold_storage_suite(options):
+    """Database size and read latency with every payload hot vs. compressed in cold storage (--rows, default 20k)."""
+    rows = options.get('rows') or 20_000
+    device_id = seed_analyses(rows)[0]
+    analysis_id = VideoAnalysis.objects.filter(device_id=device_id).values_list('id', flat=True).first()
+
+    def history_page():
+        # Content is reloaded each call, so cold rows pay decompression every time
+        return [analysis.to_dict() for analysis in VideoAnalysis.objects.filter(device_id=device_id).select_related('content')[:20]]
+
+    def detail():
+        return VideoAnalysis.objects.select_related('content').get(id=analysis_id).to_dict()
+
+    for tier in ('hot', 'cold'):
+        if tier == 'cold':
+            VideoContent.objects.update(created_at=timezone.now() - timezone.timedelta(days=365))
+            video_content.compact_cold_storage(after_days=30, batch_size=1000)
+        db_bytes = _database_bytes()
+        yield measure('cold_storage.history_page', history_page, rows=rows, tier=tier, info={'db_bytes': db_bytes})
+        yield measure('cold_storage.detail', detail, rows=rows, tier=tier, info={'db_bytes': db_bytes})
+
+    yield measure(
+        'cold_storage.refreeze_batch',
+        lambda: _refreeze(batch_size=200),
+        repeat=3, rows=rows, batch=200,
+    )
+
+
+def _refreeze(batch_size):
+    """Thaw and re-freeze batch_size rows: the per-batch cost of compaction."""
+    batch = list(VideoContent.objects.order_by('id')[:batch_size])
+    for content in batch:
+        content.thaw()
+        content.freeze()
+    VideoContent.objects.bulk_update(batch, ['highlights_data', 'summary_data', 'cold_payload'])
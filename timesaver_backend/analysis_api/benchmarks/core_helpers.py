@@ -0,0 +1,67 @@
+# analysis_api/benchmarks/core_helpers.py
+import json
+import random
+from types import SimpleNamespace
+
+from .. import analysis_core, timestamp_index
+from . import measure, suite
+from .fixtures import VOCABULARY, make_highlights
+
+URLS = {
+    'watch': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'watch_params': 'https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=42s&list=PL0123456789',
+    'short': 'https://youtu.be/dQw4w9WgXcQ?si=abcdefghijkl',
+    'embed': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
+    'invalid': 'https://example.com/not-a-video',
+}
+
+# Caption length in minutes; YouTube captions average a snippet every ~4 s
+VIDEO_MINUTES = (10, 60, 180)
+
+
+def _snippets(rng, minutes):
+    return [
+        SimpleNamespace(start=start + rng.random(), text=' '.join(rng.choice(VOCABULARY) for _ in range(8)))
+        for start in range(0, minutes * 60, 4)
+    ]
+
+
+def _extract(url):
+    try:
+        return analysis_core.extract_youtube_id(url)
+    except ValueError:
+        return None
+
+
+@suite('core')
+def core_suite(options):
+    """Pure-Python pipeline steps: URL parsing, transcript assembly, sampling and timestamp snapping, and parsing Gemini's JSON."""
+    for label, url in URLS.items():
+        yield measure('core.extract_youtube_id', lambda: _extract(url), url=label)
+
+    rng = random.Random(47)
+    for minutes in VIDEO_MINUTES:
+        snippets = _snippets(rng, minutes)
+        transcript = analysis_core._format_transcript(snippets)
+        yield measure(
+            'core.format_transcript', lambda: analysis_core._format_transcript(snippets),
+            minutes=minutes, info={'snippets': len(snippets), 'chars': len(transcript)},
+        )
+        yield measure(
+            'core.sample_transcript', lambda: analysis_core._sample_transcript_strategically(transcript),
+            minutes=minutes, info={'chars': len(transcript)},
+        )
+
+        segments = [(snippet.start, snippet.text) for snippet in snippets]
+        index = timestamp_index.TimestampIndex(segments)
+        highlights = make_highlights(rng, 10)
+        yield measure('core.timestamp_index_build', lambda: timestamp_index.TimestampIndex(segments), minutes=minutes)
+        yield measure('core.snap_highlights', lambda: index.snap(highlights), minutes=minutes, highlights=len(highlights))
+
+    for count in (5, 20):
+        text = json.dumps(make_highlights(rng, count), indent=2)
+        for wrapping, response_text in (('plain', text), ('fenced', f"```json\n{text}\n```")):
+            yield measure(
+                'core.parse_highlights', lambda: analysis_core._parse_highlights(response_text),
+                highlights=count, wrapping=wrapping, info={'chars': len(response_text)},
+            )
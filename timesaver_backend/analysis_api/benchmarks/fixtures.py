@@ -0,0 +1,132 @@
+# analysis_api/benchmarks/fixtures.py
+"""Synthetic data for database and pipeline benchmarks."""
+import json
+import random
+
+from ..models import VideoAnalysis, VideoContent
+
+AGENTS = ['The Teacher', 'The Analyst', 'The Explorer']
+
+# A fixed pseudo-vocabulary keeps term frequencies realistic and runs repeatable
+_rng = random.Random(1234)
+_SYLLABLES = ['ka', 'to', 'mi', 're', 'su', 'lo', 'na', 'vi', 'de', 'po', 'ra', 'ne', 'zu', 'ta', 'ge']
+VOCABULARY = sorted({''.join(_rng.choice(_SYLLABLES) for _ in range(_rng.randint(2, 4))) for _ in range(4000)})
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + '.'
+
+
+def make_highlights(rng, count):
+    return [
+        {
+            'agent': AGENTS[i % 3],
+            'timestamp': f"{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+            'title': ' '.join(rng.choice(VOCABULARY) for _ in range(5)).title(),
+            'description': ' '.join(_sentence(rng, 14) for _ in range(3)),
+        }
+        for i in range(count)
+    ]
+
+
+def seed_analyses(rows, devices=10, batch_size=2000, seed=42, first=0):
+    """
+    Insert analyses number `first` to `rows` spread round-robin over
+    `devices` device ids and return the device ids, so a table can be grown
+    in steps. Every analysis gets its own content row.
+    Bypasses signals; callers rebuild derived data.
+    """
+    rng = random.Random(seed + first)
+    device_ids = [f'bench-device-{i:04d}-0000000000' for i in range(devices)]
+    for start in range(first, rows, batch_size):
+        contents = []
+        for i in range(start, min(start + batch_size, rows)):
+            video_id = f'{i:011d}'
+            contents.append(VideoContent(
+                video_id=video_id,
+                title=' '.join(rng.choice(VOCABULARY) for _ in range(6)).title(),
+                duration=f"{rng.randint(1, 90)}:{rng.randint(0, 59):02d}",
+                thumbnail_url=f'https://img.youtube.com/vi/{video_id}/hqdefault.jpg',
+                highlights=make_highlights(rng, rng.randint(4, 10)),
+                content_hash=f'bench-{seed}-{video_id}',
+            ))
+        VideoContent.objects.bulk_create(contents)
+        VideoAnalysis.objects.bulk_create([
+            VideoAnalysis(
+                device_id=device_ids[int(content.video_id) % devices],
+                video_url=f'https://www.youtube.com/watch?v={content.video_id}',
+                video_id=content.video_id,
+                content=content,
+            )
+            for content in contents
+        ])
+    return device_ids
+
+
+LECTURE_LINES = [
+    'so the first thing we want to look at is how the request gets routed',
+    'if we add an index the plan changes completely',
+    'the trade-off is memory versus latency',
+    "here's the part that surprised me the most",
+    'this is where most of the time actually goes',
+    'a lot of people skip this step and regret it later',
+    'notice that the query runs once per row here',
+    "let's open the profiler and see what it says",
+    'we can cache this because it never changes between requests',
+    "and that's really the key takeaway from this section",
+]
+
+
+def long_video_fixture(prompt_version, video_id='rpLongAuto2', seconds=7385, seed=7):
+    """
+    A replay fixture for a two-hour lecture with auto-generated captions
+    only, built here rather than checked in: the pipeline's slowest path
+    (every manual-caption probe misses, then ~2,500 segments are listed,
+    fetched and sampled down for Gemini).
+    """
+    rng = random.Random(seed)
+    segments = []
+    start = rng.uniform(0.5, 1.0)
+    while start < seconds - 2:
+        segments.append([round(start, 3), rng.choice(LECTURE_LINES)])
+        start += rng.uniform(2.0, 4.0)
+
+    topics = ['indexes', 'trade-offs', 'caching', 'indexes', 'trade-offs', 'profiling']
+    agents = ['The Teacher', 'The Analyst', 'The Explorer']
+    highlights = []
+    for index, topic in enumerate(topics):
+        at, line = segments[(index + 1) * len(segments) // (len(topics) + 1)]
+        highlights.append({
+            'agent': agents[index % 3],
+            'timestamp': f'{int(at) // 60:02d}:{int(at) % 60:02d}',
+            'title': f'Point {index + 1}: {topic}',
+            'description': line[0].upper() + line[1:] + '.',
+        })
+
+    def missing(language):
+        return {
+            'key': ['transcript', video_id, language],
+            'error': f"NoTranscriptFound: Could not retrieve a transcript for the video "
+                     f"https://www.youtube.com/watch?v={video_id}! No transcripts were found for any of the "
+                     f"requested language codes: ['{language}']",
+            'latency': 0.21,
+        }
+
+    return {
+        'video_id': video_id,
+        'label': '2h lecture, auto-generated captions only',
+        'synthetic': True,
+        'calls': [
+            {'key': ['pytube', video_id], 'latency': 0.81, 'result': {
+                'title': 'Database internals lecture (full course)', 'length': seconds,
+                'thumbnail_url': f'https://i.ytimg.com/vi/{video_id}/hq720.jpg',
+            }},
+            missing('en'), missing('en-US'), missing('en-GB'),
+            {'key': ['transcript_list', video_id], 'latency': 0.29,
+             'result': [{'language_code': 'en', 'is_generated': True}]},
+            {'key': ['transcript_list_fetch', video_id, 'en'], 'latency': 0.72, 'result': segments},
+            {'key': ['gemini', video_id, prompt_version], 'latency': 8.4, 'result': {
+                'text': json.dumps(highlights, indent=2), 'usage': [6100, 255],
+            }},
+        ],
+    }
@@ -0,0 +1,46 @@
+# analysis_api/benchmarks/middleware.py
+import os
+import tempfile
+from unittest import mock
+
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from .. import rate_limit_backends
+from ..middleware import DeviceAuthenticationMiddleware
+from ..rate_limit_backends import ResilientBackend, SQLiteBackend
+from ..rate_limiting import RateLimiter
+from . import measure, suite
+
+DEVICE_ID = 'bench-device-0000000000000000'
+
+
+@suite('middleware')
+def middleware_suite(options):
+    """DeviceAuthenticationMiddleware per path type, and a request through the full middleware stack."""
+    factory = RequestFactory()
+    middleware = DeviceAuthenticationMiddleware(lambda request: HttpResponse())
+    requests = {
+        'exempt': factory.get('/api/test/'),
+        'unprotected': factory.get('/api/metrics/'),
+        'missing_device': factory.get('/api/history/'),
+        'protected': factory.get('/api/history/', HTTP_X_DEVICE_ID=DEVICE_ID),
+    }
+    # Keep the protected case under its limit however many calls autorange makes
+    unlimited = {
+        name: {**config, 'max_requests': 10 ** 12}
+        for name, config in RateLimiter.RATE_LIMITS.items()
+    }
+    # Counters go to a throwaway SQLite file (the default backend), never the configured store
+    with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.dict(RateLimiter.RATE_LIMITS, unlimited), \
+            mock.patch.object(rate_limit_backends, '_backend',
+                              ResilientBackend(SQLiteBackend(os.path.join(tmp_dir, 'ratelimit.sqlite3')))):
+        for label, request in requests.items():
+            yield measure('middleware.device_auth', lambda: middleware.process_request(request), path=label)
+
+        # Every configured middleware plus URL resolution, around a view that does no I/O
+        handler = BaseHandler()
+        handler.load_middleware()
+        request = factory.get('/api/test/')
+        yield measure('middleware.full_stack', lambda: handler.get_response(request), path='exempt')
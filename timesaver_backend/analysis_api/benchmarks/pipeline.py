@@ -0,0 +1,26 @@
+# analysis_api/benchmarks/pipeline.py
+from .. import analysis_core, provider_replay
+from . import measure, suite
+from .fixtures import long_video_fixture
+
+
+@suite('pipeline')
+def pipeline_suite(options):
+    """orchestrate_analysis per video, replaying recorded YouTube/Gemini calls (--latency-scale, default 0 = CPU only)."""
+    latency_scale = options.get('latency_scale') or 0.0
+    fixtures = [long_video_fixture(analysis_core.PROMPT_VERSION)]
+    with provider_replay.replaying(latency_scale=latency_scale, fixtures=fixtures) as corpus:
+        for video_id in corpus:
+            url = f'https://www.youtube.com/watch?v={video_id}'
+            expected = analysis_core.orchestrate_analysis(url)
+
+            def analyze():
+                result = analysis_core.orchestrate_analysis(url)
+                # Replay is deterministic; a difference means the corpus no longer matches the pipeline
+                if result != expected:
+                    raise provider_replay.ReplayMiss(f"{video_id} gave a different result on replay")
+
+            yield measure(
+                'pipeline.orchestrate', analyze, repeat=3 if latency_scale else 5,
+                video=video_id, latency_scale=latency_scale, info={'highlights': len(expected['highlights'])},
+            )
@@ -0,0 +1,51 @@
+# analysis_api/benchmarks/queries.py
+from django.test import RequestFactory
+
+from .. import device_stats, search_index, views
+from ..models import VideoAnalysis
+from . import measure, suite
+from .fixtures import VOCABULARY, seed_analyses
+
+ROW_COUNTS = (1_000, 10_000, 100_000)
+
+
+def _index_from(first_id):
+    """Index analyses with id >= first_id, as a backfill would after bulk_create."""
+    queryset = VideoAnalysis.objects.select_related('content').filter(id__gte=first_id).order_by('id')
+    for start in range(0, queryset.count(), 5000):
+        search_index.index_analyses(queryset[start:start + 5000])
+
+
+@suite('queries', needs_db=True)
+def queries_suite(options):
+    """History, search and stats views for one device as the table grows to 1k/10k/100k analyses (--rows for one size)."""
+    factory = RequestFactory()
+    row_counts = [options['rows']] if options.get('rows') else ROW_COUNTS
+    word = VOCABULARY[10]
+
+    def call(view_func, path, **params):
+        # A fresh request per call, so nothing cached on the request carries over
+        request = factory.get(path, params)
+        request.device_id = device_id
+        return view_func(request).render()
+
+    seeded = 0
+    for rows in row_counts:
+        next_id = (VideoAnalysis.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        device_id = seed_analyses(rows, first=seeded)[0]
+        _index_from(next_id)
+        device_stats.rebuild()
+        seeded = rows
+
+        cases = {
+            'queries.history': lambda: call(views.get_analysis_history, '/api/history/', limit=20),
+            'queries.history_summary': lambda: call(views.get_analysis_history, '/api/history/', limit=20, view='summary'),
+            'queries.search': lambda: call(views.search_analyses, '/api/search/', q=word),
+            'queries.stats': lambda: call(views.get_stats, '/api/stats/'),
+        }
+        for name, func in cases.items():
+            # Views turn exceptions into 500s; don't time an error page
+            response = func()
+            if response.status_code != 200:
+                raise RuntimeError(f"{name} returned {response.status_code}: {response.content[:200]!r}")
+            yield measure(name, func, rows=rows, info={'bytes': len(response.content)})
@@ -0,0 +1,41 @@
+# analysis_api/benchmarks/rate_limiting.py
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+
+from .. import rate_limit_backends
+from ..rate_limit_backends import CacheBackend, ResilientBackend, SQLiteBackend
+from ..rate_limiting import RateLimiter
+from . import measure, suite
+
+DEVICE_ID = 'bench-device-0000000000000000'
+
+
+@suite('rate_limit')
+def rate_limit_suite(options):
+    """Per-check cost of RateLimiter.check_rate_limit with the window saturated at different limit sizes."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backends = {
+            'cache': CacheBackend(),
+            'sqlite': SQLiteBackend(os.path.join(tmp_dir, 'ratelimit.sqlite3')),
+        }
+        for backend_name, backend in backends.items():
+            for max_requests in (5, 500, 50_000):
+                config = {'max_requests': max_requests, 'window_seconds': 60, 'endpoint': '/bench/'}
+                with mock.patch.dict(RateLimiter.RATE_LIMITS, {'bench': config}), \
+                        mock.patch.object(rate_limit_backends, '_backend', ResilientBackend(backend)):
+                    cache.clear()
+                    device_id = f'{backend_name}-{max_requests}-{DEVICE_ID}'
+                    # Fill the window to its limit so every timed check sees the worst case
+                    for _ in range(max_requests):
+                        RateLimiter.check_rate_limit(device_id, '/bench/')
+
+                    yield measure(
+                        'rate_limit.check_saturated',
+                        lambda: RateLimiter.check_rate_limit(device_id, '/bench/'),
+                        backend=backend_name,
+                        max_requests=max_requests,
+                    )
+    cache.clear()
@@ -0,0 +1,55 @@
+# analysis_api/benchmarks/search.py
+from django.db import connection
+from django.db.models import Q
+
+from .. import search_index
+from ..models import VideoAnalysis
+from . import measure, suite
+from .fixtures import VOCABULARY, seed_analyses
+
+
+def _reindex_by_analysis_id(analysis):
+    """The old write path: find an analysis's rows through the unindexed analysis_id column."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {search_index.FTS_TABLE} WHERE analysis_id = %s", [analysis.id])
+        cursor.executemany(search_index._INSERT_SQL, search_index._rows_for(analysis))
+
+
+@suite('search', needs_db=True)
+def search_suite(options):
+    """
+    FTS5 ranked search vs. the old icontains scan for one device's analyses,
+    and reindexing one analysis as every save does (--rows, default 100k).
+    """
+    rows = options.get('rows') or 100_000
+    device_ids = seed_analyses(rows)
+    device_id = device_ids[0]
+
+    # bulk_create skips signals, so build the index the way a backfill would
+    queryset = VideoAnalysis.objects.select_related('content')
+    for start in range(0, rows, 5000):
+        search_index.index_analyses(queryset.order_by('id')[start:start + 5000])
+
+    # The fixture vocabulary is uniform, so cases differ by shape rather than
+    # frequency: a whole word, a short stem that prefix-expands to many
+    # words, and two words that must both match
+    word = VOCABULARY[10]
+    stem = min(VOCABULARY, key=len)
+    for label, query in (('word', word), ('prefix', stem), ('two_words', f'{word} {VOCABULARY[-10]}')):
+        yield measure(
+            'search.icontains',
+            lambda: list(VideoAnalysis.objects.filter(device_id=device_id).filter(
+                Q(content__title__icontains=query) | Q(content__highlights_data__icontains=query)
+            ).order_by('-created_at')[:50]),
+            rows=rows, query=label,
+        )
+        yield measure(
+            'search.fts5',
+            lambda: search_index.search_analyses(queryset, device_id, query, limit=50),
+            rows=rows, query=label,
+        )
+
+    # Every save and import reindexes its analyses: a delete plus inserts
+    analysis = queryset.filter(device_id=device_id).first()
+    yield measure('search.reindex', lambda: search_index.index_analyses([analysis]), rows=rows, key='rowid')
+    yield measure('search.reindex', lambda: _reindex_by_analysis_id(analysis), rows=rows, key='analysis_id')
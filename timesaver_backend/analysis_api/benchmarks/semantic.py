@@ -0,0 +1,41 @@
+# analysis_api/benchmarks/semantic.py
+import tempfile
+
+from django.test import override_settings
+
+from .. import embeddings
+from ..models import VideoAnalysis
+from . import measure, suite
+from .fixtures import VOCABULARY, seed_analyses
+
+
+@suite('semantic', needs_db=True)
+def semantic_suite(options):
+    """Semantic search over one device's embeddings (1/10 of --rows, default 100k), plus embedding and index upkeep."""
+    if not embeddings.is_available():
+        return  # Needs numpy
+    rows = options.get('rows') or 100_000
+    device_id = seed_analyses(rows)[0]
+    count = VideoAnalysis.objects.filter(device_id=device_id).count()
+
+    with tempfile.TemporaryDirectory() as directory, override_settings(SEMANTIC_SEARCH={'DIR': directory}):
+        yield measure('semantic.rebuild', lambda: embeddings.rebuild(device_id), repeat=1, analyses=count)
+        matrix, _ = embeddings._load(device_id, count)
+        info = {'bytes': matrix.nbytes}
+
+        query = ' '.join(VOCABULARY[10:14])
+        yield measure('semantic.embed_query', lambda: embeddings.embed([query]))
+        yield measure(
+            'semantic.search', lambda: embeddings.search(device_id, query, count, limit=50),
+            analyses=count, vectors=len(matrix), info=info,
+        )
+        queryset = VideoAnalysis.objects.select_related('content')
+        yield measure(
+            'semantic.search_analyses',
+            lambda: embeddings.search_analyses(queryset, device_id, query, count, limit=50),
+            analyses=count, vectors=len(matrix),
+        )
+
+        # What saving a new analysis adds; runs last, as the repeats leave duplicate rows behind
+        analysis = VideoAnalysis.objects.select_related('content').filter(device_id=device_id).first()
+        yield measure('semantic.append', lambda: embeddings.append_analyses([analysis]), analyses=count)
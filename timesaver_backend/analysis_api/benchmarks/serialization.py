@@ -0,0 +1,85 @@
+# analysis_api/benchmarks/serialization.py
+import random
+
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from .. import compression, fragments
+from ..models import VideoAnalysis, VideoContent
+from ..renderers import ORJSONRenderer
+from . import measure, suite
+from .fixtures import VOCABULARY, make_highlights
+
+
+def _analyses(count, rng):
+    now = timezone.now()
+    return [
+        VideoAnalysis(
+            id=i + 1,
+            video_url=f'https://www.youtube.com/watch?v={i:011d}',
+            content=VideoContent(
+                id=i + 1,
+                title=' '.join(rng.choice(VOCABULARY) for _ in range(6)).title(),
+                duration='12:34',
+                thumbnail_url=f'https://img.youtube.com/vi/{i:011d}/hqdefault.jpg',
+                highlights=make_highlights(rng, rng.randint(8, 12)),
+            ),
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def _pages():
+    rng = random.Random(7)
+    history_analyses = _analyses(20, rng)
+    history = {
+        'analyses': [analysis.to_dict() for analysis in history_analyses],
+        'total_count': 500, 'has_more': True, 'next_cursor': 'MjAyNi0xMC0xOVQwNTowNjo0NXwxMjM', 'device_id': 'bench-de...',
+    }
+    results = []
+    for analysis in _analyses(50, rng):
+        result = analysis.to_dict()
+        result['match'] = {'highlight_index': 2, 'highlight_title': 'Title', 'timestamp': '03:21', 'snippet': 'a [b] c', 'score': 4.2}
+        results.append(result)
+    search = {'results': results, 'total_count': 50, 'search_query': 'term', 'device_id': 'bench-de...'}
+    return {'history_page': history, 'search_page': search}, history_analyses
+
+
+@suite('serialization')
+def serialization_suite(options):
+    """DRF JSON vs orjson vs cached fragments, and gzip/brotli cost and size, for history (20) and search (50) pages."""
+    pages, history_analyses = _pages()
+    for page, data in pages.items():
+        body = ORJSONRenderer().render(data)
+        yield measure('render.drf_json', lambda: JSONRenderer().render(data), page=page, info={'bytes': len(JSONRenderer().render(data))})
+        yield measure('render.orjson', lambda: ORJSONRenderer().render(data), page=page, info={'bytes': len(body)})
+        # Django's fixed level 6 vs the level the middleware actually serves
+        yield measure('compress.gzip_django', lambda: compress_string(body, max_random_bytes=100), page=page,
+                      info={'bytes': len(compress_string(body, max_random_bytes=100))})
+        level = compression.DEFAULT_GZIP_LEVEL
+        yield measure('compress.gzip', lambda: compression.gzip_compress(body, level), page=page,
+                      info={'bytes': len(compression.gzip_compress(body, level))})
+        if compression.brotli is not None:
+            quality = compression.DEFAULT_BROTLI_QUALITY
+            yield measure('compress.brotli', lambda: compression.brotli.compress(body, quality=quality), page=page,
+                          info={'bytes': len(compression.brotli.compress(body, quality=quality))})
+
+    # History page assembled from warm pre-encoded fragments: to_dict() and
+    # highlight encoding are skipped, only the envelope is encoded
+    fragments.clear()
+    envelope = {key: value for key, value in pages['history_page'].items() if key != 'analyses'}
+    renderer = ORJSONRenderer()
+
+    def render_from_fragments():
+        return renderer.render({'analyses': fragments.render_analyses(history_analyses), **envelope})
+
+    render_from_fragments()
+    yield measure('render.orjson_fragments', render_from_fragments, page='history_page', info={'bytes': len(render_from_fragments())})
+
+    def render_from_models():
+        return renderer.render({'analyses': [analysis.to_dict() for analysis in history_analyses], **envelope})
+
+    yield measure('render.orjson_to_dict', render_from_models, page='history_page', info={'bytes': len(render_from_models())})
@@ -0,0 +1,55 @@
+# analysis_api/benchmarks/transcripts.py
+import random
+
+from .. import transcript_index
+from . import measure, suite
+from .fixtures import VOCABULARY, seed_analyses
+
+SEGMENTS_PER_VIDEO = 1000
+
+# Filler words make up a share of real captions; they make the common-term case
+FILLER = ['the', 'and', 'that', 'this', 'you', 'what', 'with', 'just']
+
+
+@suite('transcripts', needs_db=True)
+def transcripts_suite(options):
+    """Transcript search for one device (1/10 of the videos) with --rows segments indexed (default 1M)."""
+    rows = options.get('rows') or 1_000_000
+    videos = max(10, rows // SEGMENTS_PER_VIDEO)
+    device_id = seed_analyses(videos)[0]
+
+    rng = random.Random(49)
+    phrase = None
+    for start in range(0, videos, 50):
+        transcripts = {
+            f'{index:011d}': [
+                (position * 4.0, ' '.join(rng.choice(FILLER) if rng.random() < 0.4 else rng.choice(VOCABULARY) for _ in range(9)))
+                for position in range(SEGMENTS_PER_VIDEO)
+            ]
+            for index in range(start, min(start + 50, videos))
+        }
+        # Three consecutive words said once in the device's first video
+        phrase = phrase or ' '.join(transcripts[f'{0:011d}'][500][1].split()[3:6])
+        transcript_index.index_transcripts(transcripts)
+
+    word, other = VOCABULARY[10], VOCABULARY[-10]
+    stem = min(VOCABULARY, key=len)
+    for label, query in (
+        ('common', 'the'),
+        ('word', word),
+        ('prefix', stem),
+        ('two_words', f'{word} {other}'),
+        ('phrase', f'"{phrase}"'),
+        ('no_match', 'zzzz'),
+    ):
+        yield measure(
+            'transcripts.search', lambda: transcript_index.search_device(device_id, query, limit=50),
+            segments=videos * SEGMENTS_PER_VIDEO, query=label,
+            info={'hits': len(transcript_index.search_device(device_id, query, limit=50))},
+        )
+    one_video = f'{0:011d}'
+    yield measure(
+        'transcripts.search_one_video',
+        lambda: transcript_index.search_device(device_id, word, video_id=one_video, limit=50),
+        segments=videos * SEGMENTS_PER_VIDEO, query='word',
+    )
@@ -0,0 +1,255 @@
+# analysis_api/bulk_analysis.py
+"""
+Offline bulk analysis, for pre-warming shared content.
+
+Videos go through the same two stages as /api/analyze/ (transcript and
+metadata, then Gemini) on a thread pool rather than a process pool: both
+stages spend their time waiting on the network with the GIL released, and
+threads share the rate gates and Django's setup without any IPC. The
+YouTube side is paced per request: every outbound fetch the pipeline
+reports (metadata, oEmbed, each transcript probe) waits for the fetch
+RateGate, and each Gemini call for the LLM one, so the pool stays under
+the providers' rate limits however many workers run. Results
+are stored in batches as shared content for the current model and prompt
+version, so a device analyzing one of the videos later gets it without a
+new analysis (see video_content.reusable).
+
+Finished videos are appended to a checkpoint file after each batch is
+committed. A rerun skips videos in the checkpoint and videos that already
+have current content, so an interrupted run resumes where it stopped.
+Results built on stand-in data (see analysis_core.unusable_reason) are not
+stored; they count as failures and are retried with --retry-failed.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import transaction
+
+from . import quota
+from . import transcript_index
+from . import video_content
+from . import log_events as events
+from .analysis_core import (
+    GEMINI_MODEL, PLACEHOLDER_TRANSCRIPT, PROMPT_VERSION, extract_youtube_id,
+    get_transcript_and_metadata, run_gemini_agent_workflow, snap_to_transcript, unusable_reason,
+)
+from .log_events import log_event
+from .models import VideoContent
+
+logger = logging.getLogger(__name__)
+
+
+def config():
+    """BULK_ANALYSIS settings with defaults."""
+    values = getattr(settings, 'BULK_ANALYSIS', {})
+    return {
+        'workers': values.get('WORKERS', 4),
+        'batch_size': values.get('BATCH_SIZE', 50),
+        'fetches_per_minute': values.get('FETCHES_PER_MINUTE', 60),
+        'llm_calls_per_minute': values.get('LLM_CALLS_PER_MINUTE', 60),
+    }
+
+
+class UnusableResult(Exception):
+    """The pipeline fell back to placeholder data; nothing worth storing."""
+
+
+class RateGate:
+    """Spaces calls from all threads at least 60/per_minute seconds apart (0: no limit)."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Checkpoint:
+    """Append-only record of finished videos, one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """{video_id: 'stored' | 'failed'}, latest entry winning."""
+        finished = {}
+        if not os.path.exists(self.path):
+            return finished
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line of an interrupted write
+                finished[entry['video_id']] = entry['status']
+        return finished
+
+    def append(self, entries):
+        if not entries:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class Progress:
+    """Counters for a run, with throughput since it started."""
+    __slots__ = ('total', 'stored', 'failed', 'started')
+
+    def __init__(self, total):
+        self.total = total
+        self.stored = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def done(self):
+        return self.stored + self.failed
+
+    def per_minute(self):
+        elapsed = time.monotonic() - self.started
+        return self.done * 60 / elapsed if elapsed else 0.0
+
+    def eta_seconds(self):
+        rate = self.per_minute()
+        return (self.total - self.done) * 60 / rate if rate else None
+
+
+def read_video_ids(lines):
+    """Video ids of the URLs in lines (blank lines and # comments skipped), deduplicated, plus the invalid lines."""
+    video_ids, invalid = [], []
+    seen = set()
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith('#'):
+            continue
+        try:
+            video_id = extract_youtube_id(url)
+        except ValueError:
+            invalid.append(url)
+            continue
+        if video_id not in seen:
+            seen.add(video_id)
+            video_ids.append(video_id)
+    return video_ids, invalid
+
+
+def pending(video_ids, checkpoint, retry_failed=False):
+    """The video ids still to analyze: not in the checkpoint and without current content."""
+    finished = checkpoint.load()
+    skip = {'stored'} if retry_failed else {'stored', 'failed'}
+    todo = [video_id for video_id in video_ids if finished.get(video_id) not in skip]
+    current = set()
+    for start in range(0, len(todo), 500):
+        current.update(VideoContent.objects.filter(
+            video_id__in=todo[start:start + 500], model_name=GEMINI_MODEL, prompt_version=PROMPT_VERSION,
+        ).values_list('video_id', flat=True))
+    return [video_id for video_id in todo if video_id not in current]
+
+
+def analyze(video_id, fetch_gate, llm_gate):
+    """Run the pipeline for one video; the result as store() arguments plus its caption segments."""
+    # Every YouTube request of the stage waits for the gate (see quota.record_fetch)
+    with quota.metered(before_fetch=fetch_gate.wait):
+        metadata = get_transcript_and_metadata(video_id)
+    if metadata['transcript'] == PLACEHOLDER_TRANSCRIPT:
+        raise UnusableResult("No transcript available")
+    llm_gate.wait()
+    highlights = run_gemini_agent_workflow(metadata['transcript'], metadata['title'], metadata['duration'])
+    reason = unusable_reason(metadata['title'], metadata['transcript'], highlights)
+    if reason:
+        raise UnusableResult(reason)
+    highlights = snap_to_transcript(highlights, metadata['segments'])
+    return {
+        'video_id': video_id,
+        'title': metadata['title'],
+        'duration': metadata['duration'],
+        'thumbnail_url': metadata['thumbnailUrl'],
+        'highlights': highlights,
+        'model_name': GEMINI_MODEL,
+        'prompt_version': PROMPT_VERSION,
+        'segments': metadata['segments'],
+    }
+
+
+def _flush(results, failures, checkpoint, progress):
+    """Store a batch of results, then checkpoint it together with the failures."""
+    if results:
+        transcripts = {result['video_id']: result.pop('segments') for result in results}
+        with transaction.atomic():
+            video_content.store_many(results)
+            transcript_index.index_transcripts(transcripts)
+    checkpoint.append(
+        [{'video_id': result['video_id'], 'status': 'stored'} for result in results]
+        + [{'video_id': video_id, 'status': 'failed', 'error': error} for video_id, error in failures]
+    )
+    progress.stored += len(results)
+    progress.failed += len(failures)
+
+
+def run(video_ids, checkpoint, workers, batch_size, fetches_per_minute, llm_calls_per_minute, on_progress=None):
+    """
+    Analyze video_ids and store the results, batch_size at a time. Calls
+    on_progress(progress) after each batch. On KeyboardInterrupt, videos
+    already in flight finish and everything done is stored and
+    checkpointed before it propagates.
+    """
+    progress = Progress(len(video_ids))
+    fetch_gate, llm_gate = RateGate(fetches_per_minute), RateGate(llm_calls_per_minute)
+    results, failures = [], []
+    queue = iter(video_ids)
+    in_flight = {}
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-analysis')
+    try:
+        # Keep a bounded number of videos in flight, so an interrupt loses little work
+        for video_id in queue:
+            in_flight[executor.submit(analyze, video_id, fetch_gate, llm_gate)] = video_id
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                video_id = in_flight.pop(future)
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    log_event(logger, events.BULK_ANALYSIS_FAILED, level=logging.WARNING, video_id=video_id, error=e)
+                    failures.append((video_id, str(e)))
+                next_id = next(queue, None)
+                if next_id is not None:
+                    in_flight[executor.submit(analyze, next_id, fetch_gate, llm_gate)] = next_id
+            if len(results) + len(failures) >= batch_size:
+                _flush(results, failures, checkpoint, progress)
+                results, failures = [], []
+                if on_progress:
+                    on_progress(progress)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future, video_id in in_flight.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                results.append(future.result())
+        _flush(results, failures, checkpoint, progress)
+    if on_progress:
+        on_progress(progress)
+    log_event(
+        logger, events.BULK_ANALYSIS_COMPLETED, stored=progress.stored, failed=progress.failed,
+        per_minute=round(progress.per_minute(), 1),
+    )
+    return progress
@@ -0,0 +1,68 @@
+# analysis_api/cold_storage.py
+"""
+Compressed encoding for analysis payloads in cold storage.
+
+Content nobody has read for a while keeps its highlights and summary in a
+single zlib-compressed column instead of the plain JSON/text columns (see
+VideoContent.freeze(), run in batches by
+video_content.compact_cold_storage()), and VideoContent decompresses it
+lazily the first time those attributes are read. Highlight payloads are
+small and repeat the same keys and agent names, so compression primes zlib
+with a preset dictionary of them; the leading format byte pins the
+dictionary, so it must never change for an existing format. Migrations
+keep their own copy of what they need rather than importing this module.
+"""
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, as in renderers.py
+    orjson = None
+
+FORMAT_ZLIB_V1 = 1
+
+# Strings every highlight payload repeats (see the prompt in analysis_core);
+# zlib favours the end of the dictionary, so the most frequent go last
+_ZDICT_V1 = (
+    b' that the video viewers which this with from their about and the '
+    b'"}],"analysis_summary":""}'
+    b'"},{"agent":"The Explorer","timestamp":"'
+    b'"},{"agent":"The Analyst","timestamp":"'
+    b'"},{"agent":"The Teacher","timestamp":"'
+    b'","title":"","description":"The video '
+    b'{"highlights":[{"agent":"The Teacher","timestamp":"'
+)
+
+_DICTIONARIES = {FORMAT_ZLIB_V1: _ZDICT_V1}
+
+COMPRESSION_LEVEL = 9
+
+
+def _dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pack(highlights, analysis_summary) -> bytes:
+    """Compress an analysis payload for the cold_payload column."""
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=_ZDICT_V1)
+    body = compressor.compress(_dumps({'highlights': highlights, 'analysis_summary': analysis_summary}))
+    return bytes([FORMAT_ZLIB_V1]) + body + compressor.flush()
+
+
+def unpack(payload) -> dict:
+    """Decode pack() output back into {'highlights': ..., 'analysis_summary': ...}."""
+    payload = bytes(payload)  # Drivers may hand back a memoryview
+    zdict = _DICTIONARIES.get(payload[0])
+    if zdict is None:
+        raise ValueError(f"Unknown cold storage format {payload[0]}")
+    decompressor = zlib.decompressobj(zdict=zdict)
+    return _loads(decompressor.decompress(payload[1:]) + decompressor.flush())
@@ -0,0 +1,138 @@
+# analysis_api/compression.py
+"""
+Negotiated response compression (brotli or gzip) above a size threshold.
+
+Analysis payloads are mostly repetitive English text, so they compress
+4-6x; phones on slow links gain far more from that than the server spends.
+Brotli is preferred when the client accepts it and the optional `brotli`
+package is installed. gzip follows Django's implementation (including its
+BREACH padding) but at COMPRESSION_GZIP_LEVEL instead of a fixed 6: most
+mobile HTTP stacks only send `Accept-Encoding: gzip`, and level 6 spends
+about 5x the CPU of level 4 on a history page for ~5% fewer bytes.
+Bodies under COMPRESSION_MIN_SIZE are sent as-is.
+"""
+import gzip
+import secrets
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import StreamingBuffer
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip only without it
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_BROTLI_QUALITY = 4  # Dynamic responses: far faster than 11 for a few % size
+DEFAULT_GZIP_LEVEL = 4
+GZIP_RANDOM_BYTES = 100
+
+
+def _accepted_encodings(header):
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header):
+    """Pick 'br', 'gzip' or None for an Accept-Encoding header."""
+    accepted = _accepted_encodings(header or '')
+    wildcard = accepted.get('*', 0.0)
+    candidates = [('br', accepted.get('br', wildcard))] if brotli else []
+    candidates.append(('gzip', accepted.get('gzip', wildcard)))
+    # Highest q wins; on ties the earlier (smaller output) coding is kept
+    encoding, q = max(candidates, key=lambda candidate: candidate[1])
+    return encoding if q > 0 else None
+
+
+def _random_filename():
+    # Random-length FNAME header, as in django.utils.text (BREACH mitigation)
+    return b'a' * secrets.randbelow(GZIP_RANDOM_BYTES)
+
+
+def gzip_compress(data, level=DEFAULT_GZIP_LEVEL):
+    """gzip `data` at `level`, padded like django.utils.text.compress_string."""
+    compressed = memoryview(gzip.compress(data, compresslevel=level, mtime=0))
+    header = bytearray(compressed[:10])
+    header[3] = gzip.FNAME
+    return bytes(header) + _random_filename() + b'\x00' + compressed[10:]
+
+
+def _gzip_stream(chunks, level):
+    buf = StreamingBuffer()
+    with gzip.GzipFile(filename=_random_filename(), mode='wb', compresslevel=level, fileobj=buf, mtime=0) as zfile:
+        yield buf.read()
+        for chunk in chunks:
+            zfile.write(chunk)
+            data = buf.read()
+            if data:
+                yield data
+    yield buf.read()
+
+
+def _brotli_stream(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        # Flush per chunk so streamed responses still arrive incrementally
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the best encoding the client accepts."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return response
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+        if response.streaming and response.is_async:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+        level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', DEFAULT_GZIP_LEVEL)
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = _brotli_stream(response.streaming_content, quality)
+            else:
+                response.streaming_content = _gzip_stream(response.streaming_content, level)
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=quality)
+            else:
+                compressed = gzip_compress(response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The bytes differ per encoding, so a strong ETag must become weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,65 @@
+# analysis_api/conditional.py
+"""
+Conditional GET for per-device read endpoints.
+
+A device's responses can only change when one of its analyses or bookmarks
+is written, and every such write bumps DeviceStats.version. The ETag is a
+hash of that version, the request path with its query string, and today's
+date (stats count "this week"), so a client revalidating with If-None-Match
+gets a 304 after one primary-key read, before the view runs any query.
+"""
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import device_stats
+
+
+def _etag(request, stats):
+    today = timezone.localdate().isoformat()
+    key = f"{stats.device_id}|{stats.version}|{today}|{request.get_full_path()}"
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest()[:32])
+
+
+def _last_modified(stats):
+    # Day rollover changes "this week" without a write, so never report
+    # anything older than the start of today
+    start_of_day = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    if stats.updated_at is None:
+        return start_of_day
+    return max(stats.updated_at, start_of_day)
+
+
+def etag_on_device_version(view_func):
+    """
+    Decorator for GET views whose response depends only on the device's
+    analyses and bookmarks: sets ETag / Last-Modified on 200 responses and
+    answers matching If-None-Match / If-Modified-Since with 304.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        device_id = getattr(request, 'device_id', None)
+        if request.method not in ('GET', 'HEAD') or not device_id:
+            return view_func(request, *args, **kwargs)
+
+        stats = device_stats.for_request(request)
+        etag = _etag(request, stats)
+        last_modified = _last_modified(stats)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if not_modified is not None:
+            return not_modified
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+            # Revalidate every time; the 304 path is cheap
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
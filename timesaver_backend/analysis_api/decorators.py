@@ -10,11 +10,24 @@ def add_rate_limit_headers(view_func):
     def wrapper(request, *args, **kwargs):
         response = view_func(request, *args, **kwargs)
         
-        # Add rate limiting headers if available
-        if hasattr(request, 'rate_limit_remaining'):
-            response['X-RateLimit-Remaining'] = str(request.rate_limit_remaining)
-        if hasattr(request, 'rate_limit_reset'):
-            response['X-RateLimit-Reset'] = str(request.rate_limit_reset)
+        # Add rate limiting headers if available. Metered endpoints also
+        # draw from a work-unit budget (see quota.py); the standard headers
+        # report whichever of the two runs out first
+        remaining = getattr(request, 'rate_limit_remaining', None)
+        reset = getattr(request, 'rate_limit_reset', None)
+        if hasattr(request, 'work_budget_remaining'):
+            if remaining is None or request.work_budget_remaining < remaining:
+                remaining = request.work_budget_remaining
+                reset = request.work_budget_reset
+            elif request.work_budget_remaining == remaining:
+                reset = max(reset or 0, request.work_budget_reset)
+            response['X-RateLimit-Budget-Limit'] = str(request.work_budget_limit)
+            response['X-RateLimit-Budget-Remaining'] = str(request.work_budget_remaining)
+            response['X-RateLimit-Budget-Reset'] = str(request.work_budget_reset)
+        if remaining is not None:
+            response['X-RateLimit-Remaining'] = str(remaining)
+        if reset is not None:
+            response['X-RateLimit-Reset'] = str(reset)
         
         return response
     
@@ -0,0 +1,165 @@
+# analysis_api/device_stats.py
+"""
+Incrementally maintained per-device statistics.
+
+Each analysis created or deleted adjusts its device's DeviceStats row by
+its own contribution (one analysis, N highlights, its duration, one
+analysis in that day's bucket), so /api/stats/ is a primary-key read
+instead of a scan over every analysis and its highlights JSON. Only the
+last BUCKET_DAYS daily buckets are kept; they answer "this week".
+
+The buckets are daily rather than weekly because "this week" is the last
+seven days, not the calendar week: a weekly bucket can't say how much of
+it falls inside a window that moves every day, while seven daily buckets
+sum to it exactly. They also stay small enough to live on the row.
+rebuild() recomputes rows from scratch after bulk writes or drift.
+
+Every write to a device's analyses or bookmarks also bumps the row's
+version, which conditional.py turns into ETags for the read endpoints.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cold_storage
+from .models import DeviceStats, VideoAnalysis
+
+BUCKET_DAYS = 7
+
+
+def duration_seconds(duration) -> int:
+    """Parse "M:SS" or "H:MM:SS" into seconds; anything else counts as 0."""
+    seconds = 0
+    try:
+        for part in str(duration).split(':'):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return 0
+    return max(seconds, 0)
+
+
+def _highlight_count(highlights) -> int:
+    return len(highlights) if isinstance(highlights, list) else 0
+
+
+def _day(created_at) -> str:
+    return timezone.localdate(created_at).isoformat()
+
+
+def _prune(daily_counts, today=None):
+    """Drop buckets older than BUCKET_DAYS and empty ones."""
+    today = today or timezone.localdate()
+    oldest = (today - timezone.timedelta(days=BUCKET_DAYS - 1)).isoformat()
+    return {day: count for day, count in daily_counts.items() if day >= oldest and count > 0}
+
+
+def _apply(device_id, sign, highlights, duration, created_at):
+    """Add (sign=1) or remove (sign=-1) one analysis' contribution."""
+    day = _day(created_at)
+    with transaction.atomic():
+        stats, _ = DeviceStats.objects.select_for_update().get_or_create(device_id=device_id)
+        DeviceStats.objects.filter(pk=device_id).update(
+            analysis_count=F('analysis_count') + sign,
+            highlight_count=F('highlight_count') + sign * _highlight_count(highlights),
+            total_seconds=F('total_seconds') + sign * duration_seconds(duration),
+            daily_counts=_prune({**stats.daily_counts, day: stats.daily_counts.get(day, 0) + sign}),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+
+
+def analysis_added(analysis):
+    _apply(analysis.device_id, 1, analysis.highlights, analysis.duration, analysis.created_at)
+
+
+def analysis_removed(analysis):
+    _apply(analysis.device_id, -1, analysis.highlights, analysis.duration, analysis.created_at)
+
+
+def analysis_changed(analysis, previous):
+    """Adjust for an in-place update; previous is (highlights, duration) before the save."""
+    old_highlights, old_duration = previous
+    highlight_delta = _highlight_count(analysis.highlights) - _highlight_count(old_highlights)
+    seconds_delta = duration_seconds(analysis.duration) - duration_seconds(old_duration)
+    DeviceStats.objects.filter(pk=analysis.device_id).update(
+        highlight_count=F('highlight_count') + highlight_delta,
+        total_seconds=F('total_seconds') + seconds_delta,
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def bump_version(device_id):
+    """Mark the device's data as changed without touching the aggregates (bookmark writes)."""
+    updated = DeviceStats.objects.filter(pk=device_id).update(version=F('version') + 1, updated_at=timezone.now())
+    if not updated:
+        DeviceStats.objects.get_or_create(device_id=device_id, defaults={'version': 1})
+
+
+def get_stats(device_id):
+    """The device's stats row (unsaved and zeroed if it has no analyses yet)."""
+    try:
+        return DeviceStats.objects.get(pk=device_id)
+    except DeviceStats.DoesNotExist:
+        return DeviceStats(device_id=device_id)
+
+
+def for_request(request):
+    """get_stats() for the request's device, read at most once per request."""
+    stats = getattr(request, '_device_stats', None)
+    if stats is None:
+        stats = request._device_stats = get_stats(request.device_id)
+    return stats
+
+
+def recent_count(stats) -> int:
+    """Analyses created in the last BUCKET_DAYS days, including today."""
+    return sum(_prune(stats.daily_counts).values())
+
+
+def rebuild(device_ids=None):
+    """
+    Recompute stats from VideoAnalysis for the given devices (all devices
+    if None). Returns the number of device rows written.
+    """
+    analyses = VideoAnalysis.objects.order_by()
+    if device_ids is not None:
+        analyses = analyses.filter(device_id__in=device_ids)
+
+    today = timezone.localdate()
+    totals = {}
+    rows = analyses.values_list(
+        'device_id', 'content__highlights_data', 'content__cold_payload', 'content__duration', 'created_at'
+    )
+    for device_id, highlights, cold_payload, duration, created_at in rows.iterator(chunk_size=2000):
+        stats = totals.get(device_id)
+        if stats is None:
+            stats = totals[device_id] = DeviceStats(device_id=device_id, daily_counts={})
+        if cold_payload is not None:
+            highlights = cold_storage.unpack(cold_payload)['highlights']
+        stats.analysis_count += 1
+        stats.highlight_count += _highlight_count(highlights)
+        stats.total_seconds += duration_seconds(duration)
+        day = _day(created_at)
+        stats.daily_counts[day] = stats.daily_counts.get(day, 0) + 1
+
+    for stats in totals.values():
+        stats.daily_counts = _prune(stats.daily_counts, today)
+
+    with transaction.atomic():
+        stale = DeviceStats.objects.all()
+        if device_ids is not None:
+            stale = stale.filter(device_id__in=device_ids)
+        # Versions only move forward, or clients could get stale 304s, and
+        # sync floors must survive, or compacted cursors would replay
+        previous = {device_id: (version, sync_floor) for device_id, version, sync_floor
+                    in stale.values_list('device_id', 'version', 'sync_floor')}
+        for device_id in previous.keys() - totals.keys():
+            totals[device_id] = DeviceStats(device_id=device_id)
+        for stats in totals.values():
+            version, sync_floor = previous.get(stats.device_id, (0, 0))
+            stats.version = version + 1
+            stats.sync_floor = sync_floor
+        stale.delete()
+        DeviceStats.objects.bulk_create(totals.values(), batch_size=500)
+    return len(totals)
@@ -0,0 +1,311 @@
+# analysis_api/embeddings.py
+"""
+Local semantic search over analysis titles and highlights.
+
+Text is embedded without any network call. The default embedder,
+hashed_embedding(), hashes words, word pairs and character trigrams into
+signed DIM-dimensional vectors. That catches inflections and shared word
+parts. Matching true paraphrases ("cost" vs "price") needs a local model,
+configured as SEMANTIC_SEARCH['EMBEDDER'].
+
+Each device's vectors form one contiguous float32 matrix on disk: a row
+for each analysis title and one per highlight. A file of int64 row keys
+sits next to it. Both are memory-mapped at query time, so a search is one
+matrix-vector product plus a partial sort for the top rows.
+
+New analyses are appended to their device's matrix when they are saved.
+Edits and deletes drop the device's files, and the next search rebuilds
+them from the database. A search also rebuilds when the matrix holds a
+different number of analyses than the device has, so missed writes (bulk
+operations, crashes) repair themselves.
+
+NumPy is in requirements.txt. If it is missing anyway, is_available() is
+False and search views fall back to keyword search.
+"""
+import contextlib
+import functools
+import hashlib
+import os
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import VideoAnalysis
+from .search_index import device_token
+
+try:
+    import numpy as np
+except ImportError:  # Semantic search is unavailable without it
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+# Row key = analysis id * KEY_STRIDE + highlight index + 1 (0 is the title row)
+KEY_STRIDE = 1024
+
+# Too common to say anything about meaning
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have in into is it its of on or so that the their this '
+    'to was were what when which who will with you your'.split()
+)
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+def _config():
+    config = getattr(settings, 'SEMANTIC_SEARCH', {})
+    return {
+        'dir': config.get('DIR') or os.path.join(settings.RUNTIME_DIR, 'embeddings'),
+        'embedder': config.get('EMBEDDER', 'analysis_api.embeddings.hashed_embedding'),
+        'dim': config.get('DIM', 256),
+        'min_score': config.get('MIN_SCORE', 0.1),
+    }
+
+
+def _hash(feature):
+    # crc32 rather than hash(): vectors must match across processes
+    return zlib.crc32(feature.encode())
+
+
+@functools.lru_cache(maxsize=65536)
+def _word_features(word, dim):
+    """(hash, columns, values) of a word and its character trigrams; words repeat, so this is cached."""
+    padded = f'#{word}#'
+    digests = np.array([_hash(word)] + [_hash(padded[start:start + 3]) for start in range(len(padded) - 2)], dtype=np.int64)
+    weights = np.full(len(digests), 0.5)
+    weights[0] = 1.0
+    return int(digests[0]), (digests >> 1) % dim, np.where(digests & 1, weights, -weights)
+
+
+def hashed_embedding(texts, dim):
+    """
+    Signed feature-hashing vectors for texts, as a (len(texts), dim) float32
+    array: words, their character trigrams and adjacent word pairs.
+    """
+    # Python only walks the words; their features are expanded by NumPy
+    # from a table holding each distinct word once
+    word_ids, occurrence_rows, occurrence_ids = {}, [], []
+    for row, text in enumerate(texts):
+        for word in re.findall(r'\w+', text.lower()):
+            if word not in STOPWORDS:
+                occurrence_rows.append(row)
+                occurrence_ids.append(word_ids.setdefault(word, len(word_ids)))
+    if not occurrence_ids:
+        return np.zeros((len(texts), dim), dtype=np.float32)
+    table = [_word_features(word, dim) for word in word_ids]
+    lengths = np.array([len(columns) for _, columns, _ in table])
+    starts = np.cumsum(lengths) - lengths
+    table_columns = np.concatenate([columns for _, columns, _ in table])
+    table_values = np.concatenate([values for _, _, values in table])
+
+    occurrence_rows = np.array(occurrence_rows, dtype=np.int64)
+    occurrence_ids = np.array(occurrence_ids, dtype=np.int64)
+    counts = lengths[occurrence_ids]
+    positions = np.arange(counts.sum()) + np.repeat(starts[occurrence_ids] - (np.cumsum(counts) - counts), counts)
+    columns = [table_columns[positions] + np.repeat(occurrence_rows * dim, counts)]
+    values = [table_values[positions]]
+
+    # Word pairs, hashed from their words' hashes so no pair goes through Python
+    word_hashes = np.array([digest for digest, _, _ in table], dtype=np.uint64)[occurrence_ids]
+    same_text = occurrence_rows[1:] == occurrence_rows[:-1]
+    pairs = (word_hashes[:-1][same_text] * np.uint64(0x9E3779B1) + word_hashes[1:][same_text]) & np.uint64(0xFFFFFFFF)
+    columns.append(((pairs >> np.uint64(1)) % np.uint64(dim)).astype(np.int64) + occurrence_rows[1:][same_text] * dim)
+    values.append(np.where(pairs & np.uint64(1), 0.5, -0.5))
+
+    sums = np.bincount(np.concatenate(columns), weights=np.concatenate(values), minlength=len(texts) * dim)
+    return sums.reshape(len(texts), dim).astype(np.float32)
+
+
+def embed(texts):
+    """Unit-length embeddings of texts with the configured embedder."""
+    config = _config()
+    matrix = np.asarray(import_string(config['embedder'])(list(texts), config['dim']), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _rows_for(analysis):
+    """(key, text) rows for one analysis: its title, then one per highlight."""
+    base = analysis.id * KEY_STRIDE
+    rows = [(base, analysis.title or '')]
+    highlights = analysis.highlights if isinstance(analysis.highlights, list) else []
+    for index, highlight in enumerate(highlights[:KEY_STRIDE - 1]):
+        if isinstance(highlight, dict):
+            rows.append((base + index + 1, f"{highlight.get('title', '')}. {highlight.get('description', '')}"))
+    return rows
+
+
+# --- Per-device files ---
+
+def _paths(device_id):
+    """Vector, key and lock files of a device; named after the embedder, so changing it starts over."""
+    config = _config()
+    fingerprint = hashlib.sha1(f"{config['embedder']}:{config['dim']}".encode()).hexdigest()[:8]
+    stem = os.path.join(config['dir'], f'{device_token(device_id)}-{fingerprint}')
+    return stem + '.f32', stem + '.keys', stem + '.lock'
+
+
+@contextlib.contextmanager
+def _locked(lock_path, exclusive):
+    """Writers (exclusive) and readers of a device's files exclude each other across processes."""
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _write(analyses, vector_path, key_path, mode):
+    rows = [row for analysis in analyses for row in _rows_for(analysis)]
+    if not rows:
+        return
+    with open(vector_path, mode) as vector_file, open(key_path, mode) as key_file:
+        vector_file.write(embed([text for _, text in rows]).tobytes())
+        key_file.write(np.array([key for key, _ in rows], dtype=np.int64).tobytes())
+
+
+def rebuild(device_id):
+    """Re-embed all of a device's analyses into fresh files."""
+    vector_path, key_path, lock_path = _paths(device_id)
+    with _locked(lock_path, exclusive=True):
+        # New files swapped in whole: readers still mapping the old ones keep valid pages
+        temp_vectors, temp_keys = vector_path + '.tmp', key_path + '.tmp'
+        for path in (temp_vectors, temp_keys):
+            open(path, 'wb').close()
+        analyses = VideoAnalysis.objects.filter(device_id=device_id).select_related('content').order_by('id')
+        batch = []
+        for analysis in analyses.iterator(chunk_size=500):
+            batch.append(analysis)
+            if len(batch) >= 500:
+                _write(batch, temp_vectors, temp_keys, 'ab')
+                batch = []
+        _write(batch, temp_vectors, temp_keys, 'ab')
+        os.replace(temp_vectors, vector_path)
+        os.replace(temp_keys, key_path)
+
+
+def append_analyses(analyses):
+    """Add new analyses to their devices' matrices (devices without one build it on their first search)."""
+    if not is_available():
+        return
+    by_device = {}
+    for analysis in analyses:
+        by_device.setdefault(analysis.device_id, []).append(analysis)
+    for device_id, device_analyses in by_device.items():
+        vector_path, key_path, lock_path = _paths(device_id)
+        if not os.path.exists(key_path):
+            continue
+        with _locked(lock_path, exclusive=True):
+            _write(device_analyses, vector_path, key_path, 'ab')
+
+
+def invalidate(device_id):
+    """Drop a device's files after an edit or delete; the next search rebuilds them."""
+    if not is_available():
+        return
+    vector_path, key_path, lock_path = _paths(device_id)
+    with _locked(lock_path, exclusive=True):
+        for path in (vector_path, key_path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+def _load(device_id, analysis_count):
+    """(matrix, keys) memory-mapped from the device's files, rebuilt first if stale."""
+    vector_path, key_path, lock_path = _paths(device_id)
+    dim = _config()['dim']
+    for attempt in range(2):
+        with _locked(lock_path, exclusive=False):
+            try:
+                rows = os.path.getsize(key_path) // 8
+                intact = os.path.getsize(vector_path) == rows * dim * 4
+            except FileNotFoundError:
+                rows, intact = 0, False
+            if intact and rows:
+                # Writers only append or swap in new files, so the mapping
+                # stays valid after the lock is released
+                keys = np.memmap(key_path, dtype=np.int64, mode='r', shape=(rows,))
+                matrix = np.memmap(vector_path, dtype=np.float32, mode='r', shape=(rows, dim))
+            else:
+                keys, matrix = np.zeros(0, dtype=np.int64), np.zeros((0, dim), dtype=np.float32)
+        if intact and np.count_nonzero(keys % KEY_STRIDE == 0) == analysis_count:
+            break
+        if attempt == 0:
+            rebuild(device_id)
+    return matrix, keys
+
+
+def search(device_id, query, analysis_count, limit=50):
+    """
+    Semantic search over one device's analyses. analysis_count is how many
+    the device has (DeviceStats), to detect a stale matrix. Returns
+    [(analysis_id, highlight_index, score)], best first, one per analysis
+    and none below MIN_SCORE; highlight_index -1 means the title matched best.
+    """
+    if not query.strip():
+        return []
+    matrix, keys = _load(device_id, analysis_count)
+    if not len(keys):
+        return []
+    scores = matrix @ embed([query])[0]
+
+    # An analysis has several rows; take extra so one hit per analysis still fills the page
+    count = min(len(scores), limit * 5)
+    top = np.argpartition(scores, len(scores) - count)[len(scores) - count:]
+    top = top[np.argsort(scores[top])[::-1]]
+
+    results = []
+    seen = set()
+    min_score = _config()['min_score']
+    for row in top:
+        if scores[row] < min_score:
+            break  # Sorted, so the rest only share hash collisions with the query
+        analysis_id, offset = divmod(int(keys[row]), KEY_STRIDE)
+        if analysis_id in seen:
+            continue
+        seen.add(analysis_id)
+        results.append((analysis_id, offset - 1, float(scores[row])))
+        if len(results) >= limit:
+            break
+    return results
+
+
+def search_analyses(queryset, device_id, query, analysis_count, limit=50):
+    """
+    Like search_index.search_analyses() but semantic: (analyses, matches)
+    where matches maps analysis id to its best-matching highlight.
+    """
+    hits = search(device_id, query, analysis_count, limit)
+    ids = [analysis_id for analysis_id, _, _ in hits]
+    by_id = queryset.filter(device_id=device_id).in_bulk(ids)
+    # queryset may defer the highlights (?fields=); read them in one go instead of per analysis
+    highlights_by_id = {
+        analysis.id: analysis.highlights
+        for analysis in VideoAnalysis.objects.select_related('content').filter(id__in=[
+            analysis_id for analysis_id, highlight_index, _ in hits if highlight_index >= 0
+        ])
+    }
+    analyses, matches = [], {}
+    for analysis_id, highlight_index, score in hits:
+        if analysis_id not in by_id:
+            continue
+        highlights = highlights_by_id.get(analysis_id)
+        highlight = highlights[highlight_index] if isinstance(highlights, list) and 0 <= highlight_index < len(highlights) else {}
+        if not isinstance(highlight, dict):
+            highlight = {}
+        analyses.append(by_id[analysis_id])
+        matches[analysis_id] = {
+            'highlight_index': highlight_index,
+            'highlight_title': highlight.get('title') or None,
+            'timestamp': highlight.get('timestamp') or None,
+            'snippet': None,
+            'score': round(score, 4),
+        }
+    return analyses, matches
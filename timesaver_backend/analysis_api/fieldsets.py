@@ -0,0 +1,54 @@
+# analysis_api/fieldsets.py
+"""
+Sparse fieldsets for list endpoints.
+
+Clients pass ?fields=title,thumbnailUrl,created_at to get only those keys
+of each analysis. The requested API keys map to model columns that are
+pushed into the query with .only(), so unrequested columns (notably the
+shared highlights JSON) are neither read nor deserialized.
+"""
+from .models import VideoAnalysis
+
+# Used by ?view=summary on history: what a list screen shows
+SUMMARY_FIELDS = ('id', 'title', 'duration', 'thumbnailUrl', 'created_at', 'video_url')
+
+
+class InvalidFields(ValueError):
+    """The fields parameter names keys analyses don't have."""
+
+
+def parse_fields(value):
+    """
+    Parse a comma-separated fields param into a tuple of API keys in
+    to_dict() order, or None for all fields. `id` is always included.
+    """
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(VideoAnalysis.API_FIELDS)
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    requested.add('id')
+    return tuple(name for name in VideoAnalysis.API_FIELDS if name in requested)
+
+
+def model_fields(fields, prefix='', extra=()):
+    """
+    Column names for .only(): the model fields behind `fields`, plus
+    `extra`, plus updated_at (part of the fragment cache key). Attributes
+    stored on VideoContent map to content__ columns, so the queryset must
+    select_related the content.
+    """
+    names = [VideoAnalysis.API_FIELDS[name] for name in fields] + list(extra) + ['updated_at']
+    # last_read_at lets video_content.mark_read() skip fresh stamps
+    columns = ['content', 'content__id', 'content__last_read_at']
+    for name in names:
+        if name in VideoAnalysis.CONTENT_FIELDS:
+            columns.extend('content__' + column for column in VideoAnalysis.CONTENT_FIELDS[name])
+        else:
+            columns.append(name)
+    return [prefix + name for name in dict.fromkeys(columns)]
+
+
+def error_payload(error):
+    return {"error": str(error), "allowed_fields": list(VideoAnalysis.API_FIELDS)}
@@ -0,0 +1,123 @@
+# analysis_api/fragments.py
+"""
+Pre-serialized analysis fragments.
+
+An analysis only changes when it is saved (which moves updated_at), so its
+JSON encoding can be reused across requests. Encoded to_dict() bytes are
+kept in a per-process LRU bounded by total size and keyed by
+(id, updated_at, fields); list responses embed them as orjson.Fragment
+objects, which ORJSONRenderer copies into the body without re-encoding the
+highlights. Per-response keys (match, bookmark_id, ...) are spliced onto a
+cached fragment. Without orjson, plain dicts are returned instead.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import metrics
+from .renderers import dumps, orjson
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class FragmentCache:
+    """Thread-safe LRU of encoded fragments, bounded by total bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+    def put(self, key, content):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = content
+            self._size += len(content)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = FragmentCache(getattr(settings, 'FRAGMENT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+
+def _encoded(analysis, fields):
+    """(bytes, was_cached) for analysis.to_dict(fields)."""
+    key = (analysis.id, analysis.updated_at, fields)
+    content = _cache.get(key)
+    if content is not None:
+        return content, True
+    content = dumps(analysis.to_dict(fields))
+    _cache.put(key, content)
+    return content, False
+
+
+def _splice(content, extra):
+    """Add extra keys to an encoded JSON object: {...} + {...} -> {..., ...}."""
+    if not extra:
+        return content
+    return content[:-1] + b',' + dumps(extra)[1:]
+
+
+def render_analysis(analysis, fields=None, extra=None):
+    """One analysis as a response value: an orjson.Fragment, or a dict without orjson."""
+    if orjson is None:
+        data = analysis.to_dict(fields)
+        data.update(extra or {})
+        return data
+    content, cached = _encoded(analysis, fields)
+    if cached:
+        metrics.inc(metrics.CACHE_HITS, kind='fragment')
+    return orjson.Fragment(_splice(content, extra))
+
+
+def render_analyses(analyses, fields=None, extras=None):
+    """
+    Many analyses as response values. extras, if given, is a parallel list
+    of per-item dicts of additional keys.
+    """
+    if orjson is None:
+        items = []
+        for index, analysis in enumerate(analyses):
+            data = analysis.to_dict(fields)
+            if extras is not None:
+                data.update(extras[index] or {})
+            items.append(data)
+        return items
+
+    items = []
+    hits = 0
+    for index, analysis in enumerate(analyses):
+        content, cached = _encoded(analysis, fields)
+        hits += cached
+        extra = extras[index] if extras is not None else None
+        items.append(orjson.Fragment(_splice(content, extra)))
+    if hits:
+        metrics.inc(metrics.CACHE_HITS, amount=hits, kind='fragment')
+    return items
+
+
+def clear():
+    """Drop every cached fragment (tests, benchmarks)."""
+    _cache.clear()
@@ -0,0 +1,166 @@
+# analysis_api/log_events.py
+"""
+Structured, low-overhead logging shared by the pipeline, middleware and views.
+
+Every log line is an *event* with a stable dotted name and a flat dict of
+fields. Events below WARNING can be sampled per event name through
+LOG_EVENT_SAMPLING, level checks happen before any formatting work, and the
+message itself is only rendered by the queue listener thread, so the request
+thread pays for an enqueue rather than for console I/O.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+from django.conf import settings
+
+# --- Event names ---
+# Request gate (middleware / rate limiting)
+DEVICE_AUTHENTICATED = 'device.authenticated'
+DEVICE_REJECTED = 'device.rejected'
+RATE_LIMIT_PASSED = 'rate_limit.passed'
+RATE_LIMIT_EXCEEDED = 'rate_limit.exceeded'
+RATE_LIMIT_BACKEND_DOWN = 'rate_limit.backend_down'
+QUOTA_CHARGED = 'quota.charged'
+QUOTA_EXHAUSTED = 'quota.exhausted'
+
+# Analysis pipeline (analysis_core)
+GEMINI_INITIALIZED = 'gemini.initialized'
+GEMINI_INIT_FAILED = 'gemini.init_failed'
+GEMINI_FAILED = 'gemini.failed'
+METADATA_FETCHED = 'metadata.fetched'
+METADATA_FALLBACK = 'metadata.fallback'
+TRANSCRIPT_FETCHED = 'transcript.fetched'
+TRANSCRIPT_PROBE_FAILED = 'transcript.probe_failed'
+TRANSCRIPT_FALLBACK = 'transcript.fallback'
+PROVIDER_STUBS_INSTALLED = 'provider_stubs.installed'
+
+# Analysis lifecycle (views)
+ANALYSIS_CACHE_HIT = 'analysis.cache_hit'
+ANALYSIS_STARTED = 'analysis.started'
+ANALYSIS_SAVED = 'analysis.saved'
+ANALYSIS_SAVE_FAILED = 'analysis.save_failed'
+ANALYSIS_FAILED = 'analysis.failed'
+ANALYSIS_DELETED = 'analysis.deleted'
+INVALID_URL = 'analysis.invalid_url'
+
+# Background jobs (simple_progress / analysis_core_progress)
+JOB_CREATED = 'job.created'
+JOB_COMPLETED = 'job.completed'
+JOB_FAILED = 'job.failed'
+JOB_PROGRESS = 'job.progress'
+JOB_POLLED = 'job.polled'
+JOB_NOT_FOUND = 'job.not_found'
+
+# Offline bulk analysis (bulk_analysis)
+BULK_ANALYSIS_FAILED = 'bulk_analysis.failed'
+BULK_ANALYSIS_COMPLETED = 'bulk_analysis.completed'
+
+# Read endpoints (views)
+HISTORY_SERVED = 'history.served'
+SEARCH_SERVED = 'search.served'
+TRANSCRIPT_SEARCH_SERVED = 'transcript_search.served'
+STATS_SERVED = 'stats.served'
+BOOKMARK_ADDED = 'bookmark.added'
+BOOKMARK_REMOVED = 'bookmark.removed'
+BOOKMARKS_SERVED = 'bookmarks.served'
+BOOKMARKS_BULK_UPDATED = 'bookmarks.bulk_updated'
+SYNC_SERVED = 'sync.served'
+HISTORY_EXPORTED = 'history.exported'
+HISTORY_IMPORTED = 'history.imported'
+REQUEST_FAILED = 'request.failed'
+
+
+class EventMessage:
+    """Log message that is only rendered when a handler actually formats it."""
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        if not self.fields:
+            return self.event
+        details = ' '.join(f'{key}={value}' for key, value in self.fields.items())
+        return f'{self.event} {details}'
+
+
+def _sample_rate(event):
+    return getattr(settings, 'LOG_EVENT_SAMPLING', {}).get(event, 1.0)
+
+
+def log_event(logger, event, level=logging.INFO, **fields):
+    """
+    Log a structured event. Cheap when the level is disabled or the event
+    is sampled out; WARNING and above are never sampled.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING:
+        rate = _sample_rate(event)
+        if rate < 1.0 and random.random() >= rate:
+            return
+    logger.log(level, EventMessage(event, fields), extra={'event': event})
+
+
+class JsonEventFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, event and fields."""
+
+    def format(self, record):
+        payload = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        message = record.msg
+        if isinstance(message, EventMessage):
+            payload['event'] = message.event
+            payload.update(message.fields)
+        else:
+            payload['message'] = record.getMessage()
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def prepare(self, record):
+        # The stock implementation formats here, on the caller's thread.
+        # Event fields are already a private dict, so the record can be
+        # handed over as-is; only plain printf-style args are resolved now.
+        if not isinstance(record.msg, EventMessage) and record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class NonBlockingStreamHandler(_DeferredQueueHandler):
+    """
+    Handler for LOGGING that enqueues records and writes them to a stream
+    from a background QueueListener thread.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def setFormatter(self, fmt):
+        # Formatting happens in the listener, so the formatter belongs to the target
+        self.target.setFormatter(fmt)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Drop rather than block a request on a stalled console
+            pass
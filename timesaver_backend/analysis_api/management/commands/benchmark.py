@@ -0,0 +1,104 @@
+# analysis_api/management/commands/benchmark.py
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from analysis_api.benchmarks import baseline, load_suites
+
+
+class Command(BaseCommand):
+    help = "Run backend microbenchmarks (all suites by default) and optionally save the results as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', help='Suites to run (default: all)')
+        parser.add_argument('--list', action='store_true', help='List available suites and exit')
+        parser.add_argument('--json', dest='json_path', help='Write results to this JSON file (usable as a baseline for compare_benchmarks)')
+        parser.add_argument(
+            '--rows', type=int, nargs='+',
+            help='Rows to seed for database suites, run once per size in a fresh database (suite default if omitted)',
+        )
+        parser.add_argument('--note', default='', help='Free-text note saved with --json, e.g. the hardware it ran on')
+        parser.add_argument(
+            '--latency-scale', type=float, default=0.0,
+            help='Replay recorded provider latencies at this scale in the pipeline suite (default 0: no sleeping)',
+        )
+
+    @contextmanager
+    def _database(self, needs_db):
+        """
+        A fresh throwaway test database for one suite (never the real one).
+        Suites seed the same fixture rows, and the FTS tables are not Django
+        models that flush would empty, so each suite gets its own. SQLite's
+        in-memory test database outlives destroy_test_db(), so it is a
+        temporary file instead.
+        """
+        if not needs_db:
+            yield
+            return
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        old_test_name = test_settings.get('NAME')
+        directory = None
+        if connection.vendor == 'sqlite':
+            directory = tempfile.mkdtemp(prefix='timesaver-benchmark-')
+            test_settings['NAME'] = os.path.join(directory, 'db.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            test_settings['NAME'] = old_test_name
+            if directory:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _report(self, result):
+        params = ' '.join(f'{k}={v}' for k, v in {**result['params'], **result['info']}.items())
+        self.stdout.write(
+            f"  {result['benchmark']:<40} {params:<36} "
+            f"median {result['median_us']:>12.2f} us   min {result['min_us']:>12.2f} us"
+        )
+
+    def handle(self, *args, **options):
+        suites = load_suites()
+
+        if options['list']:
+            for name, entry in sorted(suites.items()):
+                self.stdout.write(f"{name:<20} {entry['doc']}")
+            return
+
+        selected = options['suites'] or sorted(suites)
+        unknown = [name for name in selected if name not in suites]
+        if unknown:
+            raise CommandError(f"Unknown suite(s): {', '.join(unknown)}")
+
+        results = []
+        # Log I/O would dominate the timings of the paths being measured
+        logging.disable(logging.CRITICAL)
+        try:
+            for name in selected:
+                needs_db = suites[name]['needs_db']
+                # Each size gets its own database; suites without one ignore --rows
+                for rows in (options['rows'] if needs_db and options['rows'] else [None]):
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"[{name}]" + (f" rows={rows}" if rows else '')))
+                    with self._database(needs_db):
+                        for result in suites[name]['run']({**options, 'rows': rows}):
+                            if rows:
+                                # Cases that don't depend on the size would otherwise repeat under one key
+                                result['params'].setdefault('rows', rows)
+                            results.append(result)
+                            self._report(result)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options['json_path']:
+            baseline.dump(results, options['json_path'], options={
+                'suites': selected, 'rows': options['rows'], 'latency_scale': options['latency_scale'],
+            }, note=options['note'])
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['json_path']}"))
@@ -0,0 +1,74 @@
+# analysis_api/management/commands/bulk_analyze.py
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis_api import analysis_core, bulk_analysis
+
+
+def _duration(seconds):
+    if seconds is None:
+        return '?'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class Command(BaseCommand):
+    help = "Analyze the YouTube URLs in a file (one per line) ahead of time, so devices get the results from cache; rerun to resume"
+
+    def add_arguments(self, parser):
+        defaults = bulk_analysis.config()
+        parser.add_argument('urls_file', help='File with one YouTube URL per line (# comments allowed)')
+        parser.add_argument('--checkpoint', help='Progress file (default: <urls_file>.checkpoint)')
+        parser.add_argument('--retry-failed', action='store_true', help='Retry videos that failed in earlier runs')
+        parser.add_argument('--limit', type=int, help='Analyze at most this many videos this run')
+        parser.add_argument('--workers', type=int, default=defaults['workers'], help=f"Videos in flight (default {defaults['workers']})")
+        parser.add_argument('--batch-size', type=int, default=defaults['batch_size'], help=f"Results stored per transaction (default {defaults['batch_size']})")
+        parser.add_argument(
+            '--fetches-per-minute', type=float, default=defaults['fetches_per_minute'],
+            help=f"YouTube requests (metadata, transcript probes) per minute across all workers, 0 for no limit (default {defaults['fetches_per_minute']})",
+        )
+        parser.add_argument(
+            '--llm-calls-per-minute', type=float, default=defaults['llm_calls_per_minute'],
+            help=f"Gemini calls per minute, 0 for no limit (default {defaults['llm_calls_per_minute']})",
+        )
+
+    def handle(self, *args, **options):
+        if not analysis_core.client_initialized:
+            raise CommandError("Gemini client not initialized. Please check your GEMINI_API_KEY.")
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be at least 1")
+
+        try:
+            with open(options['urls_file'], encoding='utf-8') as f:
+                video_ids, invalid = bulk_analysis.read_video_ids(f)
+        except OSError as e:
+            raise CommandError(f"Can't read {options['urls_file']}: {e}")
+        for url in invalid:
+            self.stderr.write(f"Skipping invalid URL: {url}")
+
+        checkpoint = bulk_analysis.Checkpoint(options['checkpoint'] or options['urls_file'] + '.checkpoint')
+        todo = bulk_analysis.pending(video_ids, checkpoint, retry_failed=options['retry_failed'])
+        if options['limit'] is not None:
+            todo = todo[:options['limit']]
+        self.stdout.write(f"{len(video_ids)} videos, {len(video_ids) - len(todo)} already done or skipped, {len(todo)} to analyze")
+        if not todo:
+            return
+
+        def report(progress):
+            self.stdout.write(
+                f"{progress.done}/{progress.total} ({progress.stored} stored, {progress.failed} failed)"
+                f"  {progress.per_minute():.1f}/min  ETA {_duration(progress.eta_seconds())}"
+            )
+
+        try:
+            progress = bulk_analysis.run(
+                todo, checkpoint,
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                fetches_per_minute=options['fetches_per_minute'],
+                llm_calls_per_minute=options['llm_calls_per_minute'],
+                on_progress=report,
+            )
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted; progress is saved in {checkpoint.path}, rerun to resume")
+        self.stdout.write(self.style.SUCCESS(f"Stored {progress.stored}, failed {progress.failed} (see {checkpoint.path})"))
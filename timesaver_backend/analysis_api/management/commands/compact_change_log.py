@@ -0,0 +1,18 @@
+# analysis_api/management/commands/compact_change_log.py
+from django.core.management.base import BaseCommand
+
+from analysis_api import sync
+
+
+class Command(BaseCommand):
+    help = "Collapse superseded sync change log entries and expire old ones (clients behind them get a full resync)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, default=sync.DEFAULT_RETENTION_DAYS,
+            help=f'Drop entries older than this (default {sync.DEFAULT_RETENTION_DAYS})',
+        )
+
+    def handle(self, *args, **options):
+        collapsed, expired = sync.compact(options['retention_days'])
+        self.stdout.write(self.style.SUCCESS(f"Collapsed {collapsed} superseded and expired {expired} old change log entries"))
@@ -0,0 +1,42 @@
+# analysis_api/management/commands/compact_cold_storage.py
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from analysis_api import video_content
+
+
+def _database_bytes():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA page_count")
+        page_count = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return page_count * cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = "Compress payloads of analyses nobody has read recently, and decompress ones read again (safe to run often)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after-days', type=int, help='Idle days before content goes cold (default: COLD_STORAGE setting)')
+        parser.add_argument('--batch-size', type=int, help='Rows per transaction (default: COLD_STORAGE setting)')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches of each kind')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+        parser.add_argument('--vacuum', action='store_true', help='VACUUM afterwards so SQLite returns the freed pages to the OS')
+
+    def handle(self, *args, **options):
+        sqlite = connection.vendor == 'sqlite'
+        size_before = _database_bytes() if sqlite else None
+
+        frozen, thawed = video_content.compact_cold_storage(
+            after_days=options['after_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Compressed {frozen} content row(s), decompressed {thawed}"))
+
+        if options['vacuum'] and sqlite:
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+        if sqlite:
+            self.stdout.write(f"Database size: {size_before:,} -> {_database_bytes():,} bytes")
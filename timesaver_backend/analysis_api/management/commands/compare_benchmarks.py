@@ -0,0 +1,40 @@
+# analysis_api/management/commands/compare_benchmarks.py
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis_api.benchmarks import baseline
+
+
+class Command(BaseCommand):
+    help = "Compare two `benchmark --json` result files and fail if any benchmark got slower than the threshold"
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Results file to compare against')
+        parser.add_argument('current', help='Results file of the run being checked')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Percent slowdown counted as a regression (default 10)')
+        parser.add_argument('--metric', choices=baseline.METRICS, default='min_us', help='Timing to compare (default min_us, the least noisy)')
+        parser.add_argument('--all', action='store_true', help='Also list unchanged benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            before, after = baseline.load(options['baseline']), baseline.load(options['current'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Can't read results: {e}")
+
+        if before.get('environment', {}).get('machine') != after.get('environment', {}).get('machine'):
+            self.stderr.write(self.style.WARNING("Results come from different machines; timings may not be comparable"))
+
+        rows = baseline.compare(before['results'], after['results'], options['threshold'] / 100, options['metric'])
+        styles = {'regressed': self.style.ERROR, 'improved': self.style.SUCCESS}
+        for row in rows:
+            if row['status'] == 'unchanged' and not options['all']:
+                continue
+            params = ' '.join(f'{k}={v}' for k, v in row['params'].items())
+            change = f"{row['change']:+.1%}" if row['change'] is not None else ''
+            timings = ' -> '.join(f"{us:.2f} us" for us in (row['baseline_us'], row['current_us']) if us is not None)
+            line = f"  {row['status']:<10} {row['benchmark']:<32} {params:<36} {timings:<28} {change}"
+            self.stdout.write(styles.get(row['status'], str)(line))
+
+        counts = {status: sum(row['status'] == status for row in rows) for status in ('regressed', 'improved', 'unchanged', 'new', 'missing')}
+        self.stdout.write(', '.join(f"{count} {status}" for status, count in counts.items()))
+        if counts['regressed']:
+            raise CommandError(f"{counts['regressed']} benchmark(s) regressed by more than {options['threshold']:g}%")
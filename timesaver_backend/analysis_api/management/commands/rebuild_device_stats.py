@@ -0,0 +1,15 @@
+# analysis_api/management/commands/rebuild_device_stats.py
+from django.core.management.base import BaseCommand
+
+from analysis_api import device_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute per-device statistics from stored analyses (after bulk writes or if counts drift)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--device', action='append', dest='devices', help='Only rebuild this device id (repeatable)')
+
+    def handle(self, *args, **options):
+        written = device_stats.rebuild(options['devices'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {written} device(s)"))
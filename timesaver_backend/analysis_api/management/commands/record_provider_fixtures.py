@@ -0,0 +1,40 @@
+# analysis_api/management/commands/record_provider_fixtures.py
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis_api import analysis_core, provider_replay
+
+
+class Command(BaseCommand):
+    help = "Analyze videos against the real YouTube and Gemini, saving every provider call as a replay fixture for the pipeline benchmark"
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='YouTube URLs to record')
+        parser.add_argument('--label', default='', help='Note stored with the fixtures, e.g. "2h lecture, auto captions"')
+        parser.add_argument('--corpus', default=provider_replay.CORPUS_DIR, help='Fixture directory (default: the benchmark corpus)')
+
+    def handle(self, *args, **options):
+        if not analysis_core.client_initialized:
+            raise CommandError("Gemini client not initialized. Please check your GEMINI_API_KEY.")
+
+        for url in options['urls']:
+            try:
+                video_id = analysis_core.extract_youtube_id(url)
+            except ValueError as e:
+                raise CommandError(f"{url}: {e}")
+
+            with provider_replay.recording() as recorder:
+                try:
+                    result = analysis_core.orchestrate_analysis(url)
+                except Exception as e:
+                    raise CommandError(f"{url}: {e}")
+            path = recorder.save(video_id, options['corpus'], label=options['label'])
+
+            # Replaying right away catches calls the recorder missed
+            with provider_replay.replaying(options['corpus'], latency_scale=0):
+                replayed = analysis_core.orchestrate_analysis(url)
+            if replayed != result:
+                self.stderr.write(self.style.WARNING(f"{video_id}: replay differs from the recorded result"))
+
+            calls = recorder.calls.get(video_id, [])
+            latency = sum(call['latency'] for call in calls)
+            self.stdout.write(self.style.SUCCESS(f"Recorded {len(calls)} calls ({latency:.1f}s) for {video_id} to {path}"))
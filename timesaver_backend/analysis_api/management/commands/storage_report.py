@@ -0,0 +1,28 @@
+# analysis_api/management/commands/storage_report.py
+from django.core.management.base import BaseCommand
+
+from analysis_api import video_content
+from analysis_api.analysis_core import GEMINI_MODEL, PROMPT_VERSION
+
+
+class Command(BaseCommand):
+    help = "Report how much storage shared analysis content saves over per-device copies"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune-orphans', action='store_true', help='Delete content no analysis references (except reusable content of the current model and prompt)')
+
+    def handle(self, *args, **options):
+        if options['prune_orphans']:
+            pruned = video_content.prune_orphans(keep_reusable=(GEMINI_MODEL, PROMPT_VERSION))
+            self.stdout.write(f"Pruned {pruned} unreferenced content row(s)")
+
+        report = video_content.storage_report()
+        undeduplicated = report['undeduplicated_bytes']
+        saved_percent = 100 * report['saved_bytes'] / undeduplicated if undeduplicated else 0.0
+        self.stdout.write(
+            f"{report['references']} analyses reference {report['content_rows']} content row(s)"
+            f" ({report['orphaned_rows']} unreferenced, {report['cold_rows']} in cold storage)"
+        )
+        self.stdout.write(f"Stored:          {report['stored_bytes']:>14,} bytes")
+        self.stdout.write(f"Without sharing: {undeduplicated:>14,} bytes")
+        self.stdout.write(self.style.SUCCESS(f"Saved:           {report['saved_bytes']:>14,} bytes ({saved_percent:.1f}%)"))
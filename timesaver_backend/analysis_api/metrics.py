@@ -0,0 +1,273 @@
+# analysis_api/metrics.py
+"""
+Low-overhead in-process metrics for the analysis pipeline.
+
+Histograms and counters live in plain dicts guarded by a single lock, so an
+observation costs a bisect and a couple of additions. Each worker process
+snapshots its registry to METRICS_DIR/<pid>-<start time>.json from a
+background thread; the metrics endpoint merges every snapshot so a scrape
+sees the whole node, not just the worker that happened to serve it.
+
+The start time in the file name keeps a recycled pid from overwriting a
+dead worker's totals. Snapshots of processes that are gone, or that have
+not been rewritten for METRICS_STALE_AFTER seconds, are deleted at scrape
+time, so dead workers stop counting.
+
+Scrapes must send METRICS_ADMIN_TOKEN as a bearer token (Prometheus'
+`authorization` scrape option); with no token configured the endpoint stays
+closed.
+"""
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+# Latency buckets in seconds, spanning a cache lookup up to a slow Gemini call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+STAGE_SECONDS = 'timesaver_stage_seconds'
+VIEW_SECONDS = 'timesaver_view_seconds'
+CACHE_HITS = 'timesaver_cache_hits_total'
+FALLBACKS = 'timesaver_fallbacks_total'
+ERRORS = 'timesaver_errors_total'
+
+_HELP = {
+    STAGE_SECONDS: 'Time spent in each analysis pipeline stage.',
+    VIEW_SECONDS: 'Time spent in each API view.',
+    CACHE_HITS: 'Requests answered from stored results.',
+    FALLBACKS: 'Times a degraded fallback path was used.',
+    ERRORS: 'Exceptions raised inside a timed stage, by class.',
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_counters = {}    # (name, labels) -> float
+_flusher_pid = None  # Process the flush thread runs in (forked workers start their own)
+_started_ms = None
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _flush_interval():
+    return getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0)
+
+
+def _metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _stale_after():
+    return getattr(settings, 'METRICS_STALE_AFTER', max(60.0, 10 * _flush_interval()))
+
+
+def observe(name, value, **labels):
+    """Record one histogram observation (seconds)."""
+    key = (name, _labels_key(labels))
+    index = bisect_left(DEFAULT_BUCKETS, value)
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(DEFAULT_BUCKETS) + 1) + [0.0]
+        series[index] += 1
+        series[-1] += value
+    _maybe_flush()
+
+
+def inc(name, amount=1, **labels):
+    """Increment a counter."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    _maybe_flush()
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time a pipeline stage and count the exception class if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        inc(ERRORS, stage=stage, error_class=type(e).__name__)
+        raise
+    finally:
+        observe(STAGE_SECONDS, time.perf_counter() - start, stage=stage)
+
+
+def timed_view(view_func):
+    """Decorator recording the latency of an API view under its function name."""
+    name = view_func.__name__
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return view_func(request, *args, **kwargs)
+        except Exception as e:
+            inc(ERRORS, stage=f'view:{name}', error_class=type(e).__name__)
+            raise
+        finally:
+            observe(VIEW_SECONDS, time.perf_counter() - start, view=name)
+
+    return wrapper
+
+
+# --- Cross-process aggregation ---
+
+def _snapshot():
+    with _lock:
+        return {
+            'histograms': [[name, list(labels), list(series)] for (name, labels), series in _histograms.items()],
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+        }
+
+
+def _snapshot_name(pid, started_ms):
+    return f'{pid}-{started_ms}.json'
+
+
+def flush():
+    """Write this process's registry to the shared metrics directory."""
+    directory = _metrics_dir()
+    if not directory or _started_ms is None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp_path, os.path.join(directory, _snapshot_name(os.getpid(), _started_ms)))
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_flush_interval())
+        try:
+            flush()
+        except OSError:
+            # Metrics must never take a worker down
+            pass
+
+
+def _maybe_flush():
+    """Start this process's flush thread on its first observation."""
+    global _flusher_pid, _started_ms
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        # A forked worker inherits the parent's values but not its thread
+        _flusher_pid = pid
+        _started_ms = int(time.time() * 1000)
+    # Flushing on a timer rather than on observations keeps idle workers'
+    # snapshots fresh, so only dead ones go stale
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _process_exists(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+def _read_snapshots(directory):
+    """Snapshots of the other live workers; those of dead or silent ones are deleted."""
+    snapshots = []
+    own_file = _snapshot_name(os.getpid(), _started_ms)
+    now = time.time()
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json') or filename == own_file:
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            pid = int(filename[:-len('.json')].split('-', 1)[0])
+            if not _process_exists(pid) or now - os.path.getmtime(path) > _stale_after():
+                os.remove(path)
+                continue
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def collect():
+    """Merge the snapshots of every worker on this node."""
+    histograms = {}
+    counters = {}
+
+    snapshots = [_snapshot()]
+    directory = _metrics_dir()
+    if directory and os.path.isdir(directory):
+        snapshots.extend(_read_snapshots(directory))
+
+    for snapshot in snapshots:
+        for name, labels, series in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                merged[i] += value
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+
+    return histograms, counters
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in pairs)
+    return '{' + body + '}'
+
+
+def render_prometheus() -> str:
+    """Render the merged registry in the Prometheus text exposition format."""
+    histograms, counters = collect()
+    lines = []
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f'# HELP {name} {_HELP.get(name, name)}')
+        lines.append(f'# TYPE {name} histogram')
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(DEFAULT_BUCKETS, series):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            cumulative += series[len(DEFAULT_BUCKETS)]
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {series[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f'# HELP {name} {_HELP.get(name, name)}')
+        lines.append(f'# TYPE {name} counter')
+        for (series_name, labels), value in sorted(counters.items()):
+            if series_name == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def is_authorized_scrape(request) -> bool:
+    """True if the request carries METRICS_ADMIN_TOKEN as its bearer token."""
+    expected = getattr(settings, 'METRICS_ADMIN_TOKEN', '')
+    scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+    return bool(expected) and scheme.lower() == 'bearer' and hmac.compare_digest(supplied.strip(), expected)
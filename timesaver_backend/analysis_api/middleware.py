@@ -2,6 +2,9 @@
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from .rate_limiting import RateLimiter
+from . import quota
+from . import log_events as events
+from .log_events import log_event
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,10 +19,14 @@ class DeviceAuthenticationMiddleware(MiddlewareMixin):
         '/api/analyze/',
         '/api/history/',
         '/api/search/',
+        '/api/transcripts/',
         '/api/stats/',
         '/api/analysis/',
         '/api/bookmark/',
         '/api/bookmarks/',
+        '/api/sync/',
+        '/api/export/',
+        '/api/import/',
     ]
     
     # Endpoints that don't require authentication (for testing/debugging)
@@ -39,14 +46,14 @@ class DeviceAuthenticationMiddleware(MiddlewareMixin):
             device_id = request.headers.get('X-Device-ID')
             
             if not device_id:
-                logger.warning(f"Missing device ID for {request.path} from {request.META.get('REMOTE_ADDR')}")
+                log_event(logger, events.DEVICE_REJECTED, level=logging.WARNING, reason='missing', path=request.path, remote_addr=request.META.get('REMOTE_ADDR'))
                 return JsonResponse({
                     'error': 'Device ID required',
                     'detail': 'Include X-Device-ID header with a valid device identifier'
                 }, status=401)
             
             if len(device_id) < 10:  # Basic validation (UUIDs are longer)
-                logger.warning(f"Invalid device ID format: {device_id[:8]}...")
+                log_event(logger, events.DEVICE_REJECTED, level=logging.WARNING, reason='invalid_format', device=device_id[:8])
                 return JsonResponse({
                     'error': 'Invalid device ID format',
                     'detail': 'Device ID must be a valid identifier'
@@ -65,6 +72,14 @@ class DeviceAuthenticationMiddleware(MiddlewareMixin):
             request.rate_limit_remaining = remaining
             request.rate_limit_reset = reset_time
             
-            logger.info(f"Authenticated device {device_id[:8]}... for {request.path}")
+            # Expensive endpoints also draw from the device's work budget,
+            # which the view charges once it knows what the request cost
+            if request.path.startswith(quota.METERED_PATHS):
+                budget_ok, budget_remaining, budget_reset = quota.check_budget(device_id)
+                if not budget_ok:
+                    return quota.get_budget_exceeded_response(device_id, budget_reset)
+                quota.attach_budget(request, budget_remaining, budget_reset)
+            
+            log_event(logger, events.DEVICE_AUTHENTICATED, level=logging.DEBUG, device=device_id[:8], path=request.path)
         
         return None
\ No newline at end of file
@@ -0,0 +1,60 @@
+# Full-text search index over analysis titles and highlights (SQLite FTS5)
+
+import hashlib
+
+from django.db import migrations
+
+FTS_TABLE = 'analysis_api_search_fts'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        # Other databases keep using icontains search
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, highlight_title, description, device_token, "
+            "analysis_id UNINDEXED, highlight_index UNINDEXED, timestamp UNINDEXED, "
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+
+        # Backfill existing analyses
+        VideoAnalysis = apps.get_model('analysis_api', 'VideoAnalysis')
+        rows = []
+        for analysis in VideoAnalysis.objects.all().iterator(chunk_size=500):
+            # Same device token as search_index.device_token()
+            token = 'd' + hashlib.sha1(analysis.device_id.encode()).hexdigest()[:20]
+            rows.append((analysis.title, '', '', token, analysis.id, -1, ''))
+            highlights = analysis.highlights if isinstance(analysis.highlights, list) else []
+            for index, highlight in enumerate(highlights):
+                if isinstance(highlight, dict):
+                    rows.append((
+                        '', highlight.get('title', ''), highlight.get('description', ''),
+                        token, analysis.id, index, highlight.get('timestamp', ''),
+                    ))
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} "
+            "(title, highlight_title, description, device_token, analysis_id, highlight_index, timestamp) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_api", "0002_videoanalysis_device_id_alter_videoanalysis_video_id_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
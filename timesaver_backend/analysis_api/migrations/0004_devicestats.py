@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:04
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_device_stats(apps, schema_editor):
+    # Mirrors device_stats.rebuild() against the historical models
+    VideoAnalysis = apps.get_model('analysis_api', 'VideoAnalysis')
+    DeviceStats = apps.get_model('analysis_api', 'DeviceStats')
+    oldest_day = (timezone.localdate() - timezone.timedelta(days=6)).isoformat()
+
+    totals = {}
+    rows = VideoAnalysis.objects.order_by().values_list('device_id', 'highlights', 'duration', 'created_at')
+    for device_id, highlights, duration, created_at in rows.iterator(chunk_size=2000):
+        stats = totals.setdefault(device_id, DeviceStats(device_id=device_id, daily_counts={}))
+        stats.analysis_count += 1
+        stats.highlight_count += len(highlights) if isinstance(highlights, list) else 0
+        seconds = 0
+        try:
+            for part in str(duration).split(':'):
+                seconds = seconds * 60 + int(part)
+        except ValueError:
+            seconds = 0
+        stats.total_seconds += max(seconds, 0)
+        day = timezone.localdate(created_at).isoformat()
+        if day >= oldest_day:
+            stats.daily_counts[day] = stats.daily_counts.get(day, 0) + 1
+    DeviceStats.objects.bulk_create(totals.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis_api', '0003_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceStats',
+            fields=[
+                ('device_id', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('analysis_count', models.IntegerField(default=0)),
+                ('highlight_count', models.IntegerField(default=0)),
+                ('total_seconds', models.BigIntegerField(default=0)),
+                ('daily_counts', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_device_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis_api', '0004_devicestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='videoanalysis',
+            index=models.Index(fields=['device_id', '-created_at', '-id'], name='analysis_ap_device__ace961_idx'),
+        ),
+    ]
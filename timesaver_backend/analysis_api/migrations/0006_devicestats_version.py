@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis_api', '0005_videoanalysis_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='devicestats',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
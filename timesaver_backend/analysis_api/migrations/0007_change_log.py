@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis_api', '0006_devicestats_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='devicestats',
+            name='sync_floor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('device_id', models.CharField(max_length=100)),
+                ('kind', models.CharField(max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('op', models.CharField(max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device_id', 'id'], name='analysis_ap_device__9502a3_idx'), models.Index(fields=['device_id', 'kind', 'object_id'], name='analysis_ap_device__33e77d_idx')],
+            },
+        ),
+    ]
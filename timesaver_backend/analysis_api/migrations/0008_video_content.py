@@ -0,0 +1,139 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:02
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _content_hash(video_id, title, duration, thumbnail_url, highlights, analysis_summary):
+    # Mirrors video_content.content_hash() for results of unknown model/prompt
+    payload = json.dumps(
+        [video_id, title, duration, thumbnail_url, highlights, analysis_summary, '', ''],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def share_content(apps, schema_editor):
+    # Identical results stored by several devices collapse into one row
+    VideoAnalysis = apps.get_model('analysis_api', 'VideoAnalysis')
+    VideoContent = apps.get_model('analysis_api', 'VideoContent')
+
+    content_ids = {}
+    pending = []
+    rows = VideoAnalysis.objects.order_by('id').values_list(
+        'id', 'video_id', 'title', 'duration', 'thumbnail_url', 'highlights', 'analysis_summary'
+    )
+    for analysis_id, video_id, title, duration, thumbnail_url, highlights, analysis_summary in rows.iterator(chunk_size=2000):
+        digest = _content_hash(video_id, title, duration, thumbnail_url, highlights, analysis_summary)
+        if digest not in content_ids:
+            content_ids[digest] = VideoContent.objects.create(
+                video_id=video_id, title=title, duration=duration, thumbnail_url=thumbnail_url,
+                highlights=highlights, analysis_summary=analysis_summary, content_hash=digest,
+            ).id
+        pending.append(VideoAnalysis(id=analysis_id, content_id=content_ids[digest]))
+        if len(pending) >= 2000:
+            VideoAnalysis.objects.bulk_update(pending, ['content'])
+            pending = []
+    VideoAnalysis.objects.bulk_update(pending, ['content'])
+
+
+def copy_content_back(apps, schema_editor):
+    VideoAnalysis = apps.get_model('analysis_api', 'VideoAnalysis')
+    pending = []
+    for analysis in VideoAnalysis.objects.select_related('content').iterator(chunk_size=2000):
+        content = analysis.content
+        analysis.title = content.title
+        analysis.duration = content.duration
+        analysis.thumbnail_url = content.thumbnail_url
+        analysis.highlights = content.highlights
+        analysis.analysis_summary = content.analysis_summary
+        pending.append(analysis)
+        if len(pending) >= 2000:
+            VideoAnalysis.objects.bulk_update(pending, ['title', 'duration', 'thumbnail_url', 'highlights', 'analysis_summary'])
+            pending = []
+    VideoAnalysis.objects.bulk_update(pending, ['title', 'duration', 'thumbnail_url', 'highlights', 'analysis_summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis_api', '0007_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=20)),
+                ('title', models.CharField(max_length=500)),
+                ('duration', models.CharField(max_length=20)),
+                ('thumbnail_url', models.URLField(max_length=500)),
+                ('highlights', models.JSONField()),
+                ('analysis_summary', models.TextField(blank=True)),
+                ('model_name', models.CharField(blank=True, max_length=50)),
+                ('prompt_version', models.CharField(blank=True, max_length=20)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['video_id', 'model_name', 'prompt_version'], name='analysis_ap_video_i_484d34_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='videoanalysis',
+            name='content',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='analyses', to='analysis_api.videocontent'),
+        ),
+        migrations.RunPython(share_content, copy_content_back),
+        migrations.AlterField(
+            model_name='videoanalysis',
+            name='content',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='analyses', to='analysis_api.videocontent'),
+        ),
+        # Defaults let unapplying re-add the columns to existing rows before
+        # copy_content_back fills them in
+        migrations.AlterField(
+            model_name='videoanalysis',
+            name='title',
+            field=models.CharField(default='', max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='videoanalysis',
+            name='duration',
+            field=models.CharField(default='', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='videoanalysis',
+            name='thumbnail_url',
+            field=models.URLField(default='', max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='videoanalysis',
+            name='highlights',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RemoveField(
+            model_name='videoanalysis',
+            name='title',
+        ),
+        migrations.RemoveField(
+            model_name='videoanalysis',
+            name='duration',
+        ),
+        migrations.RemoveField(
+            model_name='videoanalysis',
+            name='thumbnail_url',
+        ),
+        migrations.RemoveField(
+            model_name='videoanalysis',
+            name='highlights',
+        ),
+        migrations.RemoveField(
+            model_name='videoanalysis',
+            name='analysis_summary',
+        ),
+    ]
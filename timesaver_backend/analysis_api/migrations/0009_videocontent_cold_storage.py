@@ -0,0 +1,94 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:40
+
+import json
+import zlib
+
+from django.db import migrations, models
+
+# A frozen copy of cold_storage's format 1, so later changes to that
+# module can't change what this migration reads
+FORMAT_ZLIB_V1 = 1
+ZDICT_V1 = (
+    b' that the video viewers which this with from their about and the '
+    b'"}],"analysis_summary":""}'
+    b'"},{"agent":"The Explorer","timestamp":"'
+    b'"},{"agent":"The Analyst","timestamp":"'
+    b'"},{"agent":"The Teacher","timestamp":"'
+    b'","title":"","description":"The video '
+    b'{"highlights":[{"agent":"The Teacher","timestamp":"'
+)
+
+
+def unpack(payload):
+    payload = bytes(payload)
+    if payload[0] != FORMAT_ZLIB_V1:
+        raise ValueError(f"Unknown cold storage format {payload[0]}")
+    decompressor = zlib.decompressobj(zdict=ZDICT_V1)
+    return json.loads(decompressor.decompress(payload[1:]) + decompressor.flush())
+
+
+def thaw_all(apps, schema_editor):
+    # Unapplying drops cold_payload, so every cold payload moves back first
+    VideoContent = apps.get_model('analysis_api', 'VideoContent')
+    pending = []
+    for content in VideoContent.objects.filter(cold_payload__isnull=False).iterator(chunk_size=500):
+        payload = unpack(content.cold_payload)
+        content.highlights_data = payload['highlights']
+        content.summary_data = payload['analysis_summary']
+        content.cold_payload = None
+        pending.append(content)
+        if len(pending) >= 500:
+            VideoContent.objects.bulk_update(pending, ['highlights_data', 'summary_data', 'cold_payload'])
+            pending = []
+    VideoContent.objects.bulk_update(pending, ['highlights_data', 'summary_data', 'cold_payload'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis_api', '0008_video_content'),
+    ]
+
+    operations = [
+        # The payload fields are renamed in Python only; the columns keep their names
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='videocontent',
+                    old_name='highlights',
+                    new_name='highlights_data',
+                ),
+                migrations.AlterField(
+                    model_name='videocontent',
+                    name='highlights_data',
+                    field=models.JSONField(db_column='highlights'),
+                ),
+                migrations.RenameField(
+                    model_name='videocontent',
+                    old_name='analysis_summary',
+                    new_name='summary_data',
+                ),
+                migrations.AlterField(
+                    model_name='videocontent',
+                    name='summary_data',
+                    field=models.TextField(blank=True, db_column='analysis_summary'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='videocontent',
+            name='highlights_data',
+            field=models.JSONField(db_column='highlights', null=True),
+        ),
+        migrations.AddField(
+            model_name='videocontent',
+            name='cold_payload',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='videocontent',
+            name='last_read_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, thaw_all),
+    ]
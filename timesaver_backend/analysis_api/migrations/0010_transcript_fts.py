@@ -0,0 +1,37 @@
+# Full-text index over transcript segments (SQLite FTS5)
+
+from django.db import migrations
+
+FTS_TABLE = 'analysis_api_transcript_fts'
+
+
+def create_transcript_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        # Other databases have no transcript search
+        return
+
+    # Transcripts were not kept before this, so there is nothing to backfill
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "text, video_token, video_id UNINDEXED, start UNINDEXED, "
+            "tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+
+def drop_transcript_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis_api', '0009_videocontent_cold_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_transcript_index, drop_transcript_index),
+    ]
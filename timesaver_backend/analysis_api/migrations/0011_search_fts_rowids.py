@@ -0,0 +1,40 @@
+# Key search index rows by a rowid computed from the analysis, so deletes are range lookups
+
+from django.db import migrations
+
+FTS_TABLE = 'analysis_api_search_fts'
+# Same as search_index.ROW_STRIDE
+ROW_STRIDE = 1024
+COLUMNS = 'title, highlight_title, description, device_token, analysis_id, highlight_index, timestamp'
+
+
+def rekey_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        # Other databases have no search index
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(f"CREATE TEMP TABLE search_fts_rows AS SELECT {COLUMNS} FROM {FTS_TABLE}")
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {COLUMNS}) "
+            f"SELECT analysis_id * {ROW_STRIDE} + 1 + highlight_index, {COLUMNS} FROM search_fts_rows "
+            f"WHERE highlight_index < {ROW_STRIDE - 1}"
+        )
+        cursor.execute("DROP TABLE search_fts_rows")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analysis_api", "0010_transcript_fts"),
+    ]
+
+    operations = [
+        # The old code finds rows by analysis_id, whatever their rowid
+        migrations.RunPython(rekey_search_index, migrations.RunPython.noop),
+    ]
@@ -1,21 +1,97 @@
 from django.db import models
 from django.utils import timezone
 
+from . import cold_storage
+
+class VideoContent(models.Model):
+    """Analysis output shared by every device that analyzed the video (see video_content.py)"""
+    video_id = models.CharField(max_length=20)
+    title = models.CharField(max_length=500)
+    duration = models.CharField(max_length=20)
+    thumbnail_url = models.URLField(max_length=500)
+    
+    # Payload; read it through the highlights/analysis_summary properties.
+    # Cold rows keep both compressed in cold_payload instead (cold_storage.py)
+    highlights_data = models.JSONField(null=True, db_column='highlights')  # The entire highlights array
+    summary_data = models.TextField(blank=True, db_column='analysis_summary')
+    cold_payload = models.BinaryField(null=True)
+    last_read_at = models.DateTimeField(null=True)  # Stamped at most daily; drives cold storage
+    
+    # What produced it; only results of the current model and prompt are reused
+    model_name = models.CharField(max_length=50, blank=True)
+    prompt_version = models.CharField(max_length=20, blank=True)
+    content_hash = models.CharField(max_length=64, unique=True)  # Identical results share one row
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['video_id', 'model_name', 'prompt_version']),  # Reuse lookup
+        ]
+    
+    def __str__(self):
+        return f"{self.title[:50]}... ({self.video_id})"
+    
+    def _payload(self):
+        """The cold payload, decompressed once per instance"""
+        payload = self.__dict__.get('_thawed')
+        if payload is None:
+            payload = self.__dict__['_thawed'] = cold_storage.unpack(self.cold_payload)
+        return payload
+    
+    @property
+    def highlights(self):
+        if self.cold_payload is None:
+            return self.highlights_data
+        return self._payload()['highlights']
+    
+    @highlights.setter
+    def highlights(self, value):
+        self.thaw()
+        self.highlights_data = value
+    
+    @property
+    def analysis_summary(self):
+        if self.cold_payload is None:
+            return self.summary_data
+        return self._payload()['analysis_summary']
+    
+    @analysis_summary.setter
+    def analysis_summary(self, value):
+        self.thaw()
+        self.summary_data = value
+    
+    @property
+    def is_cold(self):
+        return self.cold_payload is not None
+    
+    def freeze(self):
+        """Move the payload into cold_payload (caller saves)"""
+        if self.cold_payload is None:
+            self.cold_payload = cold_storage.pack(self.highlights_data, self.summary_data)
+            self.highlights_data = None
+            self.summary_data = ''
+            self.__dict__.pop('_thawed', None)
+    
+    def thaw(self):
+        """Move the payload back into the plain columns (caller saves)"""
+        if self.cold_payload is not None:
+            payload = self._payload()
+            self.highlights_data = payload['highlights']
+            self.summary_data = payload['analysis_summary']
+            self.cold_payload = None
+            self.__dict__.pop('_thawed', None)
+
 class VideoAnalysis(models.Model):
-    """Store completed video analysis results"""
+    """A device's analysis of a video; the results themselves live in VideoContent"""
     # Device/User Information
     device_id = models.CharField(max_length=100, db_index=True, default='legacy-device')  # Device authentication
     
     # Video Information
-    video_url = models.URLField(max_length=500)
+    video_url = models.URLField(max_length=500)  # As submitted by this device
     video_id = models.CharField(max_length=20, db_index=True)  # YouTube ID (removed unique constraint)
-    title = models.CharField(max_length=500)
-    duration = models.CharField(max_length=20)
-    thumbnail_url = models.URLField(max_length=500)
     
-    # Analysis Results
-    highlights = models.JSONField()  # Store the entire highlights array
-    analysis_summary = models.TextField(blank=True)
+    # Analysis Results (shared, never modified in place)
+    content = models.ForeignKey(VideoContent, on_delete=models.PROTECT, related_name='analyses')
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -29,24 +105,87 @@ class VideoAnalysis(models.Model):
             models.Index(fields=['video_id']),
             models.Index(fields=['created_at']),
             models.Index(fields=['device_id', 'video_id']),  # Compound index for device + video
+            models.Index(fields=['device_id', '-created_at', '-id']),  # History pages (keyset pagination)
         ]
         # Allow same video to be analyzed by different devices
         unique_together = ['device_id', 'video_id']
     
+    # Attributes read through from VideoContent -> the content columns behind
+    # them; select_related('content') to avoid a query per analysis
+    CONTENT_FIELDS = {
+        'title': ('title',),
+        'duration': ('duration',),
+        'thumbnail_url': ('thumbnail_url',),
+        'highlights': ('highlights_data', 'cold_payload'),
+        'analysis_summary': ('summary_data', 'cold_payload'),
+    }
+    
+    title = property(lambda self: self.content.title)
+    duration = property(lambda self: self.content.duration)
+    thumbnail_url = property(lambda self: self.content.thumbnail_url)
+    highlights = property(lambda self: self.content.highlights)
+    analysis_summary = property(lambda self: self.content.analysis_summary)
+    
     def __str__(self):
         return f"{self.title[:50]}... ({self.created_at.strftime('%Y-%m-%d')})"
     
-    def to_dict(self):
-        """Convert to dictionary for API responses"""
-        return {
-            'id': self.id,
-            'title': self.title,
-            'duration': self.duration,
-            'thumbnailUrl': self.thumbnail_url,
-            'highlights': self.highlights,
-            'created_at': self.created_at.isoformat(),
-            'video_url': self.video_url,
-        }
+    # API key -> model attribute, in response order
+    API_FIELDS = {
+        'id': 'id',
+        'title': 'title',
+        'duration': 'duration',
+        'thumbnailUrl': 'thumbnail_url',
+        'highlights': 'highlights',
+        'created_at': 'created_at',
+        'video_url': 'video_url',
+    }
+    
+    def to_dict(self, fields=None):
+        """Convert to dictionary for API responses, optionally only the given API keys"""
+        data = {}
+        # Only touch requested attributes so deferred columns are never loaded
+        for name in fields or self.API_FIELDS:
+            value = getattr(self, self.API_FIELDS[name])
+            data[name] = value.isoformat() if name == 'created_at' else value
+        return data
+
+class DeviceStats(models.Model):
+    """Per-device aggregates kept current by signals (see device_stats.py)"""
+    device_id = models.CharField(max_length=100, primary_key=True)
+    analysis_count = models.IntegerField(default=0)
+    highlight_count = models.IntegerField(default=0)
+    total_seconds = models.BigIntegerField(default=0)  # Sum of analyzed video durations
+    daily_counts = models.JSONField(default=dict)  # {"YYYY-MM-DD": analyses created that day}, last few days only
+    version = models.BigIntegerField(default=0)  # Bumped on every analysis/bookmark write; drives ETags
+    sync_floor = models.BigIntegerField(default=0)  # Highest change log id compacted away; older cursors must resync
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats {self.device_id[:8]}... ({self.analysis_count} analyses)"
+
+class ChangeLogEntry(models.Model):
+    """Append-only log of analysis/bookmark writes per device, for delta sync (see sync.py)"""
+    KIND_ANALYSIS = 'analysis'
+    KIND_BOOKMARK = 'bookmark'
+    OP_CREATE = 'create'
+    OP_UPDATE = 'update'
+    OP_DELETE = 'delete'
+
+    id = models.BigAutoField(primary_key=True)  # Doubles as the sync cursor
+    device_id = models.CharField(max_length=100)
+    kind = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    op = models.CharField(max_length=10)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['device_id', 'id']),  # Changes after a cursor
+            models.Index(fields=['device_id', 'kind', 'object_id']),  # Compaction
+        ]
+
+    def __str__(self):
+        return f"{self.op} {self.kind} {self.object_id} ({self.device_id[:8]}...)"
 
 class UserSession(models.Model):
     """Track user sessions for analytics and rate limiting"""
@@ -0,0 +1,77 @@
+# analysis_api/pagination.py
+"""
+Keyset (cursor) pagination for newest-first lists.
+
+A cursor is the sort key of the last row of a page, (timestamp, id),
+encoded as an opaque URL-safe token. The next page is a range scan that
+starts right after that key, so every page costs the same no matter how
+deep it is, unlike OFFSET which reads and discards all earlier rows.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """The cursor token could not be decoded."""
+
+
+class InvalidPageParam(ValueError):
+    """A limit or offset query param is not a usable number."""
+
+
+def encode_cursor(timestamp, row_id) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, id) from a cursor token."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+def _parse_int(value, name) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidPageParam(f"{name} must be an integer") from None
+
+
+def page_size(value, default=20) -> int:
+    """Parse a limit query param, clamped to 1..MAX_PAGE_SIZE."""
+    return max(1, min(_parse_int(value or default, 'limit'), MAX_PAGE_SIZE))
+
+
+def page_offset(value) -> int:
+    """Parse an offset query param (0 if absent)."""
+    offset = _parse_int(value or 0, 'offset')
+    if offset < 0:
+        raise InvalidPageParam("offset must not be negative")
+    return offset
+
+
+def keyset_page(queryset, cursor, limit, field='created_at'):
+    """
+    One newest-first page of queryset after `cursor` (None for the first
+    page). Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'id__lt': row_id}))
+
+    # One extra row tells whether another page exists without a COUNT
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, field), last.id)
@@ -0,0 +1,208 @@
+# analysis_api/profiling.py
+"""
+On-demand profiling for the analysis endpoints.
+
+A request is profiled when it carries an X-Profile-Token header matching
+PROFILING_ADMIN_TOKEN, or when it is picked by PROFILING_SAMPLE_RATE. The
+view runs under cProfile and tracemalloc; the raw .prof dump and a JSON
+summary (hottest call stacks, top allocation sites) are written to a bounded
+directory that admins can browse through /api/admin/profiles/. Only admin
+requests get the X-Profile-Id response header; sampled clients can't tell
+they were profiled.
+"""
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+
+PROFILE_HEADER = 'X-Profile-Token'
+
+# cProfile and tracemalloc are process-global enough that overlapping
+# profiles would blur each other, so only one request is profiled at a time.
+_profile_lock = threading.Lock()
+
+
+def _profiling_dir():
+    return settings.PROFILING_DIR
+
+
+def is_admin_request(request) -> bool:
+    """True if the request carries the configured admin profiling token."""
+    expected = getattr(settings, 'PROFILING_ADMIN_TOKEN', '')
+    supplied = request.headers.get(PROFILE_HEADER, '')
+    return bool(expected) and hmac.compare_digest(supplied, expected)
+
+
+def _should_profile(is_admin) -> bool:
+    if is_admin:
+        return True
+    sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def _top_functions(profiler, limit=30):
+    """Summarize the hottest call sites by cumulative time."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats('cumulative')
+    rows = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, total_calls, own_time, cumulative_time, _ = stats.stats[func]
+        filename, line, name = func
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': total_calls,
+            'own_seconds': round(own_time, 6),
+            'cumulative_seconds': round(cumulative_time, 6),
+        })
+    return rows
+
+
+def _top_allocations(snapshot, limit=20):
+    """Summarize the allocation sites still holding the most memory."""
+    rows = []
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        rows.append({
+            'location': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count,
+        })
+    return rows
+
+
+def _rotate(directory, keep):
+    """Keep only the newest `keep` profiles in the directory."""
+    summaries = sorted(
+        (name for name in os.listdir(directory) if name.endswith('.json')),
+        reverse=True,
+    )
+    for name in summaries[keep:]:
+        profile_id = name[:-len('.json')]
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def _save_profile(view_name, request, profiler, wall_seconds, snapshot, peak_bytes):
+    directory = _profiling_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    # Timestamp prefix keeps names sortable by age for rotation and listing;
+    # microseconds, so profiles taken within one second still sort in order
+    profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{view_name}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+
+    summary = {
+        'id': profile_id,
+        'view': view_name,
+        'method': request.method,
+        'path': request.path,
+        'created_at': time.time(),
+        'wall_seconds': round(wall_seconds, 6),
+        'peak_memory_kb': round(peak_bytes / 1024, 1),
+        'top_functions': _top_functions(profiler),
+        'top_allocations': _top_allocations(snapshot),
+    }
+    with open(os.path.join(directory, f'{profile_id}.json'), 'w') as f:
+        json.dump(summary, f)
+
+    _rotate(directory, getattr(settings, 'PROFILING_MAX_FILES', 50))
+    return profile_id
+
+
+def profile_request(view_func):
+    """
+    Decorator that profiles the wrapped view when the request opts in
+    (admin header or sampling); otherwise it costs one header lookup.
+    """
+    view_name = view_func.__name__
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        is_admin = is_admin_request(request)
+        if not _should_profile(is_admin) or not _profile_lock.acquire(blocking=False):
+            return view_func(request, *args, **kwargs)
+
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = view_func(request, *args, **kwargs)
+            finally:
+                profiler.disable()
+                wall_seconds = time.perf_counter() - start
+                snapshot = tracemalloc.take_snapshot()
+                _, peak_bytes = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+
+            try:
+                profile_id = _save_profile(view_name, request, profiler, wall_seconds, snapshot, peak_bytes)
+                if is_admin:
+                    response['X-Profile-Id'] = profile_id
+            except OSError:
+                # Never fail the request because the profile couldn't be stored
+                pass
+            return response
+        finally:
+            _profile_lock.release()
+
+    return wrapper
+
+
+def list_profiles():
+    """Return stored profile summaries, newest first, without the heavy tables."""
+    directory = _profiling_dir()
+    if not os.path.isdir(directory):
+        return []
+
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        summary = load_profile(name[:-len('.json')])
+        if summary:
+            summary.pop('top_functions', None)
+            summary.pop('top_allocations', None)
+            profiles.append(summary)
+    return profiles
+
+
+def load_profile(profile_id):
+    """Load one profile summary, or None if it doesn't exist."""
+    path = profile_path(profile_id, '.json')
+    if path is None:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def profile_path(profile_id, suffix='.prof'):
+    """Resolve a profile file path, refusing anything outside the profiling dir."""
+    separators = [sep for sep in (os.sep, os.altsep) if sep]
+    if not profile_id or profile_id.startswith('.') or any(sep in profile_id for sep in separators):
+        return None
+    path = os.path.join(_profiling_dir(), profile_id + suffix)
+    return path if os.path.isfile(path) else None
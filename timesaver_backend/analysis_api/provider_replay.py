@@ -0,0 +1,340 @@
+# analysis_api/provider_replay.py
+"""
+Record/replay of the pipeline's calls to YouTube and Gemini.
+
+recording() lets analysis_core use the real clients but captures every
+call it makes (pytube, the transcript API, oEmbed, the watch page and
+Gemini) together with its latency, grouped per video. replaying() serves
+those recordings instead of the network, sleeping for the recorded latency
+times latency_scale (0 for CPU-only runs), so orchestrate_analysis runs
+offline and returns the same result every time.
+
+A corpus is a directory with one gzipped JSON fixture per video
+(CORPUS_DIR by default, filled by `manage.py record_provider_fixtures`);
+fixtures built in code can be passed to replaying() alongside it. Watch
+pages are stored as the fragment the pipeline parses plus the page's size,
+and are padded back to that size on replay so parsing them costs the same.
+
+Calls are keyed by video id. Gemini calls carry none, so they belong to
+the video whose metadata the same thread fetched last; that is the order
+orchestrate_analysis runs them in. They are also keyed by PROMPT_VERSION,
+so after a prompt change replay misses instead of serving answers to the
+old prompt; re-record the corpus then.
+"""
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.utils import timezone
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'benchmarks', 'replay')
+
+# Responses larger than this keep only what the pipeline parses out of them
+MAX_BODY_CHARS = 64 * 1024
+_LENGTH_FRAGMENT = re.compile(r'"lengthSeconds":"\d+"')
+
+_current = threading.local()
+
+
+class ReplayMiss(Exception):
+    """The corpus has no recording of this call."""
+
+
+class ReplayedError(Exception):
+    """The provider raised this error when the call was recorded."""
+
+
+def _video_id(url):
+    match = re.search(r'v=([a-zA-Z0-9_-]{11})', url)
+    return match.group(1) if match else url
+
+
+def _snippets(rows):
+    return SimpleNamespace(snippets=[SimpleNamespace(start=start, text=text) for start, text in rows])
+
+
+def _prompt_version():
+    from .analysis_core import PROMPT_VERSION
+    return PROMPT_VERSION
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    """{video_id: fixture} for every fixture file (.json.gz, or plain .json) in corpus_dir."""
+    corpus = {}
+    for name in sorted(os.listdir(corpus_dir)):
+        path = os.path.join(corpus_dir, name)
+        if name.endswith('.json.gz'):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                fixture = json.load(f)
+        elif name.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                fixture = json.load(f)
+        else:
+            continue
+        corpus[fixture['video_id']] = fixture
+    return corpus
+
+
+@contextmanager
+def _patched(**attrs):
+    """Swap attributes of analysis_core for the duration of the block."""
+    from . import analysis_core
+    saved = {name: getattr(analysis_core, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(analysis_core, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(analysis_core, name, value)
+
+
+# --- Replay ---
+
+class _Replayer:
+    def __init__(self, corpus, latency_scale):
+        self.latency_scale = latency_scale
+        self.calls = {
+            tuple(call['key']): call
+            for fixture in corpus.values() for call in fixture['calls']
+        }
+
+    def serve(self, *key):
+        call = self.calls.get(key)
+        if call is None:
+            raise ReplayMiss(f"No recording of {key}")
+        if self.latency_scale:
+            time.sleep(call['latency'] * self.latency_scale)
+        if 'error' in call:
+            raise ReplayedError(call['error'])
+        return call['result']
+
+
+def _replay_clients(replayer):
+    """Stand-ins for the clients analysis_core uses, serving recordings."""
+
+    class YouTube:
+        def __init__(self, url):
+            video_id = _current.video_id = _video_id(url)
+            result = replayer.serve('pytube', video_id)
+            self.title = result['title']
+            self.length = result['length']
+            self.thumbnail_url = result['thumbnail_url']
+
+    class Transcript:
+        def __init__(self, video_id, language_code, is_generated):
+            self.video_id = video_id
+            self.language_code = language_code
+            self.is_generated = is_generated
+
+        def fetch(self):
+            return _snippets(replayer.serve('transcript_list_fetch', self.video_id, self.language_code))
+
+    class TranscriptApi:
+        def fetch(self, video_id, languages=('en',)):
+            _current.video_id = video_id
+            return _snippets(replayer.serve('transcript', video_id, *languages))
+
+        def list(self, video_id):
+            entries = replayer.serve('transcript_list', video_id)
+            return SimpleNamespace(transcripts=[
+                Transcript(video_id, entry['language_code'], entry['is_generated']) for entry in entries
+            ])
+
+    class Model:
+        def generate_content(self, prompt):
+            result = replayer.serve('gemini', getattr(_current, 'video_id', ''), _prompt_version())
+            prompt_tokens, output_tokens = result['usage']
+            return SimpleNamespace(
+                text=result['text'],
+                usage_metadata=SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=output_tokens),
+            )
+
+    class Response:
+        def __init__(self, status_code, text):
+            self.status_code = status_code
+            self.text = text
+
+        def json(self):
+            return json.loads(self.text)
+
+    class Requests:
+        """The part of the requests module analysis_core uses."""
+
+        def get(self, url, timeout=None):
+            result = replayer.serve('http', _video_id(url), url)
+            body = result['body']
+            if result.get('size', 0) > len(body):
+                body = ' ' * (result['size'] - len(body)) + body
+            return Response(result['status'], body)
+
+    return {
+        'YouTube': YouTube,
+        'YouTubeTranscriptApi': TranscriptApi,
+        'model': Model(),
+        'requests': Requests(),
+    }
+
+
+@contextmanager
+def replaying(corpus_dir=CORPUS_DIR, latency_scale=1.0, fixtures=()):
+    """
+    Run analysis_core against the corpus, plus any extra fixture dicts,
+    instead of the network. Yields the corpus.
+    """
+    corpus = load_corpus(corpus_dir) if corpus_dir else {}
+    corpus.update((fixture['video_id'], fixture) for fixture in fixtures)
+    with _patched(client_initialized=True, **_replay_clients(_Replayer(corpus, latency_scale))):
+        yield corpus
+
+
+# --- Recording ---
+
+class Recorder:
+    """Calls captured while recording, per video."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def record(self, kind, video_id, key, call, capture=lambda result: result):
+        """Run call(), storing capture(its result) or its error under (kind, video_id, *key)."""
+        entry = {'key': [kind, video_id, *key]}
+        started = time.perf_counter()
+        try:
+            result = call()
+            entry['result'] = capture(result)
+        except Exception as e:
+            entry['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            entry['latency'] = round(time.perf_counter() - started, 4)
+            with self._lock:
+                self.calls.setdefault(video_id, []).append(entry)
+        return result
+
+    def save(self, video_id, corpus_dir=CORPUS_DIR, label=''):
+        """Write the video's calls as a fixture file. Returns its path."""
+        return save_fixture({
+            'video_id': video_id,
+            'label': label,
+            'recorded_at': timezone.now().isoformat(),
+            'calls': self.calls.get(video_id, []),
+        }, corpus_dir)
+
+
+def save_fixture(fixture, corpus_dir=CORPUS_DIR):
+    """
+    Write a fixture as compact gzipped JSON (transcripts make them large).
+    The gzip header carries no timestamp, so re-saving identical calls
+    gives an identical file. Returns its path.
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, f"{fixture['video_id']}.json.gz")
+    content = json.dumps(fixture, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(gzip.compress(content, mtime=0))
+    return path
+
+
+def _capture_response(response):
+    body = response.text
+    captured = {'status': response.status_code, 'body': body}
+    if len(body) > MAX_BODY_CHARS:
+        match = _LENGTH_FRAGMENT.search(body)
+        captured.update(body=match.group(0) if match else '', size=len(body))
+    return captured
+
+
+def _recording_clients(recorder, real):
+    """Wrappers around the real clients that record every call."""
+
+    class YouTube:
+        def __init__(self, url):
+            video_id = _current.video_id = _video_id(url)
+
+            def fetch():
+                # pytube loads lazily; read everything the pipeline uses now
+                video = real['YouTube'](url)
+                return {'title': video.title, 'length': video.length, 'thumbnail_url': video.thumbnail_url}
+
+            result = recorder.record('pytube', video_id, [], fetch)
+            self.title = result['title']
+            self.length = result['length']
+            self.thumbnail_url = result['thumbnail_url']
+
+    def rows(fetched):
+        return [[snippet.start, snippet.text] for snippet in fetched.snippets]
+
+    class Transcript:
+        def __init__(self, video_id, transcript):
+            self.video_id = video_id
+            self.transcript = transcript
+            self.language_code = transcript.language_code
+            self.is_generated = transcript.is_generated
+
+        def fetch(self):
+            fetched = recorder.record(
+                'transcript_list_fetch', self.video_id, [self.language_code], self.transcript.fetch, rows,
+            )
+            return _snippets(rows(fetched))
+
+    class TranscriptApi:
+        def __init__(self):
+            self.api = real['YouTubeTranscriptApi']()
+
+        def fetch(self, video_id, languages=('en',)):
+            _current.video_id = video_id
+            fetched = recorder.record(
+                'transcript', video_id, list(languages),
+                lambda: self.api.fetch(video_id, languages=languages), rows,
+            )
+            return _snippets(rows(fetched))
+
+        def list(self, video_id):
+            listed = recorder.record(
+                'transcript_list', video_id, [], lambda: self.api.list(video_id),
+                lambda result: [
+                    {'language_code': t.language_code, 'is_generated': t.is_generated} for t in result.transcripts
+                ],
+            )
+            return SimpleNamespace(transcripts=[Transcript(video_id, t) for t in listed.transcripts])
+
+    class Model:
+        def generate_content(self, prompt):
+            def capture(response):
+                usage = response.usage_metadata
+                return {'text': response.text, 'usage': [usage.prompt_token_count, usage.candidates_token_count]}
+
+            return recorder.record(
+                'gemini', getattr(_current, 'video_id', ''), [_prompt_version()],
+                lambda: real['model'].generate_content(prompt), capture,
+            )
+
+    class Requests:
+        def get(self, url, timeout=None):
+            return recorder.record(
+                'http', _video_id(url), [url], lambda: real['requests'].get(url, timeout=timeout), _capture_response,
+            )
+
+    return {
+        'YouTube': YouTube,
+        'YouTubeTranscriptApi': TranscriptApi,
+        'model': Model(),
+        'requests': Requests(),
+    }
+
+
+@contextmanager
+def recording():
+    """Run analysis_core against the real providers, recording every call. Yields the Recorder."""
+    from . import analysis_core
+    recorder = Recorder()
+    real = {name: getattr(analysis_core, name) for name in ('YouTube', 'YouTubeTranscriptApi', 'model', 'requests')}
+    with _patched(**_recording_clients(recorder, real)):
+        yield recorder
@@ -0,0 +1,107 @@
+# analysis_api/provider_stubs.py
+"""
+Local stand-ins for YouTube and Gemini, for load testing.
+
+With PROVIDER_STUBS['ENABLED'] (TIMESAVER_PROVIDER_STUBS=1) the app swaps
+the pytube, transcript and Gemini clients used by analysis_core for fakes
+that sleep for a configurable latency (+/-50% jitter) and return
+deterministic data derived from the video id. The real pipeline code, stage
+metrics and work quotas still run, so only the network calls are faked.
+Never enable this in production: every analysis would be made up.
+"""
+import hashlib
+import json
+import logging
+import random
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+
+from . import log_events as events
+from .log_events import log_event
+
+logger = logging.getLogger(__name__)
+
+# Highlight titles are drawn from these, so searches have something to find
+TOPICS = (
+    'python', 'django', 'database', 'caching', 'latency', 'security',
+    'testing', 'deployment', 'design', 'algorithms', 'networking', 'career',
+)
+
+
+def _config():
+    config = getattr(settings, 'PROVIDER_STUBS', {})
+    return {
+        'youtube_latency': config.get('YOUTUBE_LATENCY_MS', 150) / 1000,
+        'gemini_latency': config.get('GEMINI_LATENCY_MS', 1500) / 1000,
+    }
+
+
+def _simulate(latency):
+    if latency > 0:
+        time.sleep(latency * random.uniform(0.5, 1.5))
+
+
+def _seed(text):
+    return int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+
+
+class StubYouTube:
+    """pytube.YouTube lookalike."""
+
+    def __init__(self, url):
+        _simulate(_config()['youtube_latency'])
+        video_id = url.rsplit('=', 1)[-1]
+        self.title = f"Stand-in video {video_id}"
+        self.length = 120 + _seed(video_id) % 3600
+        self.thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
+
+
+class StubTranscriptApi:
+    """YouTubeTranscriptApi lookalike: one caption every 15 seconds of video."""
+
+    def fetch(self, video_id, languages=None):
+        _simulate(_config()['youtube_latency'])
+        rng = random.Random(_seed(video_id))
+        length = 120 + _seed(video_id) % 3600
+        return SimpleNamespace(snippets=[
+            SimpleNamespace(start=float(start), text=f"Now let's talk about {rng.choice(TOPICS)} for a moment.")
+            for start in range(0, length, 15)
+        ])
+
+
+class StubModel:
+    """genai.GenerativeModel lookalike returning three to six highlights."""
+
+    def generate_content(self, prompt):
+        _simulate(_config()['gemini_latency'])
+        rng = random.Random(_seed(prompt))
+        highlights = [
+            {
+                'agent': rng.choice(('The Teacher', 'The Analyst', 'The Explorer')),
+                'timestamp': f"{minute:02d}:{rng.randrange(60):02d}",
+                'title': f"Key point about {rng.choice(TOPICS)}",
+                'description': f"A closer look at {rng.choice(TOPICS)} and {rng.choice(TOPICS)}.",
+            }
+            for minute in sorted(rng.sample(range(60), rng.randint(3, 6)))
+        ]
+        text = json.dumps(highlights)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4),
+        )
+
+
+def install():
+    """Point analysis_core at the stand-ins (process-wide)."""
+    from . import analysis_core
+    analysis_core.YouTube = StubYouTube
+    analysis_core.YouTubeTranscriptApi = StubTranscriptApi
+    analysis_core.model = StubModel()
+    analysis_core.client_initialized = True
+    config = _config()
+    log_event(
+        logger, events.PROVIDER_STUBS_INSTALLED, level=logging.WARNING,
+        youtube_ms=int(config['youtube_latency'] * 1000), gemini_ms=int(config['gemini_latency'] * 1000),
+    )
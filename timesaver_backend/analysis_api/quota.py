@@ -0,0 +1,169 @@
+# analysis_api/quota.py
+"""
+Cost-weighted work quotas.
+
+RateLimiter counts requests; this module charges each device for the work
+its requests actually caused. The pipeline reports outbound fetches and
+Gemini token usage to a per-request WorkMeter, the view converts that into
+integer work units (WORK_QUOTA['COSTS']) and charges them against a rolling
+per-device budget kept in the same shared counters as the rate limits.
+Cached analyses cost nothing, so cheap requests are never throttled by it.
+"""
+import contextvars
+import logging
+import math
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils import timezone
+
+from . import log_events as events
+from .log_events import log_event
+from .rate_limit_backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COSTS = {
+    'input_tokens_per_unit': 1000,   # 1 unit per 1k prompt tokens
+    'output_tokens_per_unit': 250,   # output tokens are ~4x the price
+    'fetch': 1,                      # each outbound YouTube request
+    'analysis': 1,                   # base charge for an uncached analysis
+    'cache_hit': 0,                  # stored results are free
+}
+
+# Endpoints whose requests draw from the work budget
+METERED_PATHS = ('/api/analyze/',)
+
+
+def _config():
+    config = getattr(settings, 'WORK_QUOTA', {})
+    return {
+        'budget': config.get('BUDGET', 300),
+        'window_seconds': config.get('WINDOW_SECONDS', 86400),
+        'costs': {**DEFAULT_COSTS, **config.get('COSTS', {})},
+    }
+
+
+# --- Work metering ---
+
+class WorkMeter:
+    """
+    Tallies the billable work done while handling one request. before_fetch,
+    if set, is called ahead of every outbound fetch (e.g. to pace them).
+    """
+    __slots__ = ('fetches', 'input_tokens', 'output_tokens', 'before_fetch')
+
+    def __init__(self, before_fetch=None):
+        self.fetches = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.before_fetch = before_fetch
+
+    def units(self, costs=None) -> int:
+        costs = costs or _config()['costs']
+        return (
+            costs['analysis']
+            + self.fetches * costs['fetch']
+            + math.ceil(self.input_tokens / costs['input_tokens_per_unit'])
+            + math.ceil(self.output_tokens / costs['output_tokens_per_unit'])
+        )
+
+
+_current_meter = contextvars.ContextVar('work_meter', default=None)
+
+
+@contextmanager
+def metered(before_fetch=None):
+    """Collect work reported by the pipeline while the block runs."""
+    meter = WorkMeter(before_fetch)
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+
+
+def record_fetch(count=1):
+    """
+    Report outbound HTTP requests made on behalf of the current request.
+    Called right before the requests are made.
+    """
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.fetches += count
+        if meter.before_fetch is not None:
+            for _ in range(count):
+                meter.before_fetch()
+
+
+def record_tokens(input_tokens, output_tokens):
+    """Report LLM token usage for the current request."""
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.input_tokens += input_tokens or 0
+        meter.output_tokens += output_tokens or 0
+
+
+# --- Budget accounting ---
+
+def _apply(device_id, units):
+    """Add units to the device's rolling budget; returns (remaining, reset_time)."""
+    config = _config()
+    window_seconds = config['window_seconds']
+    now = timezone.now().timestamp()
+    window_index = int(now // window_seconds)
+    elapsed_fraction = (now % window_seconds) / window_seconds
+
+    current_used, previous_used = get_backend().hit(
+        f"work_quota:{device_id[:16]}", window_index, window_seconds * 2, units
+    )
+    used = previous_used * (1 - elapsed_fraction) + current_used
+    remaining = int(config['budget'] - used)
+    return remaining, (window_index + 1) * window_seconds
+
+
+def check_budget(device_id):
+    """
+    Peek at the device's remaining budget without charging it.
+    Returns: (allowed: bool, remaining: int, reset_time: int)
+    """
+    remaining, reset_time = _apply(device_id, 0)
+    return remaining > 0, max(0, remaining), reset_time
+
+
+def charge(device_id, units):
+    """
+    Charge work units to the device once the work is done.
+    Returns: (remaining: int, reset_time: int)
+    """
+    if units <= 0:
+        return check_budget(device_id)[1:]
+    remaining, reset_time = _apply(device_id, units)
+    log_event(logger, events.QUOTA_CHARGED, device=device_id[:8], units=units, remaining=remaining)
+    return max(0, remaining), reset_time
+
+
+def cache_hit_units() -> int:
+    """Units charged for answering from a stored analysis (free by default)."""
+    return _config()['costs']['cache_hit']
+
+
+def attach_budget(request, remaining, reset_time):
+    """Expose budget state to add_rate_limit_headers."""
+    request.work_budget_limit = _config()['budget']
+    request.work_budget_remaining = remaining
+    request.work_budget_reset = reset_time
+
+
+def get_budget_exceeded_response(device_id, reset_time):
+    """Standardized 429 for an exhausted work budget (same shape as rate limits)."""
+    reset_in = max(0, int(reset_time - timezone.now().timestamp()))
+    log_event(logger, events.QUOTA_EXHAUSTED, level=logging.WARNING, device=device_id[:8], reset_in=reset_in)
+    return JsonResponse({
+        'error': 'Work budget exhausted',
+        'detail': f'Analysis budget used up. Try again in {reset_in} seconds.',
+        'retry_after': reset_in,
+        'remaining_requests': 0,
+        'reset_time': reset_time
+    }, status=429)
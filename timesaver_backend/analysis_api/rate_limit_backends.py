@@ -0,0 +1,202 @@
+# analysis_api/rate_limit_backends.py
+"""
+Storage backends for RateLimiter's sliding-window counters.
+
+A backend only has to do two things: atomically add to the counter of the
+current fixed window while reading the previous window's count (one round
+trip), and undo a bump for rejected requests. Adding 0 is a cheap peek.
+Counters are integers; request limits add 1, work quotas add work units. Counters must be shared by
+every worker process, otherwise N workers allow N times the limit, so the
+default is an SQLite file on local disk; RedisBackend shares them across
+nodes. The configured backend is wrapped in ResilientBackend, which falls
+back to the per-process Django cache while the shared store is unavailable.
+"""
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from . import log_events as events
+from . import metrics
+from .log_events import log_event
+
+logger = logging.getLogger(__name__)
+
+
+class BackendUnavailable(Exception):
+    """Raised when the shared counter store can't be reached."""
+
+
+class CacheBackend:
+    """Counters in the Django cache. Only process-local with LocMemCache."""
+
+    def hit(self, key, window_index, ttl, amount=1):
+        current_key = f"{key}:{window_index}"
+        cache.add(current_key, 0, ttl)
+        try:
+            current_count = cache.incr(current_key, amount)
+        except ValueError:
+            # Evicted between add() and incr(); start the window over
+            cache.set(current_key, amount, ttl)
+            current_count = amount
+        return current_count, cache.get(f"{key}:{window_index - 1}", 0)
+
+    def undo(self, key, window_index):
+        try:
+            cache.decr(f"{key}:{window_index}")
+        except ValueError:
+            pass
+
+
+class SQLiteBackend:
+    """
+    Counters in an SQLite file shared by every worker on the node.
+    WAL mode lets readers and the single writer proceed concurrently and
+    each hit is one UPSERT ... RETURNING statement.
+    """
+
+    _UPSERT = (
+        "INSERT INTO rate_limit_counters (key, window, count, expires_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (key, window) DO UPDATE SET count = count + excluded.count "
+        "RETURNING count, (SELECT p.count FROM rate_limit_counters AS p "
+        "WHERE p.key = rate_limit_counters.key AND p.window = rate_limit_counters.window - 1)"
+    )
+
+    def __init__(self, path, timeout=0.5, purge_probability=0.001):
+        self.path = path
+        self.timeout = timeout
+        self.purge_probability = purge_probability
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_counters ("
+                "key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (key, window)) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, window_index, ttl, amount=1):
+        now = time.time()
+        try:
+            conn = self._connection()
+            current_count, previous_count = conn.execute(self._UPSERT, (key, window_index, amount, now + ttl)).fetchone()
+            if random.random() < self.purge_probability:
+                conn.execute("DELETE FROM rate_limit_counters WHERE expires_at < ?", (now,))
+        except sqlite3.Error as e:
+            raise BackendUnavailable(str(e)) from e
+        return current_count, previous_count or 0
+
+    def undo(self, key, window_index):
+        try:
+            self._connection().execute(
+                "UPDATE rate_limit_counters SET count = count - 1 WHERE key = ? AND window = ? AND count > 0",
+                (key, window_index),
+            )
+        except sqlite3.Error as e:
+            raise BackendUnavailable(str(e)) from e
+
+
+class RedisBackend:
+    """
+    Counters in Redis (or anything speaking its protocol), shared across
+    nodes. INCRBY, EXPIRE and the previous-window GET are pipelined so a hit
+    is one round trip. Pass `client` to use an existing or stand-in client.
+    """
+
+    def __init__(self, url=None, client=None, socket_timeout=0.2):
+        if client is None:
+            import redis  # Optional dependency, only needed for this backend
+            client = redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+        self.client = client
+
+    def hit(self, key, window_index, ttl, amount=1):
+        current_key = f"{key}:{window_index}"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incrby(current_key, amount)
+            pipe.expire(current_key, int(ttl))
+            pipe.get(f"{key}:{window_index - 1}")
+            current_count, _, previous_count = pipe.execute()
+        except Exception as e:
+            raise BackendUnavailable(str(e)) from e
+        return int(current_count), int(previous_count or 0)
+
+    def undo(self, key, window_index):
+        try:
+            self.client.decr(f"{key}:{window_index}")
+        except Exception as e:
+            raise BackendUnavailable(str(e)) from e
+
+
+class ResilientBackend:
+    """
+    Uses the shared backend, falling back to process-local counters when it
+    fails. After a failure the shared backend is skipped for retry_seconds
+    so requests don't each pay a connection timeout.
+    """
+
+    def __init__(self, primary, fallback=None, retry_seconds=5.0):
+        self.primary = primary
+        self.fallback = fallback or CacheBackend()
+        self.retry_seconds = retry_seconds
+        self._down_until = 0.0
+
+    def _call(self, method, *args):
+        if time.monotonic() >= self._down_until:
+            try:
+                return getattr(self.primary, method)(*args)
+            except BackendUnavailable as e:
+                self._down_until = time.monotonic() + self.retry_seconds
+                metrics.inc(metrics.FALLBACKS, kind='rate_limit_local')
+                log_event(
+                    logger, events.RATE_LIMIT_BACKEND_DOWN, level=logging.WARNING,
+                    backend=type(self.primary).__name__, error=e,
+                )
+        return getattr(self.fallback, method)(*args)
+
+    def hit(self, key, window_index, ttl, amount=1):
+        return self._call('hit', key, window_index, ttl, amount)
+
+    def undo(self, key, window_index):
+        return self._call('undo', key, window_index)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Build (once per process) the backend configured in RATE_LIMIT_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'RATE_LIMIT_BACKEND', {})
+                backend_class = import_string(config.get('BACKEND', 'analysis_api.rate_limit_backends.CacheBackend'))
+                try:
+                    primary = backend_class(**config.get('OPTIONS', {}))
+                except ImportError as e:
+                    log_event(logger, events.RATE_LIMIT_BACKEND_DOWN, level=logging.ERROR, backend=backend_class.__name__, error=e)
+                    primary = CacheBackend()
+                _backend = ResilientBackend(primary, retry_seconds=config.get('RETRY_SECONDS', 5.0))
+    return _backend
+
+
+def reset_backend():
+    """Forget the cached backend (after settings change)."""
+    global _backend
+    _backend = None
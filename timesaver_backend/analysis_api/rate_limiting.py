@@ -1,7 +1,9 @@
 # analysis_api/rate_limiting.py
-from django.core.cache import cache
 from django.http import JsonResponse
 from django.utils import timezone
+from . import log_events as events
+from .log_events import log_event
+from .rate_limit_backends import get_backend
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,10 +25,25 @@ class RateLimiter:
             'window_seconds': 60,
             'endpoint': '/api/search/',
         },
+        'transcript_search': {
+            'max_requests': 30,
+            'window_seconds': 60,
+            'endpoint': '/api/transcripts/search/',
+        },
         'history': {
             'max_requests': 20,     # Moderate for history
             'window_seconds': 60,
             'endpoint': '/api/history/',
+        },
+        'export': {
+            'max_requests': 5,      # Full-history dumps are heavy
+            'window_seconds': 300,
+            'endpoint': '/api/export/',
+        },
+        'import': {
+            'max_requests': 5,
+            'window_seconds': 300,
+            'endpoint': '/api/import/',
         }
     }
     
@@ -35,6 +52,11 @@ class RateLimiter:
         """
         Check if device has exceeded rate limit for the endpoint
         Returns: (allowed: bool, remaining: int, reset_time: int)
+        
+        Uses a sliding-window counter: two fixed-window counters (current and
+        previous), with the previous one weighted by how much of it still
+        overlaps the sliding window. Each check is one atomic round trip to the
+        shared counter store (see rate_limit_backends) regardless of max_requests.
         """
         
         # Determine which rate limit to apply
@@ -48,48 +70,42 @@ class RateLimiter:
             # No rate limit configured for this endpoint
             return True, 999, 0
         
-        # Create cache key for this device + endpoint
-        cache_key = f"rate_limit:{device_id[:16]}:{limit_type}"
         window_seconds = rate_config['window_seconds']
         max_requests = rate_config['max_requests']
         
-        # Get current timestamp
-        now = int(timezone.now().timestamp())
+        # Get current timestamp and the fixed window it falls in
+        now = timezone.now().timestamp()
+        window_index = int(now // window_seconds)
+        elapsed_fraction = (now % window_seconds) / window_seconds
         
-        # Get existing requests in current window
-        request_times = cache.get(cache_key, [])
+        # Count this request in the current window and read the previous one,
+        # keeping each counter alive for two windows
+        backend = get_backend()
+        counter_key = f"rate_limit:{device_id[:16]}:{limit_type}"
+        current_count, previous_count = backend.hit(counter_key, window_index, window_seconds * 2)
         
-        # Remove requests outside the current window
-        cutoff_time = now - window_seconds
-        request_times = [t for t in request_times if t > cutoff_time]
+        # Estimate requests in the sliding window ending now
+        estimated = previous_count * (1 - elapsed_fraction) + current_count
+        reset_time = (window_index + 1) * window_seconds
         
         # Check if limit exceeded
-        if len(request_times) >= max_requests:
-            # Rate limit exceeded
-            oldest_request = min(request_times) if request_times else now
-            reset_time = oldest_request + window_seconds
-            remaining = 0
+        if estimated > max_requests:
+            # Rejected requests don't consume quota
+            backend.undo(counter_key, window_index)
             
-            logger.warning(
-                f"Rate limit exceeded for device {device_id[:8]}... "
-                f"on {limit_type}: {len(request_times)}/{max_requests} requests"
+            log_event(
+                logger, events.RATE_LIMIT_EXCEEDED, level=logging.WARNING,
+                device=device_id[:8], limit=limit_type,
+                used=int(estimated), max=max_requests,
             )
             
-            return False, remaining, reset_time
-        
-        # Add current request to the list
-        request_times.append(now)
-        
-        # Store updated request times (expire after window + 10 seconds buffer)
-        cache.set(cache_key, request_times, window_seconds + 10)
+            return False, 0, reset_time
         
-        remaining = max_requests - len(request_times)
-        reset_time = now + window_seconds
+        remaining = max(0, int(max_requests - estimated))
         
-        logger.info(
-            f"Rate limit check passed for device {device_id[:8]}... "
-            f"on {limit_type}: {len(request_times)}/{max_requests} requests, "
-            f"{remaining} remaining"
+        log_event(
+            logger, events.RATE_LIMIT_PASSED, level=logging.DEBUG,
+            device=device_id[:8], limit=limit_type, remaining=remaining,
         )
         
         return True, remaining, reset_time
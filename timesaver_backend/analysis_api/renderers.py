@@ -0,0 +1,68 @@
+# analysis_api/renderers.py
+"""
+orjson-backed DRF renderer and parser.
+
+orjson serializes the analysis payloads (nested lists of highlight dicts)
+several times faster than the stdlib encoder DRF uses and emits bytes
+directly. Output matches DRF's compact JSON for the types the API returns;
+anything orjson doesn't know falls back to DRF's encoder. Without orjson
+installed both classes behave exactly like DRF's JSON ones.
+"""
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; DRF's stdlib JSON is used without it
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+
+_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def dumps(data) -> bytes:
+    """Serialize like the API does (orjson when available)."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    # Datetimes pass through to DRF's encoder so their format stays the same
+    content = orjson.dumps(data, default=_fallback_encoder.default, option=_OPTIONS)
+    # Like DRF, escape U+2028/U+2029 so the output is also valid JavaScript
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def loads(data):
+    """Parse JSON bytes (orjson when available); ValueError if invalid."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        # Pretty-printing (?indent / Accept params) is a debugging aid; leave it to DRF
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser that decodes with orjson."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,207 @@
+# analysis_api/search_index.py
+"""
+Full-text search over analyses, backed by an SQLite FTS5 table.
+
+Each analysis is indexed as one row for its title plus one row per
+highlight (title + description), so a match can point at the highlight
+and timestamp that matched. The owning device is indexed as a single
+opaque token, so scoping a search to one device is an index intersection
+rather than a filter over every device's matches. Rows are ranked with
+bm25 and collapsed to the best row per analysis. The index is kept in sync
+by the signals in signals.py; without FTS5 search falls back to icontains.
+
+An analysis's rows are keyed by rowid analysis_id * ROW_STRIDE + 1 +
+highlight_index (the title row is highlight_index -1), so reindexing or
+deleting one is a rowid range lookup; analysis_id itself is an unindexed
+column that a DELETE could only find by scanning the whole table.
+"""
+import hashlib
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+FTS_TABLE = 'analysis_api_search_fts'
+
+# Rowids reserved per analysis: its title row plus up to 1023 highlights
+ROW_STRIDE = 1024
+
+# The table itself is created by migration 0003, and re-keyed by 0011
+_INSERT_SQL = (
+    f"INSERT INTO {FTS_TABLE} "
+    "(rowid, title, highlight_title, description, device_token, analysis_id, highlight_index, timestamp) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+)
+_DELETE_SQL = f"DELETE FROM {FTS_TABLE} WHERE rowid BETWEEN %s AND %s"
+
+# Column weights for bm25: title, highlight title, description, device token
+_BM25_WEIGHTS = '5.0, 3.0, 1.0, 0.0'
+
+_fts_available = None
+
+
+def is_available() -> bool:
+    """True if the default database has the FTS table (SQLite with FTS5)."""
+    global _fts_available
+    if _fts_available is None:
+        if connection.vendor != 'sqlite':
+            _fts_available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def device_token(device_id: str) -> str:
+    """Single alphanumeric token identifying a device inside the index."""
+    return 'd' + hashlib.sha1(device_id.encode()).hexdigest()[:20]
+
+
+def row_id(analysis_id, highlight_index=-1) -> int:
+    """Rowid of one of an analysis's rows (highlight_index -1 is the title)."""
+    return analysis_id * ROW_STRIDE + 1 + highlight_index
+
+
+def _rows_for(analysis):
+    """FTS rows for one analysis: its title, then one row per highlight."""
+    token = device_token(analysis.device_id)
+    rows = [(row_id(analysis.id), analysis.title, '', '', token, analysis.id, -1, '')]
+    highlights = analysis.highlights if isinstance(analysis.highlights, list) else []
+    for index, highlight in enumerate(highlights[:ROW_STRIDE - 1]):
+        if not isinstance(highlight, dict):
+            continue
+        rows.append((
+            row_id(analysis.id, index),
+            '',
+            highlight.get('title', ''),
+            highlight.get('description', ''),
+            token,
+            analysis.id,
+            index,
+            highlight.get('timestamp', ''),
+        ))
+    return rows
+
+
+def index_analyses(analyses):
+    """(Re)index analyses in one statement batch."""
+    if not is_available():
+        return
+    analyses = list(analyses)
+    if not analyses:
+        return
+    rows = [row for analysis in analyses for row in _rows_for(analysis)]
+    with connection.cursor() as cursor:
+        remove_analyses([analysis.id for analysis in analyses], cursor=cursor)
+        cursor.executemany(_INSERT_SQL, rows)
+
+
+def remove_analyses(analysis_ids, cursor=None):
+    """Drop analyses from the index."""
+    if not is_available() or not analysis_ids:
+        return
+    ranges = [(row_id(analysis_id), row_id(analysis_id) + ROW_STRIDE - 1) for analysis_id in analysis_ids]
+    if cursor is not None:
+        cursor.executemany(_DELETE_SQL, ranges)
+    else:
+        with connection.cursor() as own_cursor:
+            own_cursor.executemany(_DELETE_SQL, ranges)
+
+
+def build_match_query(query: str, device_id: str) -> str:
+    """
+    Turn free text into an FTS5 query scoped to one device: every word must
+    match, the last one as a prefix (search-as-you-type). User input never
+    reaches FTS5 syntax unquoted.
+    """
+    terms = re.findall(r'\w+', query.lower())
+    if not terms:
+        return ''
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return f'device_token : "{device_token(device_id)}" AND ' + ' AND '.join(quoted)
+
+
+def search(device_id, query, limit=50):
+    """
+    Ranked search over one device's analyses.
+    Returns a list of (analysis_id, match) with the best-matching highlight
+    (highlight_index -1 means the title matched), best match first.
+    """
+    match_query = build_match_query(query, device_id)
+    if not match_query:
+        return []
+
+    # Several highlights of one analysis can match; fetch extra rows so
+    # collapsing to one hit per analysis still fills the page. snippet()
+    # stays in this query: a second MATCH restricted by rowid would make
+    # FTS5 re-run the whole match.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT analysis_id, highlight_index, highlight_title, timestamp, "
+            f"snippet({FTS_TABLE}, -1, '[', ']', '…', 12), bm25({FTS_TABLE}, {_BM25_WEIGHTS}) AS score "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY score LIMIT %s",
+            [match_query, limit * 5],
+        )
+        rows = cursor.fetchall()
+
+    results = []
+    seen = set()
+    for analysis_id, highlight_index, highlight_title, timestamp, snippet, score in rows:
+        if analysis_id in seen:
+            continue
+        seen.add(analysis_id)
+        results.append((analysis_id, {
+            'highlight_index': highlight_index,
+            'highlight_title': highlight_title or None,
+            'timestamp': timestamp or None,
+            'snippet': snippet or None,
+            'score': round(-score, 4),
+        }))
+        if len(results) >= limit:
+            break
+    return results
+
+
+def search_analyses(queryset, device_id, query, limit=50):
+    """
+    Search a device's analyses, ranked. Returns (analyses, matches) where
+    matches maps analysis id to its best-matching highlight; without FTS5
+    the old unranked icontains scan is used (it only sees the titles of
+    cold-stored analyses) and matches is empty.
+    """
+    if not is_available():
+        analyses = queryset.filter(device_id=device_id).filter(
+            Q(content__title__icontains=query) |
+            Q(content__highlights_data__icontains=query)
+        ).order_by('-created_at')[:limit]
+        return list(analyses), {}
+
+    hits = search(device_id, query, limit)
+    by_id = queryset.filter(device_id=device_id).in_bulk([analysis_id for analysis_id, _ in hits])
+    analyses = [by_id[analysis_id] for analysis_id, _ in hits if analysis_id in by_id]
+    return analyses, dict(hits)
+
+
+def matching_analysis_ids(device_id, query, among=None):
+    """
+    Ids of all of a device's analyses matching query (for filtering other
+    tables), or None without FTS5. `among` is an optional single-column
+    queryset of analysis ids to restrict the match to, so the result is
+    bounded by that set rather than by a ranking cutoff.
+    """
+    if not is_available():
+        return None
+    match_query = build_match_query(query, device_id)
+    if not match_query:
+        return []
+    sql = f"SELECT DISTINCT analysis_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    params = [match_query]
+    if among is not None:
+        among_sql, among_params = among.query.sql_with_params()
+        sql += f" AND analysis_id IN ({among_sql})"
+        params.extend(among_params)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,62 @@
+# analysis_api/signals.py
+"""
+Keeps derived data in sync with VideoAnalysis writes.
+
+bulk_create() and QuerySet.update() don't send these signals, so code
+doing them must call the same helpers directly. QuerySet.delete() does
+send pre/post_delete for every row, cascaded bookmarks included (Django
+skips its fast path when receivers are connected); bulk_bookmarks relies
+on that.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import device_stats, embeddings, search_index, sync
+from .models import ChangeLogEntry, VideoAnalysis, VideoBookmark
+
+
+@receiver(pre_save, sender=VideoAnalysis)
+def analysis_saving(sender, instance, **kwargs):
+    # Updates need the old values to adjust the stats by the difference
+    if instance.pk is not None and not instance._state.adding:
+        previous = VideoAnalysis.objects.select_related('content').filter(pk=instance.pk).first()
+        instance._stats_previous = (previous.highlights, previous.duration) if previous else None
+
+
+@receiver(post_save, sender=VideoAnalysis)
+def analysis_saved(sender, instance, created, **kwargs):
+    search_index.index_analyses([instance])
+    previous = getattr(instance, '_stats_previous', None)
+    if created:
+        device_stats.analysis_added(instance)
+        # The vector files aren't transactional: touch them once the row is there to stay
+        transaction.on_commit(lambda: embeddings.append_analyses([instance]))
+    else:
+        if previous is not None:
+            device_stats.analysis_changed(instance, previous)
+        transaction.on_commit(lambda: embeddings.invalidate(instance.device_id))
+    op = ChangeLogEntry.OP_CREATE if created else ChangeLogEntry.OP_UPDATE
+    sync.record(instance.device_id, ChangeLogEntry.KIND_ANALYSIS, [instance.id], op)
+
+
+@receiver(post_delete, sender=VideoAnalysis)
+def analysis_deleted(sender, instance, **kwargs):
+    search_index.remove_analyses([instance.id])
+    device_stats.analysis_removed(instance)
+    transaction.on_commit(lambda: embeddings.invalidate(instance.device_id))
+    sync.record(instance.device_id, ChangeLogEntry.KIND_ANALYSIS, [instance.id], ChangeLogEntry.OP_DELETE)
+
+
+@receiver(post_save, sender=VideoBookmark)
+def bookmark_saved(sender, instance, created, **kwargs):
+    # Bookmarks are keyed by session_id, which holds the device id
+    device_stats.bump_version(instance.session_id)
+    op = ChangeLogEntry.OP_CREATE if created else ChangeLogEntry.OP_UPDATE
+    sync.record(instance.session_id, ChangeLogEntry.KIND_BOOKMARK, [instance.id], op)
+
+
+@receiver(post_delete, sender=VideoBookmark)
+def bookmark_deleted(sender, instance, **kwargs):
+    device_stats.bump_version(instance.session_id)
+    sync.record(instance.session_id, ChangeLogEntry.KIND_BOOKMARK, [instance.id], ChangeLogEntry.OP_DELETE)
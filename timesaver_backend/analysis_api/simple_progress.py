@@ -1,7 +1,13 @@
 # Simple progress tracking system
+import logging
 import time
 import threading
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from . import log_events as events
+from .log_events import log_event
+
+logger = logging.getLogger(__name__)
 
 # Global dictionary to store job progress
 jobs = {}
@@ -29,10 +35,12 @@ def create_job(youtube_url: str) -> str:
     
     return job_id
 
-def get_job_progress(job_id: str) -> Dict[str, Any]:
-    """Get progress for a job"""
+def get_job_progress(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get progress for a job (None if there is no such job)"""
     if job_id not in jobs:
-        return {'error': 'Job not found'}
+        log_event(logger, events.JOB_NOT_FOUND, level=logging.DEBUG, job_id=job_id)
+        return None
+    log_event(logger, events.JOB_POLLED, level=logging.DEBUG, job_id=job_id, status=jobs[job_id]['status'])
     return jobs[job_id]
 
 def simulate_work(job_id: str):
@@ -65,10 +73,12 @@ def simulate_work(job_id: str):
         
         job['result'] = result
         job['status'] = 'completed'
+        log_event(logger, events.JOB_COMPLETED, job_id=job_id)
         
     except Exception as e:
         job['error'] = str(e)
         job['status'] = 'failed'
+        log_event(logger, events.JOB_FAILED, level=logging.ERROR, job_id=job_id, error=e)
 
 def cleanup_old_jobs():
     """Remove jobs older than 1 hour"""
@@ -0,0 +1,186 @@
+# analysis_api/sync.py
+"""
+Delta sync for history and bookmarks.
+
+Every create/update/delete of a device's analyses and bookmarks appends a
+ChangeLogEntry (signals.py; bulk paths call record() themselves). A client
+keeps the id of the last entry it has seen as its cursor and asks for what
+changed after it; deletions arrive as tombstones (ids only). Entries for
+the same object collapse to the newest one, both per response and during
+compaction, so clients must treat created/updated as upserts.
+
+Compaction also drops entries older than the retention period and raises
+the device's DeviceStats.sync_floor; a cursor below the floor can't be
+replayed and gets a full snapshot instead.
+
+Snapshots are paged like history (keyset on created_at, id), analyses
+first and then bookmarks. While pages remain, the returned cursor is an
+opaque snapshot token ('s...') rather than a log id; clients just keep
+following has_more with whatever cursor they were given.
+"""
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import pagination
+from .models import ChangeLogEntry, DeviceStats, VideoAnalysis, VideoBookmark
+
+DEFAULT_BATCH_SIZE = 500
+SNAPSHOT_PAGE_SIZE = pagination.MAX_PAGE_SIZE
+DEFAULT_RETENTION_DAYS = 30
+
+
+def record(device_id, kind, object_ids, op):
+    """Append change entries for objects of one device."""
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(device_id=device_id, kind=kind, object_id=object_id, op=op)
+        for object_id in object_ids
+    ])
+
+
+def latest_cursor(device_id) -> int:
+    """Cursor that is current for the device (never below its sync floor)."""
+    latest = ChangeLogEntry.objects.filter(device_id=device_id).aggregate(latest=Max('id'))['latest'] or 0
+    sync_floor = DeviceStats.objects.filter(pk=device_id).values_list('sync_floor', flat=True).first() or 0
+    return max(latest, sync_floor)
+
+
+def _bookmark_dict(bookmark):
+    return {
+        'bookmark_id': bookmark.id,
+        'analysis_id': bookmark.video_analysis_id,
+        'bookmarked_at': bookmark.bookmarked_at.isoformat(),
+    }
+
+
+def is_snapshot_token(cursor) -> bool:
+    return cursor.startswith('s')
+
+
+def _encode_snapshot_token(cursor, phase, position):
+    return f"s{cursor}.{phase}.{position}"
+
+
+def _decode_snapshot_token(token):
+    """Return (log cursor, phase, keyset position) from a snapshot token."""
+    try:
+        cursor, phase, position = token[1:].split('.')
+        cursor = int(cursor)
+    except ValueError as e:
+        raise pagination.InvalidCursor(str(e)) from e
+    if phase not in ('a', 'b') or not position:
+        raise pagination.InvalidCursor("malformed snapshot token")
+    return cursor, phase, position
+
+
+def snapshot(device_id, analyses_queryset, token=None, page_size=SNAPSHOT_PAGE_SIZE):
+    """
+    One page of the full state for a (re)syncing client, continuing from
+    `token` (None for the first page). The log cursor is read before the
+    first page and carried in the token, so changes racing with any page
+    are replayed by the next delta. Raises pagination.InvalidCursor for a
+    malformed token.
+    """
+    if token:
+        cursor, phase, position = _decode_snapshot_token(token)
+    else:
+        cursor, phase, position = latest_cursor(device_id), 'a', None
+
+    analyses, bookmarks = [], []
+    if phase == 'a':
+        analyses, position = pagination.keyset_page(
+            analyses_queryset.filter(device_id=device_id), position, page_size,
+        )
+        if position is None:
+            phase = 'b'
+    if phase == 'b':
+        bookmarks, position = pagination.keyset_page(
+            VideoBookmark.objects.filter(session_id=device_id), position, page_size, field='bookmarked_at',
+        )
+
+    has_more = position is not None
+    return {
+        'cursor': _encode_snapshot_token(cursor, phase, position) if has_more else cursor,
+        'full_resync': True,
+        'has_more': has_more,
+        'analyses': {'created': analyses, 'updated': [], 'deleted': []},
+        'bookmarks': {'created': [_bookmark_dict(bookmark) for bookmark in bookmarks], 'deleted': []},
+    }
+
+
+def changes_since(device_id, cursor, analyses_queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Changes after `cursor`, at most batch_size log entries per call. Returns
+    None when the cursor predates compaction (caller sends a snapshot).
+    """
+    sync_floor = DeviceStats.objects.filter(pk=device_id).values_list('sync_floor', flat=True).first()
+    if sync_floor and cursor < sync_floor:
+        return None
+
+    entries = list(
+        ChangeLogEntry.objects.filter(device_id=device_id, id__gt=cursor)
+        .order_by('id')
+        .values_list('id', 'kind', 'object_id', 'op')[:batch_size + 1]
+    )
+    has_more = len(entries) > batch_size
+    entries = entries[:batch_size]
+
+    # Newest entry per object wins; objects created within this batch are
+    # reported as created even if they were updated afterwards
+    latest = {}
+    created = set()
+    for _, kind, object_id, op in entries:
+        latest[(kind, object_id)] = op
+        if op == ChangeLogEntry.OP_CREATE:
+            created.add((kind, object_id))
+
+    def object_ids(kind, deleted):
+        return [
+            object_id for (entry_kind, object_id), op in latest.items()
+            if entry_kind == kind and (op == ChangeLogEntry.OP_DELETE) == deleted
+        ]
+
+    # Objects deleted after this batch's last entry are skipped here; their
+    # tombstones arrive with a later batch
+    live_analysis_ids = object_ids(ChangeLogEntry.KIND_ANALYSIS, deleted=False)
+    analyses = analyses_queryset.filter(device_id=device_id).in_bulk(live_analysis_ids)
+    live_bookmark_ids = object_ids(ChangeLogEntry.KIND_BOOKMARK, deleted=False)
+    bookmarks = VideoBookmark.objects.filter(session_id=device_id).in_bulk(live_bookmark_ids)
+
+    return {
+        'cursor': entries[-1][0] if entries else cursor,
+        'full_resync': False,
+        'has_more': has_more,
+        'analyses': {
+            'created': [analyses[i] for i in live_analysis_ids if i in analyses and (ChangeLogEntry.KIND_ANALYSIS, i) in created],
+            'updated': [analyses[i] for i in live_analysis_ids if i in analyses and (ChangeLogEntry.KIND_ANALYSIS, i) not in created],
+            'deleted': object_ids(ChangeLogEntry.KIND_ANALYSIS, deleted=True),
+        },
+        'bookmarks': {
+            'created': [_bookmark_dict(bookmarks[i]) for i in live_bookmark_ids if i in bookmarks],
+            'deleted': object_ids(ChangeLogEntry.KIND_BOOKMARK, deleted=True),
+        },
+    }
+
+
+def compact(retention_days=DEFAULT_RETENTION_DAYS):
+    """
+    Collapse superseded entries and expire old ones, raising each affected
+    device's sync_floor. Returns (collapsed, expired) entry counts.
+    """
+    with transaction.atomic():
+        newest_per_object = (
+            ChangeLogEntry.objects.values('device_id', 'kind', 'object_id')
+            .annotate(newest=Max('id')).values('newest')
+        )
+        collapsed, _ = ChangeLogEntry.objects.exclude(id__in=newest_per_object).delete()
+
+        cutoff = timezone.now() - timezone.timedelta(days=retention_days)
+        expired = ChangeLogEntry.objects.filter(created_at__lt=cutoff)
+        floors = expired.values('device_id').annotate(floor=Max('id')).values_list('device_id', 'floor')
+        for device_id, floor in floors:
+            stats, _ = DeviceStats.objects.get_or_create(device_id=device_id)
+            if floor > stats.sync_floor:
+                DeviceStats.objects.filter(pk=device_id).update(sync_floor=floor)
+        expired_count, _ = expired.delete()
+    return collapsed, expired_count
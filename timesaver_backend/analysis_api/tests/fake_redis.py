@@ -0,0 +1,102 @@
+# analysis_api/tests/fake_redis.py
+"""
+In-process stand-in for the part of redis-py that RedisBackend uses.
+
+Commands behave like Redis's own (integer values, TTLs against an
+injectable clock, DECR creating a missing key). Pipelines queue commands
+and run them in one execute() call, counted in round_trips. Setting
+`down` makes every command raise ConnectionError, like an unreachable
+server.
+"""
+import time
+
+
+class ConnectionError(Exception):
+    """What redis-py raises when the server can't be reached."""
+
+
+class FakeRedis:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.down = False
+        self.round_trips = 0
+        self._values = {}
+        self._expires = {}
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError('Connection refused')
+
+    def _live(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and self.clock() >= expires_at:
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._values
+
+    # --- Commands (one round trip each when called directly) ---
+
+    def incrby(self, key, amount=1):
+        self._check()
+        self.round_trips += 1
+        return self._incrby(key, amount)
+
+    def decr(self, key, amount=1):
+        self._check()
+        self.round_trips += 1
+        return self._incrby(key, -amount)
+
+    def get(self, key):
+        self._check()
+        self.round_trips += 1
+        return self._get(key)
+
+    def ttl(self, key):
+        """Seconds left (-1 without expiry, -2 if missing), as Redis reports it."""
+        if not self._live(key):
+            return -2
+        expires_at = self._expires.get(key)
+        return -1 if expires_at is None else int(round(expires_at - self.clock()))
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+    # --- Implementations shared with pipelines ---
+
+    def _incrby(self, key, amount):
+        value = int(self._values[key]) + amount if self._live(key) else amount
+        self._values[key] = str(value).encode()
+        return value
+
+    def _expire(self, key, seconds):
+        if not self._live(key):
+            return False
+        self._expires[key] = self.clock() + seconds
+        return True
+
+    def _get(self, key):
+        return self._values[key] if self._live(key) else None
+
+
+class Pipeline:
+    def __init__(self, client):
+        self.client = client
+        self._commands = []
+
+    def incrby(self, key, amount=1):
+        self._commands.append(('_incrby', key, amount))
+        return self
+
+    def expire(self, key, seconds):
+        self._commands.append(('_expire', key, seconds))
+        return self
+
+    def get(self, key):
+        self._commands.append(('_get', key))
+        return self
+
+    def execute(self):
+        self.client._check()
+        self.client.round_trips += 1
+        commands, self._commands = self._commands, []
+        return [getattr(self.client, name)(*args) for name, *args in commands]
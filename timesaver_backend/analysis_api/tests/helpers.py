@@ -0,0 +1,71 @@
+# analysis_api/tests/helpers.py
+"""Shared fixtures for the analysis_api tests."""
+import logging
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from .. import rate_limit_backends, video_content
+from ..models import VideoAnalysis
+
+DEVICE_ID = 'device-aaaaaaaaaaaaaaaa'
+OTHER_DEVICE_ID = 'device-bbbbbbbbbbbbbbbb'
+
+
+class IsolatedRuntimeMixin:
+    """
+    Points every runtime file (rate limit counters, metrics snapshots,
+    profiles, embeddings) at a fresh temporary directory, and starts each test with
+    empty counters. Expected warnings (rate limits hit, fallbacks) are kept
+    out of the test output.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.runtime_dir = tempfile.mkdtemp(prefix='timesaver-test-')
+        self.addCleanup(shutil.rmtree, self.runtime_dir, True)
+        override = override_settings(
+            RUNTIME_DIR=self.runtime_dir,
+            METRICS_DIR=os.path.join(self.runtime_dir, 'metrics'),
+            PROFILING_DIR=os.path.join(self.runtime_dir, 'profiles'),
+            RATE_LIMIT_BACKEND={
+                'BACKEND': 'analysis_api.rate_limit_backends.SQLiteBackend',
+                'OPTIONS': {'path': os.path.join(self.runtime_dir, 'ratelimit.sqlite3')},
+            },
+            SEMANTIC_SEARCH={'DIR': os.path.join(self.runtime_dir, 'embeddings')},
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        rate_limit_backends.reset_backend()
+        self.addCleanup(rate_limit_backends.reset_backend)
+        cache.clear()
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+
+def make_highlights(count=3, prefix='Point'):
+    return [
+        {
+            'agent': 'The Teacher',
+            'timestamp': f'{index:02d}:30',
+            'title': f'{prefix} {index}',
+            'description': f'What {prefix.lower()} {index} is about.',
+        }
+        for index in range(count)
+    ]
+
+
+def make_analysis(device_id=DEVICE_ID, video_id='aaaaaaaaaaa', title='A video', highlights=None, **fields):
+    """Create an analysis (through the signals, like the views do) with its own content."""
+    content = video_content.store(
+        video_id, title=title, duration='10:00',
+        thumbnail_url=f'https://img.youtube.com/vi/{video_id}/hqdefault.jpg',
+        highlights=make_highlights() if highlights is None else highlights,
+    )
+    return VideoAnalysis.objects.create(
+        device_id=device_id, video_id=video_id,
+        video_url=f'https://www.youtube.com/watch?v={video_id}', content=content, **fields,
+    )
@@ -0,0 +1,96 @@
+# analysis_api/tests/test_backup.py
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import backup
+from ..models import VideoAnalysis, VideoBookmark
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_analysis, make_highlights
+
+
+class BackupRoundTripTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        base = timezone.now().replace(microsecond=0) - timezone.timedelta(days=10)
+        self.analyses = []
+        for index, video_id in enumerate(['aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc']):
+            highlights = make_highlights(prefix=f'Video {index}')
+            # Snapped highlights carry extra keys; they must survive too
+            highlights[0].update({'seconds': 90.5, 'excerpt': 'what was said'})
+            analysis = make_analysis(video_id=video_id, title=f'Video {index}', highlights=highlights)
+            VideoAnalysis.objects.filter(id=analysis.id).update(created_at=base + timezone.timedelta(days=index))
+            self.analyses.append(analysis)
+        for index, analysis in enumerate(self.analyses[1:]):
+            bookmark = VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=analysis)
+            VideoBookmark.objects.filter(id=bookmark.id).update(bookmarked_at=base + timezone.timedelta(hours=index))
+
+    def export(self, device_id=DEVICE_ID):
+        response = self.client.get('/api/export/', HTTP_X_DEVICE_ID=device_id)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def import_(self, body, device_id=OTHER_DEVICE_ID):
+        return self.client.post('/api/import/', body, content_type='application/x-ndjson', HTTP_X_DEVICE_ID=device_id)
+
+    def snapshot(self, device_id):
+        """Everything an export should preserve, keyed by video id."""
+        analyses = {
+            analysis.video_id: (analysis.title, analysis.duration, analysis.thumbnail_url, analysis.highlights,
+                                analysis.video_url, analysis.created_at)
+            for analysis in VideoAnalysis.objects.filter(device_id=device_id).select_related('content')
+        }
+        bookmarks = {
+            video_id: bookmarked_at
+            for video_id, bookmarked_at in VideoBookmark.objects.filter(session_id=device_id)
+            .values_list('video_analysis__video_id', 'bookmarked_at')
+        }
+        return analyses, bookmarks
+
+    def test_round_trip_preserves_history_and_bookmarks(self):
+        response = self.import_(self.export())
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertEqual(summary['imported'], {'analyses': 3, 'bookmarks': 2})
+        self.assertTrue(summary['complete'])
+        self.assertEqual(summary['error_count'], 0)
+
+        self.assertEqual(self.snapshot(OTHER_DEVICE_ID), self.snapshot(DEVICE_ID))
+        # And the imported history is what the device's API serves
+        history = self.client.get('/api/history/', HTTP_X_DEVICE_ID=OTHER_DEVICE_ID).json()
+        self.assertEqual([a['title'] for a in history['analyses']], ['Video 2', 'Video 1', 'Video 0'])
+        self.assertEqual(self.client.get('/api/bookmarks/', HTTP_X_DEVICE_ID=OTHER_DEVICE_ID).json()['total_count'], 2)
+
+    def test_reimport_skips_everything(self):
+        body = self.export()
+        self.import_(body)
+        summary = self.import_(body).json()
+        self.assertEqual(summary['imported'], {'analyses': 0, 'bookmarks': 0})
+        self.assertEqual(summary['skipped'], {'analyses': 3, 'bookmarks': 2})
+        self.assertEqual(VideoAnalysis.objects.filter(device_id=OTHER_DEVICE_ID).count(), 3)
+
+    def test_imported_content_is_never_shared(self):
+        self.import_(self.export())
+        contents = VideoAnalysis.objects.filter(device_id=OTHER_DEVICE_ID).values_list('content__model_name', flat=True)
+        self.assertEqual(set(contents), {''})
+
+    def test_truncated_export_is_reported_incomplete(self):
+        lines = self.export().splitlines(keepends=True)
+        summary = self.import_(b''.join(lines[:-2])).json()  # Last bookmark and end line lost
+        self.assertFalse(summary['complete'])
+        self.assertEqual(summary['imported'], {'analyses': 3, 'bookmarks': 1})
+
+    def test_not_an_export_is_400(self):
+        for body in (b'not json\n', b'{"type": "analysis"}\n', b''):
+            self.assertEqual(self.import_(body).status_code, 400, body)
+
+    def test_malformed_lines_are_skipped_and_reported(self):
+        lines = self.export().splitlines(keepends=True)
+        lines.insert(1, b'{"type": "analysis", "id": "x"}\n')
+        summary = self.import_(b''.join(lines)).json()
+        self.assertEqual(summary['imported']['analyses'], 3)
+        self.assertEqual(summary['error_count'], 1)
+        self.assertEqual(summary['errors'][0]['line'], 2)
+
+    def test_export_streams_in_chunks(self):
+        chunks = list(backup.export_lines(DEVICE_ID))
+        self.assertTrue(chunks[0].startswith(b'{"type":"header"'))
+        self.assertIn(b'"type":"end","analyses":3,"bookmarks":2', chunks[-1])
@@ -0,0 +1,65 @@
+# analysis_api/tests/test_bookmarks.py
+from django.test import TestCase
+
+from .. import search_index
+from ..models import VideoAnalysis, VideoBookmark
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+
+class BookmarkSearchTests(IsolatedRuntimeMixin, TestCase):
+    def get(self, path):
+        return self.client.get(path, HTTP_X_DEVICE_ID=DEVICE_ID)
+
+    def test_bookmarked_matches_beyond_the_ranking_cutoff_are_found(self):
+        if not search_index.is_available():
+            self.skipTest('needs SQLite FTS5')
+        # Many more matching analyses than any ranking cutoff, all sharing
+        # one content row; only the last two are bookmarked
+        content = make_analysis(video_id='v0000000000', title='Match me').content
+        VideoAnalysis.objects.bulk_create(
+            VideoAnalysis(device_id=DEVICE_ID, video_id=f'v{index:010d}', video_url='', content=content)
+            for index in range(1, 1200)
+        )
+        analyses = list(VideoAnalysis.objects.filter(device_id=DEVICE_ID).order_by('id'))
+        search_index.index_analyses(analyses)
+        for analysis in analyses[-2:]:
+            VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=analysis)
+
+        response = self.get('/api/bookmarks/?query=match')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['total_count'], 2)
+        self.assertEqual({bookmark['id'] for bookmark in body['bookmarks']}, {analysis.id for analysis in analyses[-2:]})
+
+    def test_query_only_sees_own_bookmarks(self):
+        mine = make_analysis(video_id='aaaaaaaaaaa', title='Shared topic')
+        theirs = make_analysis(device_id=OTHER_DEVICE_ID, video_id='aaaaaaaaaaa', title='Shared topic')
+        VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=mine)
+        VideoBookmark.objects.create(session_id=OTHER_DEVICE_ID, video_analysis=theirs)
+        body = self.get('/api/bookmarks/?query=shared').json()
+        self.assertEqual([bookmark['id'] for bookmark in body['bookmarks']], [mine.id])
+
+    def test_bad_limit_or_offset_is_400(self):
+        for query in ('limit=abc', 'offset=abc', 'offset=-1'):
+            self.assertEqual(self.get(f'/api/bookmarks/?{query}').status_code, 400, query)
+
+
+class BulkBookmarkBodyTests(IsolatedRuntimeMixin, TestCase):
+    def post(self, path, body):
+        return self.client.post(path, body, content_type='application/json', HTTP_X_DEVICE_ID=DEVICE_ID)
+
+    def test_non_object_body_is_400(self):
+        for path in ('/api/bookmarks/status/', '/api/bookmarks/bulk/'):
+            for body in ('[1, 2]', '"ids"', '3'):
+                response = self.post(path, body)
+                self.assertEqual(response.status_code, 400, (path, body))
+                self.assertIn('error', response.json())
+
+    def test_status_for_object_body(self):
+        analysis = make_analysis()
+        VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=analysis)
+        response = self.post('/api/bookmarks/status/', f'{{"analysis_ids": [{analysis.id}, 999999]}}')
+        self.assertEqual(response.status_code, 200)
+        statuses = response.json()['statuses']
+        self.assertTrue(statuses[str(analysis.id)]['bookmarked'])
+        self.assertFalse(statuses['999999']['bookmarked'])
@@ -0,0 +1,69 @@
+# analysis_api/tests/test_bulk_analysis.py
+import os
+import threading
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from .. import bulk_analysis, quota, video_content
+from ..analysis_core import FALLBACK_HIGHLIGHTS, GEMINI_MODEL, PROMPT_VERSION
+from .helpers import IsolatedRuntimeMixin, make_highlights
+
+
+class CountingGate:
+    def __init__(self):
+        self.waits = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            self.waits += 1
+
+
+def fake_metadata(video_id, fetches=3):
+    # Stands in for get_transcript_and_metadata: pytube, then two transcript probes
+    for _ in range(fetches):
+        quota.record_fetch()
+    return {
+        'title': f'Video {video_id}', 'duration': '10:00', 'thumbnailUrl': '', 'thumbnail_url': '',
+        'transcript': 'Real words.', 'segments': [],
+    }
+
+
+def fake_gemini(transcript, title, duration):
+    return FALLBACK_HIGHLIGHTS if title.endswith('bad') else make_highlights()
+
+
+@mock.patch.object(bulk_analysis, 'run_gemini_agent_workflow', side_effect=fake_gemini)
+@mock.patch.object(bulk_analysis, 'get_transcript_and_metadata', side_effect=fake_metadata)
+class BulkAnalysisTests(IsolatedRuntimeMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.checkpoint = bulk_analysis.Checkpoint(os.path.join(self.runtime_dir, 'checkpoint.jsonl'))
+
+    def test_every_youtube_request_waits_for_the_fetch_gate(self, *mocks):
+        fetch_gate, llm_gate = CountingGate(), CountingGate()
+        bulk_analysis.analyze('aaaaaaaaaaa', fetch_gate, llm_gate)
+        self.assertEqual(fetch_gate.waits, 3)
+        self.assertEqual(llm_gate.waits, 1)
+
+    def test_fetches_outside_bulk_analysis_are_not_gated(self, *mocks):
+        with quota.metered() as meter:
+            fake_metadata('aaaaaaaaaaa')
+        self.assertEqual(meter.fetches, 3)
+
+    def test_run_stores_results_and_checkpoints_failures(self, *mocks):
+        video_ids = ['aaaaaaaaaaa', 'bbbbbbbbbad', 'ccccccccccc']
+        progress = bulk_analysis.run(
+            video_ids, self.checkpoint, workers=2, batch_size=2, fetches_per_minute=0, llm_calls_per_minute=0,
+        )
+        self.assertEqual((progress.stored, progress.failed), (2, 1))
+        self.assertEqual(self.checkpoint.load(), {
+            'aaaaaaaaaaa': 'stored', 'bbbbbbbbbad': 'failed', 'ccccccccccc': 'stored',
+        })
+        self.assertIsNotNone(video_content.reusable('aaaaaaaaaaa', GEMINI_MODEL, PROMPT_VERSION))
+        self.assertIsNone(video_content.reusable('bbbbbbbbbad', GEMINI_MODEL, PROMPT_VERSION))
+
+        # A rerun only retries the failure, and only when asked to
+        self.assertEqual(bulk_analysis.pending(video_ids, self.checkpoint), [])
+        self.assertEqual(bulk_analysis.pending(video_ids, self.checkpoint, retry_failed=True), ['bbbbbbbbbad'])
@@ -0,0 +1,110 @@
+# analysis_api/tests/test_cold_storage.py
+import importlib
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .. import cold_storage, video_content
+from ..models import VideoAnalysis, VideoContent
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin, make_analysis, make_highlights
+
+HIGHLIGHTS = make_highlights() + [{'agent': 'The Explorer', 'timestamp': '09:30', 'title': 'Ünïcode ✓',
+                                   'description': 'Non-ASCII survives.', 'seconds': 570, 'excerpt': 'said here'}]
+
+
+class PackTests(SimpleTestCase):
+    def test_round_trip(self):
+        for highlights, summary in ((HIGHLIGHTS, 'A summary.'), ([], ''), (None, '')):
+            payload = cold_storage.pack(highlights, summary)
+            self.assertEqual(payload[0], cold_storage.FORMAT_ZLIB_V1)
+            self.assertEqual(cold_storage.unpack(memoryview(payload)),
+                             {'highlights': highlights, 'analysis_summary': summary})
+
+    def test_unknown_format_is_refused(self):
+        with self.assertRaises(ValueError):
+            cold_storage.unpack(b'\x09' + cold_storage.pack(HIGHLIGHTS, '')[1:])
+
+    def test_migration_copy_reads_current_payloads(self):
+        # 0009 carries its own copy of format 1 for unapplying
+        migration = importlib.import_module('analysis_api.migrations.0009_videocontent_cold_storage')
+        self.assertEqual(migration.ZDICT_V1, cold_storage._ZDICT_V1)
+        self.assertEqual(migration.unpack(cold_storage.pack(HIGHLIGHTS, 'A summary.')),
+                         {'highlights': HIGHLIGHTS, 'analysis_summary': 'A summary.'})
+
+
+class ColdContentTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.analysis = make_analysis(highlights=HIGHLIGHTS)
+        self.before = self.analysis.to_dict()
+
+    def reload(self):
+        return VideoAnalysis.objects.select_related('content').get(id=self.analysis.id)
+
+    def freeze(self):
+        content = VideoContent.objects.get(id=self.analysis.content_id)
+        content.freeze()
+        content.save()
+        return content
+
+    def test_freeze_and_thaw_round_trip(self):
+        content = self.freeze()
+        row = VideoContent.objects.values('highlights_data', 'summary_data').get(id=content.id)
+        self.assertEqual(row, {'highlights_data': None, 'summary_data': ''})
+
+        content = VideoContent.objects.get(id=content.id)
+        self.assertTrue(content.is_cold)
+        self.assertEqual(content.highlights, HIGHLIGHTS)
+        content.thaw()
+        content.save()
+        content = VideoContent.objects.get(id=content.id)
+        self.assertFalse(content.is_cold)
+        self.assertEqual(content.highlights_data, HIGHLIGHTS)
+
+    def test_cold_rows_serialize_like_warm_ones(self):
+        self.freeze()
+        analysis = self.reload()
+        self.assertTrue(analysis.content.is_cold)
+        self.assertEqual(analysis.to_dict(), self.before)
+        response = self.client.get(f'/api/analysis/{analysis.id}/', HTTP_X_DEVICE_ID=DEVICE_ID)
+        self.assertEqual(response.json()['highlights'], HIGHLIGHTS)
+
+    def test_setting_highlights_thaws(self):
+        content = self.freeze()
+        content.highlights = make_highlights(count=1)
+        self.assertFalse(content.is_cold)
+        self.assertEqual(content.analysis_summary, '')
+
+
+class CompactCommandTests(IsolatedRuntimeMixin, TestCase):
+    def compact(self, **options):
+        out = StringIO()
+        call_command('compact_cold_storage', stdout=out, **options)
+        return out.getvalue()
+
+    def test_freezes_idle_content_and_thaws_content_read_again(self):
+        old = timezone.now() - timezone.timedelta(days=40)
+        idle = make_analysis(video_id='aaaaaaaaaaa')
+        fresh = make_analysis(video_id='bbbbbbbbbbb')
+        VideoContent.objects.filter(id=idle.content_id).update(created_at=old)
+
+        self.assertIn('Compressed 1 content row(s), decompressed 0', self.compact(after_days=30))
+        self.assertTrue(VideoContent.objects.get(id=idle.content_id).is_cold)
+        self.assertFalse(VideoContent.objects.get(id=fresh.content_id).is_cold)
+        self.assertIn('Compressed 0 content row(s), decompressed 0', self.compact(after_days=30))
+
+        # Reading it through the API stamps it, and the next run brings it back
+        response = self.client.get(f'/api/analysis/{idle.id}/', HTTP_X_DEVICE_ID=DEVICE_ID)
+        self.assertEqual(response.json()['highlights'], make_highlights())
+        self.assertIn('Compressed 0 content row(s), decompressed 1', self.compact(after_days=30))
+        self.assertEqual(VideoContent.objects.get(id=idle.content_id).highlights_data, make_highlights())
+
+    def test_batches_are_limited(self):
+        old = timezone.now() - timezone.timedelta(days=40)
+        for video_id in ('aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'):
+            make_analysis(video_id=video_id)
+        VideoContent.objects.update(created_at=old)
+        self.assertIn('Compressed 2 content row(s)', self.compact(after_days=30, batch_size=1, max_batches=2))
+        self.assertEqual(video_content.compact_cold_storage(after_days=30), (1, 0))
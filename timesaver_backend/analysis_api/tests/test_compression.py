@@ -0,0 +1,78 @@
+# analysis_api/tests/test_compression.py
+import gzip
+from unittest import mock
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import compression
+from ..compression import CompressionMiddleware, negotiate_encoding
+
+BODY = b'{"title": "A video about compression", "highlights": []}' * 100
+
+
+class NegotiationTests(SimpleTestCase):
+    def test_prefers_brotli_when_available(self):
+        with mock.patch.object(compression, 'brotli', object()):
+            self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'br')
+            self.assertEqual(negotiate_encoding('gzip;q=1, br;q=0.5'), 'gzip')
+
+    def test_gzip_without_brotli(self):
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(negotiate_encoding('gzip, br'), 'gzip')
+            self.assertEqual(negotiate_encoding('br'), None)
+
+    def test_identity_only(self):
+        self.assertIsNone(negotiate_encoding(''))
+        self.assertIsNone(negotiate_encoding('gzip;q=0'))
+
+
+class GzipTests(SimpleTestCase):
+    def test_round_trip_with_random_filename(self):
+        compressed = compression.gzip_compress(BODY, 4)
+        self.assertEqual(gzip.decompress(compressed), BODY)
+        self.assertTrue(compressed[3] & gzip.FNAME)
+
+    def test_level_is_recorded_in_header(self):
+        # XFL byte: 4 = fastest, 2 = best compression
+        self.assertEqual(compression.gzip_compress(BODY, 1)[8], 4)
+        self.assertEqual(compression.gzip_compress(BODY, 9)[8], 2)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_GZIP_LEVEL=1)
+class MiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = CompressionMiddleware(lambda request: None)
+
+    def process(self, response, accept='gzip'):
+        request = self.factory.get('/api/history/', HTTP_ACCEPT_ENCODING=accept)
+        with mock.patch.object(compression, 'brotli', None):
+            return self.middleware.process_response(request, response)
+
+    def test_large_body_is_gzipped_and_etag_weakened(self):
+        response = HttpResponse(BODY, content_type='application/json')
+        response['ETag'] = '"abc"'
+        response = self.process(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(response.content[8], 4)  # COMPRESSION_GZIP_LEVEL=1
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_body_untouched(self):
+        response = self.process(HttpResponse(b'{}', content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{}')
+
+    def test_streaming_body(self):
+        response = self.process(StreamingHttpResponse(iter([BODY[:2000], BODY[2000:]])))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), BODY)
+        self.assertFalse(response.has_header('Content-Length'))
+
+    def test_client_without_gzip(self):
+        response = self.process(HttpResponse(BODY), accept='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, BODY)
@@ -0,0 +1,62 @@
+# analysis_api/tests/test_conditional.py
+from django.test import TestCase
+
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+
+class ConditionalGetTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.analysis = make_analysis(video_id='aaaaaaaaaaa')
+
+    def get(self, path, etag=None, device_id=DEVICE_ID):
+        headers = {'HTTP_X_DEVICE_ID': device_id}
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(path, **headers)
+
+    def test_matching_etag_gets_304(self):
+        for path in ('/api/history/', '/api/bookmarks/', '/api/stats/', '/api/search/?q=video'):
+            first = self.get(path)
+            self.assertEqual(first.status_code, 200, path)
+            self.assertTrue(first['ETag'])
+            self.assertEqual(first['Cache-Control'], 'private, no-cache')
+            second = self.get(path, etag=first['ETag'])
+            self.assertEqual(second.status_code, 304, path)
+            self.assertEqual(second.content, b'')
+
+    def test_query_string_is_part_of_the_etag(self):
+        self.assertNotEqual(self.get('/api/history/?limit=5')['ETag'], self.get('/api/history/?limit=6')['ETag'])
+
+    def test_new_analysis_changes_etag(self):
+        etag = self.get('/api/history/')['ETag']
+        make_analysis(video_id='bbbbbbbbbbb')
+        response = self.get('/api/history/', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['analyses']), 2)
+
+    def test_bookmark_and_delete_change_etag(self):
+        etag = self.get('/api/bookmarks/')['ETag']
+        self.client.post(
+            '/api/bookmark/', {'analysis_id': self.analysis.id},
+            content_type='application/json', HTTP_X_DEVICE_ID=DEVICE_ID,
+        )
+        response = self.get('/api/bookmarks/', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_count'], 1)
+
+        etag = response['ETag']
+        self.client.delete(f'/api/analysis/{self.analysis.id}/', HTTP_X_DEVICE_ID=DEVICE_ID)
+        response = self.get('/api/bookmarks/', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_count'], 0)
+
+    def test_other_devices_writes_keep_etag(self):
+        etag = self.get('/api/history/')['ETag']
+        make_analysis(device_id=OTHER_DEVICE_ID, video_id='ccccccccccc')
+        self.assertEqual(self.get('/api/history/', etag=etag).status_code, 304)
+
+    def test_etags_are_per_device(self):
+        etag = self.get('/api/history/')['ETag']
+        self.assertEqual(self.get('/api/history/', etag=etag, device_id=OTHER_DEVICE_ID).status_code, 200)
@@ -0,0 +1,71 @@
+# analysis_api/tests/test_database.py
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class ConcurrentWriteTests(SimpleTestCase):
+    """Read-then-write transactions, like the analyze view's, on a real database file."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp(prefix='timesaver-test-')
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def run_increments(self, options, workers=4):
+        database = {**settings.DATABASES['default'], 'NAME': self.path, 'OPTIONS': options}
+        # Its own alias: the test runner blocks threaded use of 'default'
+        handler = ConnectionHandler({'default': database, 'contention': database})
+        with handler['contention'].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value INTEGER)')
+            cursor.execute('INSERT INTO counter VALUES (0)')
+        handler['contention'].close()
+        errors = []
+
+        def increment():
+            # What transaction.atomic() does on SQLite, on this thread's own connection
+            connection = handler['contention']
+            try:
+                connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT value FROM counter')
+                    value = cursor.fetchone()[0]
+                    time.sleep(0.1)  # Let every transaction read before any writes
+                    cursor.execute('UPDATE counter SET value = %s', [value + 1])
+                connection.commit()
+            except OperationalError as e:
+                errors.append(str(e))
+                connection.rollback()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=increment) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with handler['contention'].cursor() as cursor:
+            cursor.execute('SELECT value FROM counter')
+            value = cursor.fetchone()[0]
+        handler['contention'].close()
+        return value, errors
+
+    def test_configured_options_serialize_writers(self):
+        value, errors = self.run_increments(settings.DATABASES['default']['OPTIONS'])
+        self.assertEqual(errors, [])
+        self.assertEqual(value, 4)
+
+    def test_deferred_transactions_fail_under_contention(self):
+        # Without IMMEDIATE, every writer but one hits "database is locked"
+        # immediately: SQLite can't wait for a lock upgrade it would deadlock on
+        value, errors = self.run_increments({'timeout': 20})
+        self.assertTrue(errors)
+        self.assertIn('locked', errors[0])
@@ -0,0 +1,106 @@
+# analysis_api/tests/test_device_stats.py
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .. import device_stats
+from ..models import DeviceStats, VideoAnalysis, VideoBookmark
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_analysis, make_highlights
+
+
+def aggregates(device_id=DEVICE_ID):
+    stats = device_stats.get_stats(device_id)
+    return stats.analysis_count, stats.highlight_count, stats.total_seconds, device_stats.recent_count(stats)
+
+
+class DurationTests(SimpleTestCase):
+    def test_parsing(self):
+        for duration, seconds in (('10:00', 600), ('1:02:03', 3723), ('0:07', 7), ('', 0), ('live', 0), (None, 0)):
+            self.assertEqual(device_stats.duration_seconds(duration), seconds, duration)
+
+
+class DeviceStatsTests(IsolatedRuntimeMixin, TestCase):
+    def version(self, device_id=DEVICE_ID):
+        return device_stats.get_stats(device_id).version
+
+    def test_create_and_delete_adjust_the_aggregates(self):
+        first = make_analysis(video_id='aaaaaaaaaaa')
+        make_analysis(video_id='bbbbbbbbbbb', highlights=make_highlights(count=5))
+        make_analysis(device_id=OTHER_DEVICE_ID, video_id='ccccccccccc')
+        self.assertEqual(aggregates(), (2, 8, 1200, 2))
+        self.assertEqual(aggregates(OTHER_DEVICE_ID), (1, 3, 600, 1))
+
+        version = self.version()
+        first.delete()
+        self.assertEqual(aggregates(), (1, 5, 600, 1))
+        self.assertGreater(self.version(), version)
+        self.assertEqual(aggregates(OTHER_DEVICE_ID), (1, 3, 600, 1))
+
+    def test_stats_endpoint(self):
+        make_analysis(video_id='aaaaaaaaaaa')
+        body = self.client.get('/api/stats/', HTTP_X_DEVICE_ID=DEVICE_ID).json()
+        self.assertEqual(
+            (body['total_analyses'], body['total_highlights'], body['this_week'], body['total_minutes_analyzed']),
+            (1, 3, 1, 10),
+        )
+        body = self.client.get('/api/stats/', HTTP_X_DEVICE_ID=OTHER_DEVICE_ID).json()
+        self.assertEqual((body['total_analyses'], body['this_week']), (0, 0))
+
+    def test_only_the_last_seven_days_count_as_this_week(self):
+        old = make_analysis(video_id='aaaaaaaaaaa')
+        make_analysis(video_id='bbbbbbbbbbb')
+        VideoAnalysis.objects.filter(id=old.id).update(created_at=timezone.now() - timezone.timedelta(days=8))
+        device_stats.rebuild()
+        self.assertEqual(aggregates()[0], 2)
+        self.assertEqual(aggregates()[3], 1)
+        # The bucket of an analysis outside the window is gone, so deleting it can't go negative
+        VideoAnalysis.objects.get(id=old.id).delete()
+        self.assertEqual(aggregates(), (1, 3, 600, 1))
+
+    def test_bookmarks_bump_the_version_only(self):
+        analyses = [make_analysis(video_id=video_id) for video_id in ('aaaaaaaaaaa', 'bbbbbbbbbbb')]
+        before = aggregates()
+
+        version = self.version()
+        bookmark = VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=analyses[0])
+        self.assertGreater(self.version(), version)
+        version = self.version()
+        bookmark.delete()
+        self.assertGreater(self.version(), version)
+
+        for body in ({'add': [analysis.id for analysis in analyses]}, {'remove': [analyses[1].id]}):
+            version = self.version()
+            response = self.client.post('/api/bookmarks/bulk/', body, content_type='application/json',
+                                        HTTP_X_DEVICE_ID=DEVICE_ID)
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(self.version(), version, body)
+        self.assertEqual(aggregates(), before)
+
+    def test_rebuild_repairs_drift(self):
+        make_analysis(video_id='aaaaaaaaaaa')
+        make_analysis(video_id='bbbbbbbbbbb')
+        make_analysis(device_id=OTHER_DEVICE_ID, video_id='ccccccccccc')
+        expected = aggregates(), aggregates(OTHER_DEVICE_ID)
+        version = self.version()
+        DeviceStats.objects.filter(device_id=DEVICE_ID).update(
+            analysis_count=40, highlight_count=-2, total_seconds=1, daily_counts={'2000-01-01': 9},
+        )
+        DeviceStats.objects.create(device_id='device-gone', analysis_count=3)
+
+        out = StringIO()
+        call_command('rebuild_device_stats', stdout=out)
+        self.assertIn('Rebuilt stats for 3 device(s)', out.getvalue())
+        self.assertEqual((aggregates(), aggregates(OTHER_DEVICE_ID)), expected)
+        self.assertEqual(aggregates('device-gone'), (0, 0, 0, 0))
+        # Versions only move forward, so cached responses revalidate
+        self.assertGreater(self.version(), version)
+
+    def test_rebuild_one_device(self):
+        make_analysis(video_id='aaaaaaaaaaa')
+        make_analysis(device_id=OTHER_DEVICE_ID, video_id='bbbbbbbbbbb')
+        DeviceStats.objects.update(analysis_count=9)
+        self.assertEqual(device_stats.rebuild([DEVICE_ID]), 1)
+        self.assertEqual(aggregates()[0], 1)
+        self.assertEqual(aggregates(OTHER_DEVICE_ID)[0], 9)
@@ -0,0 +1,75 @@
+# analysis_api/tests/test_fieldsets.py
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import VideoAnalysis, VideoBookmark, VideoContent
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+FULL_KEYS = list(VideoAnalysis.API_FIELDS)
+HIGHLIGHTS_COLUMN = f'"{VideoContent._meta.db_table}"."{VideoContent._meta.get_field("highlights_data").column}"'
+
+
+class FieldsetTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.analyses = [make_analysis(video_id=video_id, title=f'Video {video_id[0]}')
+                         for video_id in ('aaaaaaaaaaa', 'bbbbbbbbbbb')]
+        for analysis in self.analyses:
+            VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=analysis)
+
+    def get(self, path, **params):
+        return self.client.get(path, params, HTTP_X_DEVICE_ID=DEVICE_ID)
+
+    def test_default_shape_is_unchanged(self):
+        analysis = self.get('/api/history/').json()['analyses'][0]
+        self.assertEqual(list(analysis), FULL_KEYS)
+        self.assertEqual(analysis, self.analyses[1].to_dict())
+        bookmark = self.get('/api/bookmarks/').json()['bookmarks'][0]
+        self.assertEqual(list(bookmark), FULL_KEYS + ['bookmark_id', 'bookmarked_at'])
+
+    def test_history_subset(self):
+        # Order follows to_dict(), not the request, and id is always there
+        body = self.get('/api/history/', fields='created_at,title').json()
+        self.assertEqual([list(analysis) for analysis in body['analyses']], [['id', 'title', 'created_at']] * 2)
+        self.assertEqual(body['analyses'][0]['title'], 'Video b')
+        self.assertEqual(body['total_count'], 2)
+
+    def test_summary_view(self):
+        analysis = self.get('/api/history/', view='summary').json()['analyses'][0]
+        self.assertEqual(list(analysis), ['id', 'title', 'duration', 'thumbnailUrl', 'created_at', 'video_url'])
+        # An explicit fieldset wins over the view
+        analysis = self.get('/api/history/', view='summary', fields='highlights').json()['analyses'][0]
+        self.assertEqual(list(analysis), ['id', 'highlights'])
+
+    def test_bookmarks_subset(self):
+        bookmark = self.get('/api/bookmarks/', fields='thumbnailUrl').json()['bookmarks'][0]
+        self.assertEqual(list(bookmark), ['id', 'thumbnailUrl', 'bookmark_id', 'bookmarked_at'])
+
+    def test_unrequested_highlights_are_not_read(self):
+        def reads_highlights(**params):
+            with CaptureQueriesContext(connection) as queries:
+                self.get('/api/history/', **params)
+            return any(HIGHLIGHTS_COLUMN in query['sql'] for query in queries.captured_queries)
+
+        self.assertFalse(reads_highlights(fields='title'))
+        self.assertFalse(reads_highlights(view='summary'))
+        self.assertTrue(reads_highlights())
+
+    def test_unknown_fields_are_400(self):
+        for path in ('/api/history/', '/api/bookmarks/'):
+            response = self.get(path, fields='title,secret')
+            self.assertEqual(response.status_code, 400, path)
+            self.assertEqual(response.json()['error'], 'Unknown field(s): secret')
+            self.assertEqual(response.json()['allowed_fields'], FULL_KEYS)
+
+    def test_etag_varies_with_fields(self):
+        full = self.get('/api/history/')
+        subset = self.get('/api/history/', fields='title')
+        self.assertNotEqual(full['ETag'], subset['ETag'])
+        # Revalidating the subset does not answer 304 for the full shape
+        response = self.client.get('/api/history/', HTTP_X_DEVICE_ID=DEVICE_ID, HTTP_IF_NONE_MATCH=subset['ETag'])
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/history/', {'fields': 'title'}, HTTP_X_DEVICE_ID=DEVICE_ID,
+                                   HTTP_IF_NONE_MATCH=subset['ETag'])
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,86 @@
+# analysis_api/tests/test_fragments.py
+import unittest
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .. import fragments
+from ..models import VideoAnalysis
+from ..renderers import dumps, orjson
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin, make_analysis, make_highlights
+
+
+class FragmentCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used_at_capacity(self):
+        cache = fragments.FragmentCache(max_bytes=10)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+        cache.get('a')  # Now b is the oldest
+        cache.put('c', b'cccc')
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (b'aaaa', None, b'cccc'))
+        self.assertEqual(len(cache), 2)
+
+    def test_replacing_a_key_frees_its_old_size(self):
+        cache = fragments.FragmentCache(max_bytes=10)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+        cache.put('a', b'aa')
+        cache.put('c', b'cccc')
+        self.assertEqual(len(cache), 3)
+
+    def test_oversized_entries_are_not_kept(self):
+        cache = fragments.FragmentCache(max_bytes=10)
+        cache.put('a', b'aaaa')
+        cache.put('big', b'x' * 11)
+        self.assertIsNone(cache.get('big'))
+        self.assertEqual(cache.get('a'), b'aaaa')
+
+
+@unittest.skipIf(orjson is None, 'needs orjson')
+class RenderTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        fragments.clear()
+        self.addCleanup(fragments.clear)
+        highlights = make_highlights()
+        highlights[0]['title'] = 'Ünïcode   and "quotes"'
+        self.analyses = [make_analysis(video_id='aaaaaaaaaaa', highlights=highlights),
+                         make_analysis(video_id='bbbbbbbbbbb', highlights=[])]
+
+    def plain(self, fields=None, extras=None):
+        """The response body without fragments: every dict encoded from scratch."""
+        return dumps([{**analysis.to_dict(fields), **((extras or {}).get(analysis.id) or {})}
+                      for analysis in self.analyses])
+
+    def test_matches_plain_serialization(self):
+        extras = {self.analyses[0].id: {'match': {'highlight_index': 0, 'score': 1.5}}}
+        for fields in (None, ('id', 'title'), ('id', 'highlights')):
+            for _ in range(2):  # Encoded, then from the cache
+                rendered = fragments.render_analyses(
+                    self.analyses, fields, extras=[extras.get(analysis.id) for analysis in self.analyses],
+                )
+                self.assertEqual(dumps(rendered), self.plain(fields, extras), fields)
+        self.assertEqual(dumps(fragments.render_analysis(self.analyses[1], extra={'bookmark_id': 3})),
+                         dumps({**self.analyses[1].to_dict(), 'bookmark_id': 3}))
+
+    def test_fieldsets_are_cached_apart(self):
+        analysis = self.analyses[0]
+        full = dumps(fragments.render_analysis(analysis))
+        subset = dumps(fragments.render_analysis(analysis, ('id', 'title')))
+        self.assertEqual(orjson.loads(subset), {'id': analysis.id, 'title': 'A video'})
+        self.assertEqual(dumps(fragments.render_analysis(analysis)), full)
+
+    def test_saving_moves_updated_at_and_misses_the_cache(self):
+        analysis = self.analyses[0]
+        fragments.render_analysis(analysis)
+        analysis.video_url = 'https://youtu.be/aaaaaaaaaaa'
+        analysis.save()
+        self.assertEqual(orjson.loads(dumps(fragments.render_analysis(analysis)))['video_url'],
+                         'https://youtu.be/aaaaaaaaaaa')
+
+        # Served through the API too, from a fresh instance
+        VideoAnalysis.objects.filter(id=analysis.id).update(
+            video_url='https://example.com/', updated_at=timezone.now() + timezone.timedelta(seconds=1),
+        )
+        body = self.client.get('/api/history/', HTTP_X_DEVICE_ID=DEVICE_ID).json()
+        self.assertIn('https://example.com/', [item['video_url'] for item in body['analyses']])
@@ -0,0 +1,73 @@
+# analysis_api/tests/test_metrics.py
+import json
+import os
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from .. import metrics
+from .helpers import IsolatedRuntimeMixin
+
+# Above the kernel's pid_max, so no process can have it
+DEAD_PID = 2 ** 23
+
+
+def write_snapshot(directory, pid, started_ms, count, age=0):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{pid}-{started_ms}.json')
+    with open(path, 'w') as f:
+        json.dump({'histograms': [], 'counters': [[metrics.CACHE_HITS, [['kind', 'test']], count]]}, f)
+    if age:
+        past = time.time() - age
+        os.utime(path, (past, past))
+    return path
+
+
+def cache_hits():
+    _, counters = metrics.collect()
+    return counters.get((metrics.CACHE_HITS, (('kind', 'test'),)), 0)
+
+
+class SnapshotMergeTests(IsolatedRuntimeMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = metrics._metrics_dir()
+
+    def test_live_workers_are_summed(self):
+        write_snapshot(self.directory, os.getppid(), 1000, 2)
+        write_snapshot(self.directory, os.getppid(), 2000, 3)  # Same pid, later process
+        self.assertEqual(cache_hits(), 5)
+
+    def test_dead_worker_is_dropped(self):
+        path = write_snapshot(self.directory, DEAD_PID, 1000, 7)
+        self.assertEqual(cache_hits(), 0)
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(METRICS_STALE_AFTER=60)
+    def test_silent_worker_is_dropped(self):
+        stale = write_snapshot(self.directory, os.getppid(), 1000, 7, age=120)
+        fresh = write_snapshot(self.directory, os.getppid(), 2000, 1, age=10)
+        self.assertEqual(cache_hits(), 1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_flush_names_file_after_process_start(self):
+        metrics.inc(metrics.FALLBACKS, kind='test')
+        metrics.flush()
+        self.assertIn(f'{os.getpid()}-{metrics._started_ms}.json', os.listdir(self.directory))
+
+
+class MetricsEndpointTests(IsolatedRuntimeMixin, SimpleTestCase):
+    @override_settings(METRICS_ADMIN_TOKEN='secret-token')
+    def test_requires_bearer_token(self):
+        metrics.inc(metrics.FALLBACKS, kind='test')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='secret-token').status_code, 403)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE', response.content)
+
+    @override_settings(METRICS_ADMIN_TOKEN='')
+    def test_closed_without_configured_token(self):
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
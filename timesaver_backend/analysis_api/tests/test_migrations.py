@@ -0,0 +1,110 @@
+# analysis_api/tests/test_migrations.py
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from .. import search_index
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, make_highlights
+
+BEFORE = [('analysis_api', '0007_change_log')]
+AFTER = [('analysis_api', '0008_video_content')]
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Runs migrations back and forth, and leaves the database fully migrated."""
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(lambda: self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes()))
+
+
+class VideoContentMigrationTests(MigrationTestCase):
+    """0008 moves per-device copies of a result into shared content rows, and back."""
+
+    def setUp(self):
+        super().setUp()
+        apps = self.migrate(BEFORE)
+        VideoAnalysis = apps.get_model('analysis_api', 'VideoAnalysis')
+        shared = {
+            'video_id': 'aaaaaaaaaaa', 'video_url': 'https://www.youtube.com/watch?v=aaaaaaaaaaa',
+            'title': 'Shared', 'duration': '10:00', 'thumbnail_url': 'https://img.youtube.com/vi/aaaaaaaaaaa/0.jpg',
+            'highlights': make_highlights(), 'analysis_summary': '',
+        }
+        # Two devices with the identical result, one with a different one
+        self.rows = [
+            VideoAnalysis.objects.create(device_id=DEVICE_ID, **shared),
+            VideoAnalysis.objects.create(device_id=OTHER_DEVICE_ID, **shared),
+            VideoAnalysis.objects.create(device_id='device-cccccccccccccccc', **{
+                **shared, 'highlights': make_highlights(prefix='Other'),
+            }),
+        ]
+
+    def test_identical_results_share_one_row(self):
+        apps = self.migrate(AFTER)
+        VideoAnalysis = apps.get_model('analysis_api', 'VideoAnalysis')
+        VideoContent = apps.get_model('analysis_api', 'VideoContent')
+
+        self.assertEqual(VideoContent.objects.count(), 2)
+        content_ids = [VideoAnalysis.objects.get(id=row.id).content_id for row in self.rows]
+        self.assertEqual(content_ids[0], content_ids[1])
+        self.assertNotEqual(content_ids[0], content_ids[2])
+
+        content = VideoContent.objects.get(id=content_ids[0])
+        self.assertEqual((content.title, content.highlights), ('Shared', make_highlights()))
+        # Migrated results have no known model, so they are never reused
+        self.assertEqual(set(VideoContent.objects.values_list('model_name', flat=True)), {''})
+
+    def test_reverse_copies_content_back(self):
+        self.migrate(AFTER)
+        apps = self.migrate(BEFORE)
+        VideoAnalysis = apps.get_model('analysis_api', 'VideoAnalysis')
+
+        restored = {row.device_id: row for row in VideoAnalysis.objects.all()}
+        self.assertEqual(len(restored), 3)
+        for original in self.rows:
+            row = restored[original.device_id]
+            self.assertEqual(
+                (row.title, row.duration, row.thumbnail_url, row.highlights, row.analysis_summary),
+                (original.title, original.duration, original.thumbnail_url, original.highlights, original.analysis_summary),
+            )
+
+
+class SearchRowidMigrationTests(MigrationTestCase):
+    """0011 re-keys search rows written with automatic rowids."""
+
+    def test_rows_are_rekeyed(self):
+        self.migrate([('analysis_api', '0010_transcript_fts')])
+        table = search_index.FTS_TABLE
+        # Flushing between tests leaves virtual tables alone
+        self.addCleanup(lambda: connection.cursor().execute(f"DELETE FROM {table}"))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} "
+                "(title, highlight_title, description, device_token, analysis_id, highlight_index, timestamp) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [
+                    ('Sourdough', '', '', 'dtoken', 7, -1, ''),
+                    ('', 'Starter', 'Feed it', 'dtoken', 7, 0, '01:00'),
+                    ('Marathon', '', '', 'dtoken', 8, -1, ''),
+                ],
+            )
+
+        self.migrate([('analysis_api', '0011_search_fts_rowids')])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid, analysis_id, highlight_index FROM {table} ORDER BY rowid")
+            self.assertEqual(cursor.fetchall(), [
+                (search_index.row_id(7), 7, -1), (search_index.row_id(7, 0), 7, 0), (search_index.row_id(8), 8, -1),
+            ])
+            # Still searchable, and removable by rowid
+            cursor.execute(f"SELECT analysis_id FROM {table} WHERE {table} MATCH 'feed'")
+            self.assertEqual(cursor.fetchall(), [(7,)])
+        search_index.remove_analyses([7])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT analysis_id FROM {table}")
+            self.assertEqual(cursor.fetchall(), [(8,)])
@@ -0,0 +1,68 @@
+# analysis_api/tests/test_pagination.py
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import VideoAnalysis
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+
+class HistoryPaginationTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.created = [make_analysis(video_id=f'vid{index:08d}', title=f'Video {index}') for index in range(7)]
+
+    def history(self, **params):
+        response = self.client.get('/api/history/', params, HTTP_X_DEVICE_ID=DEVICE_ID)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def walk(self, limit, between_pages=None):
+        """Ids of every page followed through next_cursor."""
+        ids, cursor = [], None
+        while True:
+            page = self.history(limit=limit, **({'cursor': cursor} if cursor else {}))
+            ids.extend(analysis['id'] for analysis in page['analyses'])
+            cursor = page['next_cursor']
+            self.assertEqual(page['has_more'], cursor is not None)
+            if cursor is None:
+                return ids
+            if between_pages:
+                between_pages()
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        ids = self.walk(limit=3)
+        self.assertEqual(ids, [analysis.id for analysis in reversed(self.created)])
+
+    def test_ties_on_created_at_are_broken_by_id(self):
+        VideoAnalysis.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        ids = self.walk(limit=2)
+        self.assertEqual(ids, sorted((analysis.id for analysis in self.created), reverse=True))
+
+    def test_inserts_between_pages_do_not_shift_later_pages(self):
+        inserted = []
+
+        def insert():
+            inserted.append(make_analysis(video_id=f'new{len(inserted):08d}'))
+
+        ids = self.walk(limit=2, between_pages=insert)
+        # New rows land before the cursor, so the walk neither repeats nor skips
+        self.assertEqual(ids, [analysis.id for analysis in reversed(self.created)])
+        self.assertEqual(len(inserted), 3)
+
+    def test_legacy_offset(self):
+        page = self.history(offset=5, limit=5)
+        self.assertEqual([analysis['id'] for analysis in page['analyses']], [self.created[1].id, self.created[0].id])
+        self.assertFalse(page['has_more'])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({'limit': 'ten'}, {'offset': 'x'}, {'offset': '-1'}, {'cursor': 'not-a-cursor'}):
+            response = self.client.get('/api/history/', params, HTTP_X_DEVICE_ID=DEVICE_ID)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.history(limit=0)['analyses']), 1)
+        self.assertEqual(len(self.history(limit=1000)['analyses']), 7)
@@ -0,0 +1,102 @@
+# analysis_api/tests/test_profiling.py
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from .. import profiling
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+TOKEN = 'profiling-admin-token'
+
+
+@override_settings(PROFILING_ADMIN_TOKEN=TOKEN, PROFILING_SAMPLE_RATE=0.0)
+class ProfilingTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        make_analysis()
+
+    def history(self, **headers):
+        response = self.client.get('/api/history/', HTTP_X_DEVICE_ID=DEVICE_ID, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def stored(self, suffix='.json'):
+        directory = settings.PROFILING_DIR
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(suffix)] for name in os.listdir(directory) if name.endswith(suffix))
+
+    def admin_get(self, path, **params):
+        return self.client.get(path, params, HTTP_X_PROFILE_TOKEN=TOKEN)
+
+    def test_admin_token_profiles_and_reports_the_id(self):
+        response = self.history(HTTP_X_PROFILE_TOKEN=TOKEN)
+        profile_id = response['X-Profile-Id']
+        self.assertEqual(self.stored(), [profile_id])
+        self.assertEqual(self.stored('.prof'), [profile_id])
+
+        summary = self.admin_get(f'/api/admin/profiles/{profile_id}/').json()
+        self.assertEqual((summary['view'], summary['path']), ('get_analysis_history', '/api/history/'))
+        self.assertTrue(summary['top_functions'])
+        listed = self.admin_get('/api/admin/profiles/').json()['profiles']
+        self.assertEqual([profile['id'] for profile in listed], [profile_id])
+        self.assertNotIn('top_functions', listed[0])
+
+        download = self.admin_get(f'/api/admin/profiles/{profile_id}/', download=1)
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content))
+
+    def test_wrong_token_is_not_profiled(self):
+        response = self.history(HTTP_X_PROFILE_TOKEN='guess')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.stored(), [])
+
+    def test_sampling(self):
+        with override_settings(PROFILING_SAMPLE_RATE=0.25):
+            with mock.patch.object(profiling.random, 'random', return_value=0.5):
+                self.history()
+            self.assertEqual(self.stored(), [])
+            with mock.patch.object(profiling.random, 'random', return_value=0.1):
+                response = self.history()
+        # Stored for admins to read, but the sampled client isn't told
+        self.assertEqual(len(self.stored()), 1)
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_one_profile_at_a_time(self):
+        with profiling._profile_lock:
+            # A profile already running: this request is served, unprofiled
+            response = self.history(HTTP_X_PROFILE_TOKEN=TOKEN)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.stored(), [])
+        self.assertIn('X-Profile-Id', self.history(HTTP_X_PROFILE_TOKEN=TOKEN))
+
+    @override_settings(PROFILING_MAX_FILES=2)
+    def test_rotation_keeps_the_newest(self):
+        ids = [self.history(HTTP_X_PROFILE_TOKEN=TOKEN)['X-Profile-Id'] for _ in range(4)]
+        self.assertEqual(self.stored(), ids[2:])
+        self.assertEqual(self.stored('.prof'), ids[2:])
+
+    def test_admin_views_need_the_token(self):
+        profile_id = self.history(HTTP_X_PROFILE_TOKEN=TOKEN)['X-Profile-Id']
+        for path in ('/api/admin/profiles/', f'/api/admin/profiles/{profile_id}/'):
+            self.assertEqual(self.client.get(path).status_code, 403, path)
+            self.assertEqual(self.client.get(path, HTTP_X_PROFILE_TOKEN='guess').status_code, 403, path)
+        with override_settings(PROFILING_ADMIN_TOKEN=''):
+            # No token configured: nobody is an admin, not even with an empty header
+            self.assertEqual(self.client.get('/api/admin/profiles/', HTTP_X_PROFILE_TOKEN='').status_code, 403)
+
+    def test_download_stays_in_the_profiling_dir(self):
+        self.history(HTTP_X_PROFILE_TOKEN=TOKEN)
+        # A file next to the profiling dir that a traversal would reach
+        secret = os.path.join(self.runtime_dir, 'secret.prof')
+        with open(secret, 'w') as f:
+            f.write('secret')
+        for profile_id in ('..', '.hidden', '../secret', '..%2Fsecret', 'x%5C..%5Csecret'):
+            response = self.admin_get(f'/api/admin/profiles/{profile_id}/', download=1)
+            self.assertEqual(response.status_code, 404, profile_id)
+        for profile_id in ('', '..', '../secret', '.secret', 'a/b', 'missing'):
+            self.assertIsNone(profiling.profile_path(profile_id), profile_id)
+        with mock.patch.object(profiling.os, 'altsep', '\\'):
+            self.assertIsNone(profiling.profile_path('x\\..\\secret'))
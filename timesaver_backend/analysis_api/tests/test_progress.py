@@ -0,0 +1,38 @@
+# analysis_api/tests/test_progress.py
+import time
+
+from django.test import SimpleTestCase
+
+from .. import simple_progress
+from .helpers import IsolatedRuntimeMixin
+
+
+class ProgressViewTests(IsolatedRuntimeMixin, SimpleTestCase):
+    def add_job(self, job_id, **fields):
+        # Registered directly: create_job() would start the real pipeline
+        simple_progress.jobs[job_id] = {
+            'url': 'https://www.youtube.com/watch?v=aaaaaaaaaaa',
+            'teacher_progress': 0.5, 'analyst_progress': 0.0, 'explorer_progress': 0.0,
+            'status': 'running', 'result': None, 'error': None, 'created_at': time.time(),
+            **fields,
+        }
+        self.addCleanup(simple_progress.jobs.pop, job_id, None)
+
+    def test_running_job_is_found(self):
+        # Regression: every job carries an 'error' key (None), which used to read as "not found"
+        self.add_job('job_running')
+        response = self.client.get('/api/progress/job_running/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'running')
+        self.assertIsNone(response.json()['error'])
+
+    def test_failed_job_reports_its_error(self):
+        self.add_job('job_failed', status='failed', error='Gemini unavailable')
+        response = self.client.get('/api/progress/job_failed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['error'], 'Gemini unavailable')
+
+    def test_unknown_job_is_404(self):
+        response = self.client.get('/api/progress/job_missing/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Job not found'})
@@ -0,0 +1,78 @@
+# analysis_api/tests/test_provider_replay.py
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import analysis_core, provider_replay
+from ..benchmarks.fixtures import long_video_fixture
+
+LONG_VIDEO = 'rpLongAuto2'
+
+
+def analyze(video_id):
+    return analysis_core.orchestrate_analysis(f'https://www.youtube.com/watch?v={video_id}')
+
+
+class ReplayTests(SimpleTestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.long_video = long_video_fixture(analysis_core.PROMPT_VERSION)
+
+    def test_corpus_replays_the_same_result_twice(self):
+        with provider_replay.replaying(latency_scale=0, fixtures=[self.long_video]) as corpus:
+            self.assertIn(LONG_VIDEO, corpus)
+            self.assertGreaterEqual(len(corpus), 5)
+            for video_id in corpus:
+                first = analyze(video_id)
+                self.assertEqual(analyze(video_id), first, video_id)
+                self.assertTrue(first['highlights'], video_id)
+
+    def test_long_video_is_sampled_from_auto_captions(self):
+        segments = self.long_video['calls'][5]['result']
+        self.assertGreater(len(segments), 2000)
+        self.assertEqual(long_video_fixture(analysis_core.PROMPT_VERSION), self.long_video)  # Deterministic
+
+        with provider_replay.replaying(corpus_dir=None, latency_scale=0, fixtures=[self.long_video]):
+            result = analyze(LONG_VIDEO)
+        self.assertEqual(result['title'], 'Database internals lecture (full course)')
+        self.assertEqual(len(result['highlights']), 6)
+
+    def test_gemini_answers_are_keyed_by_prompt_version(self):
+        with provider_replay.replaying(corpus_dir=None, latency_scale=0, fixtures=[self.long_video]):
+            analysis_core.YouTube(f'https://www.youtube.com/watch?v={LONG_VIDEO}')  # Gemini follows this video
+            self.assertTrue(analysis_core.model.generate_content('prompt').text)
+            with mock.patch.object(analysis_core, 'PROMPT_VERSION', 'next'), \
+                    self.assertRaises(provider_replay.ReplayMiss):
+                analysis_core.model.generate_content('prompt')
+
+
+class FixtureFileTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='timesaver-replay-')
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_saved_fixtures_are_compact_gzip_and_reproducible(self):
+        fixture = long_video_fixture('1')
+        path = provider_replay.save_fixture(fixture, self.directory)
+        self.assertTrue(path.endswith('.json.gz'))
+        with open(path, 'rb') as f:
+            saved = f.read()
+        self.assertNotIn(b'\n', gzip.decompress(saved))
+        self.assertLess(len(saved), len(json.dumps(fixture)) // 5)
+        provider_replay.save_fixture(fixture, self.directory)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), saved)
+        self.assertEqual(provider_replay.load_corpus(self.directory), {fixture['video_id']: fixture})
+
+    def test_plain_json_fixtures_still_load(self):
+        fixture = {'video_id': 'aaaaaaaaaaa', 'calls': []}
+        with open(os.path.join(self.directory, 'aaaaaaaaaaa.json'), 'w') as f:
+            json.dump(fixture, f)
+        self.assertEqual(provider_replay.load_corpus(self.directory), {'aaaaaaaaaaa': fixture})
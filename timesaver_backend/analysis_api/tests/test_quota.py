@@ -0,0 +1,38 @@
+# analysis_api/tests/test_quota.py
+from django.test import TestCase, override_settings
+
+from .. import quota
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+
+@override_settings(WORK_QUOTA={'BUDGET': 10, 'WINDOW_SECONDS': 86400, 'COSTS': {}})
+class RateLimitHeaderTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        make_analysis(video_id='aaaaaaaaaaa')
+
+    def analyze(self):
+        # A cache hit: free, so only the request limit moves
+        return self.client.post(
+            '/api/analyze/', {'url': 'https://www.youtube.com/watch?v=aaaaaaaaaaa'},
+            content_type='application/json', HTTP_X_DEVICE_ID=DEVICE_ID,
+        )
+
+    def test_request_limit_reported_while_budget_is_ample(self):
+        response = self.analyze()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Remaining'], '4')
+        self.assertEqual(response['X-RateLimit-Budget-Remaining'], '10')
+
+    def test_budget_reported_once_it_is_the_tighter_limit(self):
+        quota.charge(DEVICE_ID, 8)
+        response = self.analyze()
+        self.assertEqual(response['X-RateLimit-Remaining'], '2')
+        self.assertEqual(response['X-RateLimit-Reset'], response['X-RateLimit-Budget-Reset'])
+        self.assertEqual(response['X-RateLimit-Budget-Limit'], '10')
+
+    def test_exhausted_budget_is_rejected(self):
+        quota.charge(DEVICE_ID, 10)
+        response = self.analyze()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['remaining_requests'], 0)
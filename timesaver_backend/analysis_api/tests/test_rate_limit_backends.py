@@ -0,0 +1,125 @@
+# analysis_api/tests/test_rate_limit_backends.py
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import rate_limit_backends
+from ..rate_limit_backends import (
+    BackendUnavailable, CacheBackend, RedisBackend, ResilientBackend, SQLiteBackend,
+)
+from .fake_redis import FakeRedis
+from .helpers import IsolatedRuntimeMixin
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RedisBackendTests(IsolatedRuntimeMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        self.redis = FakeRedis(clock=self.clock)
+        self.backend = RedisBackend(client=self.redis)
+
+    def test_hit_counts_and_reads_previous_window_in_one_round_trip(self):
+        self.assertEqual(self.backend.hit('k', 9, 120), (1, 0))
+        self.assertEqual(self.backend.hit('k', 10, 120), (1, 1))
+        self.assertEqual(self.backend.hit('k', 10, 120, amount=3), (4, 1))
+        self.assertEqual(self.redis.round_trips, 3)
+
+    def test_peek_adds_nothing(self):
+        self.backend.hit('k', 10, 120)
+        self.assertEqual(self.backend.hit('k', 10, 120, amount=0), (1, 0))
+
+    def test_undo(self):
+        self.backend.hit('k', 10, 120)
+        self.backend.hit('k', 10, 120)
+        self.backend.undo('k', 10)
+        self.assertEqual(self.backend.hit('k', 10, 120, amount=0), (1, 0))
+
+    def test_counters_expire_after_ttl(self):
+        self.backend.hit('k', 10, 120)
+        self.assertEqual(self.redis.ttl('k:10'), 120)
+        self.clock.now += 119
+        self.assertEqual(self.backend.hit('k', 11, 120), (1, 1))
+        self.clock.now += 1
+        self.assertEqual(self.backend.hit('k', 11, 120), (2, 0))
+
+    def test_unreachable_server_raises_backend_unavailable(self):
+        self.redis.down = True
+        with self.assertRaises(BackendUnavailable):
+            self.backend.hit('k', 10, 120)
+        with self.assertRaises(BackendUnavailable):
+            self.backend.undo('k', 10)
+
+
+class SQLiteBackendTests(IsolatedRuntimeMixin, SimpleTestCase):
+    def test_hit_undo_and_shared_file(self):
+        path = f'{self.runtime_dir}/counters.sqlite3'
+        first, second = SQLiteBackend(path), SQLiteBackend(path)  # Like two workers
+        self.assertEqual(first.hit('k', 9, 120), (1, 0))
+        self.assertEqual(second.hit('k', 10, 120, amount=2), (2, 1))
+        first.undo('k', 10)
+        self.assertEqual(second.hit('k', 10, 120, amount=0), (1, 1))
+
+    def test_undo_never_goes_negative(self):
+        backend = SQLiteBackend(f'{self.runtime_dir}/counters.sqlite3')
+        backend.hit('k', 10, 120, amount=0)
+        backend.undo('k', 10)
+        self.assertEqual(backend.hit('k', 10, 120, amount=0), (0, 0))
+
+
+class ResilientBackendTests(IsolatedRuntimeMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = FakeRedis()
+        self.backend = ResilientBackend(RedisBackend(client=self.redis), fallback=CacheBackend(), retry_seconds=5.0)
+        self.clock = Clock()
+        patcher = mock.patch.object(rate_limit_backends.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_uses_shared_backend_while_it_is_up(self):
+        self.backend.hit('k', 10, 120)
+        self.backend.hit('k', 10, 120)
+        self.assertEqual(self.redis.round_trips, 2)
+        self.assertEqual(int(self.redis._get('k:10')), 2)
+
+    def test_fails_over_to_local_counters_and_recovers(self):
+        self.backend.hit('k', 10, 120)
+        self.redis.down = True
+
+        # The failing call is answered locally, and later ones skip the
+        # shared backend without paying another timeout
+        self.assertEqual(self.backend.hit('k', 10, 120), (1, 0))
+        round_trips = self.redis.round_trips
+        self.assertEqual(self.backend.hit('k', 10, 120), (2, 0))
+        self.backend.undo('k', 10)
+        self.assertEqual(self.redis.round_trips, round_trips)
+
+        # Back up, but still inside the retry delay
+        self.redis.down = False
+        self.clock.now += 4.9
+        self.assertEqual(self.backend.hit('k', 10, 120), (2, 0))
+
+        # After it, the shared counters are used again, where they were left
+        self.clock.now += 0.2
+        self.assertEqual(self.backend.hit('k', 10, 120), (2, 0))
+        self.assertEqual(int(self.redis._get('k:10')), 2)
+
+    def test_configured_backend_is_wrapped(self):
+        with self.settings(RATE_LIMIT_BACKEND={
+            'BACKEND': 'analysis_api.rate_limit_backends.RedisBackend',
+            'OPTIONS': {'client': self.redis},
+            'RETRY_SECONDS': 1.0,
+        }):
+            rate_limit_backends.reset_backend()
+            backend = rate_limit_backends.get_backend()
+        self.assertIsInstance(backend, ResilientBackend)
+        self.assertIs(backend.primary.client, self.redis)
+        self.assertEqual(backend.retry_seconds, 1.0)
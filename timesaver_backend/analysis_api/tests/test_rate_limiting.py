@@ -0,0 +1,88 @@
+# analysis_api/tests/test_rate_limiting.py
+import threading
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import rate_limiting
+from ..rate_limit_backends import get_backend
+from ..rate_limiting import RateLimiter
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin
+
+ANALYZE = RateLimiter.RATE_LIMITS['analyze']
+WINDOW = ANALYZE['window_seconds']
+LIMIT = ANALYZE['max_requests']
+# Start of a fixed window, far from any real clock
+WINDOW_START = 1_700_000_040
+
+
+class SlidingWindowTests(IsolatedRuntimeMixin, SimpleTestCase):
+    def at(self, seconds):
+        """Freeze the limiter's clock at WINDOW_START + seconds."""
+        patcher = mock.patch.object(
+            rate_limiting.timezone, 'now',
+            return_value=datetime.fromtimestamp(WINDOW_START + seconds, tz=dt_timezone.utc),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return patcher
+
+    def check(self, device_id=DEVICE_ID):
+        return RateLimiter.check_rate_limit(device_id, ANALYZE['endpoint'])
+
+    def counter(self, window_index, device_id=DEVICE_ID):
+        current, _ = get_backend().hit(f'rate_limit:{device_id[:16]}:analyze', window_index, WINDOW * 2, 0)
+        return current
+
+    def test_allows_limit_then_rejects(self):
+        self.at(1)
+        results = [self.check() for _ in range(LIMIT + 1)]
+        self.assertEqual([allowed for allowed, _, _ in results], [True] * LIMIT + [False])
+        self.assertEqual([remaining for _, remaining, _ in results], list(range(LIMIT - 1, -1, -1)) + [0])
+        self.assertEqual(results[0][2], WINDOW_START + WINDOW)
+
+    def test_rejected_requests_are_undone(self):
+        self.at(1)
+        for _ in range(LIMIT + 10):
+            self.check()
+        self.assertEqual(self.counter(WINDOW_START // WINDOW), LIMIT)
+
+    def test_previous_window_weighs_by_overlap(self):
+        patcher = self.at(1)
+        for _ in range(LIMIT):
+            self.assertTrue(self.check()[0])
+        patcher.stop()
+
+        # Halfway through the next window, half of the last one still counts:
+        # 2.5 + 2 fits under the limit of 5, 2.5 + 3 doesn't
+        patcher = self.at(WINDOW + WINDOW // 2)
+        self.assertEqual([self.check()[0] for _ in range(LIMIT)], [True, True, False, False, False])
+        patcher.stop()
+
+        # Two windows on, nothing from the first one is left
+        self.at(3 * WINDOW + 1)
+        self.assertEqual([self.check()[0] for _ in range(LIMIT + 1)], [True] * LIMIT + [False])
+
+    def test_devices_are_counted_separately(self):
+        self.at(1)
+        for _ in range(LIMIT + 1):
+            self.check()
+        self.assertTrue(self.check('device-cccccccccccccccc')[0])
+
+    def test_concurrent_hits_never_exceed_limit(self):
+        self.at(1)
+        results = []
+        start = threading.Barrier(20)
+
+        def hit():
+            start.wait()
+            results.append(self.check()[0])
+
+        threads = [threading.Thread(target=hit) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), LIMIT)
+        self.assertEqual(self.counter(WINDOW_START // WINDOW), LIMIT)
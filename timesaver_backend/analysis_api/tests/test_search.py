@@ -0,0 +1,105 @@
+# analysis_api/tests/test_search.py
+from django.db import connection
+from django.test import TestCase
+
+from .. import search_index, video_content
+from ..models import VideoAnalysis
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_analysis, make_highlights
+
+
+def highlight(title, description, timestamp='01:00'):
+    return {'agent': 'The Teacher', 'timestamp': timestamp, 'title': title, 'description': description}
+
+
+class KeywordSearchTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.in_title = make_analysis(video_id='aaaaaaaaaaa', title='Sourdough bread basics')
+        self.in_description = make_analysis(video_id='bbbbbbbbbbb', title='Weekend baking', highlights=[
+            highlight('Introduction', 'What we are making today.', '00:10'),
+            highlight('The starter', 'Feeding a sourdough starter twice a day.', '03:45'),
+        ])
+        self.unrelated = make_analysis(video_id='ccccccccccc', title='Marathon training')
+
+    def search(self, query, device_id=DEVICE_ID):
+        response = self.client.get('/api/search/', {'q': query}, HTTP_X_DEVICE_ID=device_id)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_title_matches_rank_above_description_matches(self):
+        results = self.search('sourdough')
+        self.assertEqual([result['id'] for result in results], [self.in_title.id, self.in_description.id])
+        self.assertGreater(results[0]['match']['score'], results[1]['match']['score'])
+
+    def test_match_points_at_the_highlight(self):
+        match = self.search('starter')[0]['match']
+        self.assertEqual(match['highlight_index'], 1)
+        self.assertEqual(match['highlight_title'], 'The starter')
+        self.assertEqual(match['timestamp'], '03:45')
+        self.assertIn('[starter]', match['snippet'])
+
+    def test_title_match_has_no_highlight(self):
+        match = self.search('basics')[0]['match']
+        self.assertEqual(match['highlight_index'], -1)
+        self.assertIsNone(match['highlight_title'])
+        self.assertIsNone(match['timestamp'])
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual([result['id'] for result in self.search('marath')], [self.unrelated.id])
+        # Only the last word: earlier words must match whole
+        self.assertEqual(self.search('marath training'), [])
+        self.assertEqual(len(self.search('marathon train')), 1)
+
+    def test_every_word_must_match(self):
+        self.assertEqual([result['id'] for result in self.search('sourdough basics')], [self.in_title.id])
+
+    def test_other_devices_are_not_searched(self):
+        self.assertEqual(self.search('sourdough', device_id=OTHER_DEVICE_ID), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"sourdough OR marathon'), [])
+        self.assertEqual(self.search('***'), [])
+
+
+class SearchIndexUpkeepTests(IsolatedRuntimeMixin, TestCase):
+    def indexed(self, analysis_id):
+        """(rowid, highlight_index) of an analysis's rows, found by scanning analysis_id."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, highlight_index FROM {search_index.FTS_TABLE} WHERE analysis_id = %s ORDER BY rowid",
+                [analysis_id],
+            )
+            return cursor.fetchall()
+
+    def test_rows_are_keyed_by_analysis(self):
+        analysis = make_analysis(highlights=make_highlights(count=2))
+        base = analysis.id * search_index.ROW_STRIDE
+        self.assertEqual(self.indexed(analysis.id), [(base, -1), (base + 1, 0), (base + 2, 1)])
+
+    def test_saving_replaces_the_rows(self):
+        analysis = make_analysis(highlights=make_highlights(count=3, prefix='Old'))
+        analysis.content = video_content.store(
+            analysis.video_id, title='A video', duration='10:00', thumbnail_url='',
+            highlights=make_highlights(count=1, prefix='New'),
+        )
+        analysis.save()
+        self.assertEqual([index for _, index in self.indexed(analysis.id)], [-1, 0])
+        self.assertEqual(search_index.search(DEVICE_ID, 'old'), [])
+        self.assertEqual([hit_id for hit_id, _ in search_index.search(DEVICE_ID, 'new')], [analysis.id])
+
+    def test_deletes_remove_only_their_rows(self):
+        kept = make_analysis(video_id='aaaaaaaaaaa')
+        deleted = make_analysis(video_id='bbbbbbbbbbb')
+        bulk_deleted = make_analysis(video_id='ccccccccccc')
+        deleted.delete()
+        VideoAnalysis.objects.filter(id=bulk_deleted.id).delete()
+        self.assertEqual(self.indexed(deleted.id), [])
+        self.assertEqual(self.indexed(bulk_deleted.id), [])
+        self.assertEqual(len(self.indexed(kept.id)), 4)
+
+    def test_highlights_beyond_the_stride_are_not_indexed(self):
+        analysis = make_analysis(highlights=make_highlights(count=search_index.ROW_STRIDE + 5))
+        neighbour = make_analysis(video_id='bbbbbbbbbbb')
+        rows = self.indexed(analysis.id)
+        self.assertEqual(len(rows), search_index.ROW_STRIDE)
+        self.assertLess(rows[-1][0], neighbour.id * search_index.ROW_STRIDE)
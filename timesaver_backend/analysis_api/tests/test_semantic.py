@@ -0,0 +1,116 @@
+# analysis_api/tests/test_semantic.py
+import os
+import unittest
+from unittest import mock
+
+from django.test import TestCase
+
+from .. import embeddings
+from ..models import VideoAnalysis
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+TOPICS = {
+    'aaaaaaaaaaa': ('Photosynthesis in green plants', 'How leaves turn sunlight into sugar'),
+    'bbbbbbbbbbb': ('Baking sourdough bread at home', 'Feeding the starter and shaping loaves'),
+    'ccccccccccc': ('Training for your first marathon', 'Building weekly mileage without injuries'),
+}
+
+
+def topic_highlights(title, description):
+    return [
+        {'agent': 'The Teacher', 'timestamp': '00:30', 'title': 'Introduction', 'description': 'What this video covers.'},
+        {'agent': 'The Analyst', 'timestamp': '04:10', 'title': title, 'description': description},
+    ]
+
+
+@unittest.skipUnless(embeddings.is_available(), 'needs numpy')
+class SemanticSearchTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.analyses = {
+                video_id: make_analysis(video_id=video_id, title=title, highlights=topic_highlights(title, description))
+                for video_id, (title, description) in TOPICS.items()
+            }
+
+    def search(self, query, device_id=DEVICE_ID):
+        response = self.client.get('/api/search/', {'q': query, 'mode': 'semantic'}, HTTP_X_DEVICE_ID=device_id)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranks_the_matching_topic_first(self):
+        for query, video_id in (('plant photosynthesis', 'aaaaaaaaaaa'), ('bake bread', 'bbbbbbbbbbb'),
+                                ('marathons training', 'ccccccccccc')):
+            body = self.search(query)
+            self.assertEqual(body['mode'], 'semantic')
+            self.assertEqual(body['results'][0]['id'], self.analyses[video_id].id, query)
+
+    def test_match_points_at_the_best_highlight(self):
+        body = self.search('feeding a sourdough starter')
+        match = body['results'][0]['match']
+        self.assertEqual(match['highlight_index'], 1)
+        self.assertEqual(match['timestamp'], '04:10')
+        self.assertGreater(match['score'], 0)
+
+    def test_other_devices_are_not_searched(self):
+        self.assertEqual(self.search('photosynthesis', device_id=OTHER_DEVICE_ID)['results'], [])
+
+    def test_unrelated_query_finds_nothing(self):
+        self.assertEqual(self.search('zzqx')['results'], [])
+
+    def test_saved_analyses_are_appended(self):
+        self.search('photosynthesis')  # Builds the device's files
+        vector_path, key_path, _ = embeddings._paths(DEVICE_ID)
+        size = os.path.getsize(key_path)
+        with self.captureOnCommitCallbacks(execute=True):
+            added = make_analysis(video_id='ddddddddddd', title='Volcanic eruptions explained',
+                                  highlights=topic_highlights('Magma chambers', 'Pressure builds under the crust'))
+        self.assertGreater(os.path.getsize(key_path), size)  # Appended, not rebuilt on the next search
+        with mock.patch.object(embeddings, 'rebuild', wraps=embeddings.rebuild) as rebuild:
+            body = self.search('volcano eruption')
+        rebuild.assert_not_called()
+        self.assertEqual(body['results'][0]['id'], added.id)
+
+    def test_missed_writes_trigger_a_rebuild(self):
+        embeddings.rebuild(DEVICE_ID)
+        # Bypasses signals, like bulk paths that forget to append
+        content = make_analysis(video_id='ddddddddddd', title='Volcanic eruptions explained').content
+        VideoAnalysis.objects.filter(video_id='ddddddddddd').delete()
+        missed = VideoAnalysis.objects.bulk_create([VideoAnalysis(
+            device_id=DEVICE_ID, video_id='eeeeeeeeeee', video_url='', content=content,
+        )])[0]
+
+        with mock.patch.object(embeddings, 'rebuild', wraps=embeddings.rebuild) as rebuild:
+            hits = embeddings.search(DEVICE_ID, 'volcano eruption', analysis_count=4)
+        rebuild.assert_called_once_with(DEVICE_ID)
+        self.assertEqual(hits[0][0], missed.id)
+
+        # Consistent now: the next search maps the files as they are
+        with mock.patch.object(embeddings, 'rebuild', wraps=embeddings.rebuild) as rebuild:
+            embeddings.search(DEVICE_ID, 'volcano eruption', analysis_count=4)
+        rebuild.assert_not_called()
+
+    def test_deletes_drop_the_files(self):
+        self.search('photosynthesis')
+        _, key_path, _ = embeddings._paths(DEVICE_ID)
+        self.assertTrue(os.path.exists(key_path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.analyses['aaaaaaaaaaa'].delete()
+        self.assertFalse(os.path.exists(key_path))
+        results = self.search('photosynthesis green plants')['results']
+        self.assertNotIn(self.analyses['aaaaaaaaaaa'].id, [result['id'] for result in results])
+
+
+class SemanticFallbackTests(IsolatedRuntimeMixin, TestCase):
+    def test_without_numpy_falls_back_to_keyword_search(self):
+        analysis = make_analysis(title='Photosynthesis in green plants')
+        with mock.patch.object(embeddings, 'np', None):
+            response = self.client.get('/api/search/', {'q': 'photosynthesis', 'mode': 'semantic'},
+                                       HTTP_X_DEVICE_ID=DEVICE_ID)
+        body = response.json()
+        self.assertEqual(body['mode'], 'keyword')
+        self.assertEqual([result['id'] for result in body['results']], [analysis.id])
+
+    def test_unknown_mode_is_400(self):
+        response = self.client.get('/api/search/', {'q': 'x', 'mode': 'fuzzy'}, HTTP_X_DEVICE_ID=DEVICE_ID)
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,87 @@
+# analysis_api/tests/test_shared_content.py
+import copy
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from .. import analysis_core, bulk_analysis, video_content
+from ..analysis_core import FALLBACK_HIGHLIGHTS, GEMINI_MODEL, PLACEHOLDER_TITLE, PLACEHOLDER_TRANSCRIPT, PROMPT_VERSION
+from ..models import VideoAnalysis, VideoContent
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_highlights
+
+VIDEO_ID = 'dQw4w9WgXcQ'
+URL = f'https://www.youtube.com/watch?v={VIDEO_ID}'
+
+
+def metadata(title='A real video', transcript='Real words were said here.'):
+    return {
+        'title': title, 'duration': '10:00',
+        'thumbnailUrl': f'https://img.youtube.com/vi/{VIDEO_ID}/hqdefault.jpg',
+        'thumbnail_url': f'https://img.youtube.com/vi/{VIDEO_ID}/hqdefault.jpg',
+        'transcript': transcript, 'segments': [],
+    }
+
+
+class SharedContentTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(analysis_core, 'client_initialized', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def analyze(self, device_id, metadata, highlights):
+        with mock.patch.object(analysis_core, 'get_transcript_and_metadata', return_value=metadata) as fetch, \
+                mock.patch.object(analysis_core, 'run_gemini_agent_workflow', return_value=copy.deepcopy(highlights)):
+            response = self.client.post(
+                '/api/analyze/', {'url': URL}, content_type='application/json', HTTP_X_DEVICE_ID=device_id,
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.json(), fetch.called
+
+    def test_real_result_is_shared(self):
+        self.analyze(DEVICE_ID, metadata(), make_highlights())
+        body, ran_again = self.analyze(OTHER_DEVICE_ID, metadata(), make_highlights(prefix='Other'))
+        self.assertFalse(ran_again)
+        self.assertEqual(body['highlights'][0]['title'], 'Point 0')
+
+    def test_degraded_results_are_not_served_to_other_devices(self):
+        cases = {
+            'fallback highlights': (metadata(), FALLBACK_HIGHLIGHTS),
+            'placeholder transcript': (metadata(transcript=PLACEHOLDER_TRANSCRIPT), make_highlights(prefix='Generic')),
+            'placeholder title': (metadata(title=PLACEHOLDER_TITLE), make_highlights(prefix='Untitled')),
+        }
+        for case, (degraded_metadata, highlights) in cases.items():
+            with self.subTest(case):
+                VideoAnalysis.objects.all().delete()
+                VideoContent.objects.all().delete()
+                self.analyze(DEVICE_ID, degraded_metadata, highlights)
+                content = VideoAnalysis.objects.get(device_id=DEVICE_ID).content
+                self.assertEqual((content.model_name, content.prompt_version), ('', ''))
+                self.assertIsNone(video_content.reusable(VIDEO_ID, GEMINI_MODEL, PROMPT_VERSION))
+
+                # The second device gets a fresh analysis, not the stand-in
+                body, ran_again = self.analyze(OTHER_DEVICE_ID, metadata(), make_highlights(prefix='Fresh'))
+                self.assertTrue(ran_again)
+                self.assertEqual(body['highlights'][0]['title'], 'Fresh 0')
+                # ...which is real, so it is the one shared from now on
+                self.assertEqual(video_content.reusable(VIDEO_ID, GEMINI_MODEL, PROMPT_VERSION).title, 'A real video')
+
+    def test_bulk_pending_retries_videos_with_only_degraded_content(self):
+        video_content.store(VIDEO_ID, PLACEHOLDER_TITLE, '10:30', '', FALLBACK_HIGHLIGHTS)
+        video_content.store('aaaaaaaaaaa', 'Real', '1:00', '', make_highlights(),
+                            model_name=GEMINI_MODEL, prompt_version=PROMPT_VERSION)
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = bulk_analysis.Checkpoint(os.path.join(directory, 'checkpoint.jsonl'))
+            self.assertEqual(bulk_analysis.pending([VIDEO_ID, 'aaaaaaaaaaa'], checkpoint), [VIDEO_ID])
+
+
+class UnusableReasonTests(TestCase):
+    def test_rules(self):
+        unusable_reason = analysis_core.unusable_reason
+        self.assertIsNone(unusable_reason('Title', 'words', make_highlights()))
+        self.assertTrue(unusable_reason('Title', PLACEHOLDER_TRANSCRIPT, make_highlights()))
+        self.assertTrue(unusable_reason('Title', 'words', copy.deepcopy(FALLBACK_HIGHLIGHTS)))
+        self.assertTrue(unusable_reason(PLACEHOLDER_TITLE, 'words', make_highlights()))
+
@@ -0,0 +1,112 @@
+# analysis_api/tests/test_sync.py
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import sync
+from ..models import ChangeLogEntry, VideoAnalysis, VideoBookmark
+from .helpers import DEVICE_ID, IsolatedRuntimeMixin, make_analysis
+
+
+class SyncTests(IsolatedRuntimeMixin, TestCase):
+    def sync(self, cursor=None):
+        path = '/api/sync/' if cursor is None else f'/api/sync/?cursor={cursor}'
+        response = self.client.get(path, HTTP_X_DEVICE_ID=DEVICE_ID)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_deletes_arrive_as_tombstones(self):
+        analysis = make_analysis(video_id='aaaaaaaaaaa')
+        kept = make_analysis(video_id='bbbbbbbbbbb')
+        bookmark = VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=kept)
+        cursor = self.sync()['cursor']
+
+        analysis_id, bookmark_id = analysis.id, bookmark.id
+        analysis.delete()
+        bookmark.delete()
+        changes = self.sync(cursor)
+        self.assertFalse(changes['full_resync'])
+        self.assertEqual(changes['analyses']['deleted'], [analysis_id])
+        self.assertEqual(changes['analyses']['created'], [])
+        self.assertEqual(changes['bookmarks']['deleted'], [bookmark_id])
+
+        # Nothing left to replay
+        changes = self.sync(changes['cursor'])
+        self.assertEqual(changes['analyses']['deleted'], [])
+        self.assertFalse(changes['has_more'])
+
+    def test_create_then_delete_within_a_batch_is_only_a_tombstone(self):
+        make_analysis(video_id='aaaaaaaaaaa')
+        cursor = self.sync()['cursor']
+        analysis = make_analysis(video_id='bbbbbbbbbbb')
+        analysis_id = analysis.id
+        analysis.delete()
+        changes = self.sync(cursor)
+        self.assertEqual(changes['analyses']['created'], [])
+        self.assertEqual(changes['analyses']['deleted'], [analysis_id])
+
+    def test_cursor_below_sync_floor_gets_a_snapshot(self):
+        old = make_analysis(video_id='aaaaaaaaaaa')
+        stale_cursor = self.sync()['cursor']
+        make_analysis(video_id='bbbbbbbbbbb')
+        old.delete()
+
+        # Everything is past retention, so compaction raises the floor
+        ChangeLogEntry.objects.update(created_at=timezone.now() - timezone.timedelta(days=60))
+        sync.compact(retention_days=30)
+        self.assertFalse(ChangeLogEntry.objects.exists())
+
+        changes = self.sync(stale_cursor)
+        self.assertTrue(changes['full_resync'])
+        self.assertEqual([a['video_url'][-11:] for a in changes['analyses']['created']], ['bbbbbbbbbbb'])
+        self.assertGreater(changes['cursor'], stale_cursor)
+        # The snapshot's cursor is at the floor and replays cleanly
+        self.assertFalse(self.sync(changes['cursor'])['full_resync'])
+
+    def test_invalid_cursor_is_400(self):
+        for cursor in ('abc', 's1.x.y', 'sabc', 's5.a.%21%21'):
+            response = self.client.get(f'/api/sync/?cursor={cursor}', HTTP_X_DEVICE_ID=DEVICE_ID)
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class SnapshotPagingTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.analyses = [make_analysis(video_id=f'v{index:010d}') for index in range(5)]
+        # Same created_at for several rows: the id breaks ties
+        VideoAnalysis.objects.filter(id__in=[a.id for a in self.analyses[:3]]).update(created_at=timezone.now())
+        for analysis in self.analyses[:3]:
+            VideoBookmark.objects.create(session_id=DEVICE_ID, video_analysis=analysis)
+        self.queryset = VideoAnalysis.objects.select_related('content')
+
+    def test_pages_cover_everything_once(self):
+        cursor = sync.latest_cursor(DEVICE_ID)
+        pages = [sync.snapshot(DEVICE_ID, self.queryset, page_size=2)]
+        while pages[-1]['has_more']:
+            self.assertTrue(sync.is_snapshot_token(pages[-1]['cursor']))
+            pages.append(sync.snapshot(DEVICE_ID, self.queryset, pages[-1]['cursor'], page_size=2))
+
+        analysis_ids = [a.id for page in pages for a in page['analyses']['created']]
+        bookmark_ids = [b['analysis_id'] for page in pages for b in page['bookmarks']['created']]
+        self.assertEqual(sorted(analysis_ids), sorted(a.id for a in self.analyses))
+        self.assertEqual(len(analysis_ids), len(set(analysis_ids)))
+        self.assertEqual(sorted(bookmark_ids), sorted(a.id for a in self.analyses[:3]))
+        self.assertTrue(all(len(page['analyses']['created']) <= 2 for page in pages))
+        self.assertTrue(all(page['full_resync'] for page in pages))
+        # The last page hands back the log cursor read before the first page
+        self.assertEqual(pages[-1]['cursor'], cursor)
+
+    def test_changes_during_snapshot_are_replayed_after_it(self):
+        first = sync.snapshot(DEVICE_ID, self.queryset, page_size=2)
+        added = make_analysis(video_id='zzzzzzzzzzz')
+        page = first
+        while page['has_more']:
+            page = sync.snapshot(DEVICE_ID, self.queryset, page['cursor'], page_size=2)
+        changes = sync.changes_since(DEVICE_ID, page['cursor'], self.queryset)
+        self.assertIn(added.id, [a.id for a in changes['analyses']['created']])
+
+    def test_small_snapshot_is_one_page_with_a_log_cursor(self):
+        response = self.client.get('/api/sync/', HTTP_X_DEVICE_ID=DEVICE_ID).json()
+        self.assertFalse(response['has_more'])
+        self.assertEqual(len(response['analyses']['created']), 5)
+        self.assertEqual(len(response['bookmarks']['created']), 3)
+        self.assertIsInstance(response['cursor'], int)
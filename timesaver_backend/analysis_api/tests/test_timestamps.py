@@ -0,0 +1,103 @@
+# analysis_api/tests/test_timestamps.py
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import analysis_core
+from ..analysis_core import FALLBACK_HIGHLIGHTS, PLACEHOLDER_TRANSCRIPT, snap_to_transcript
+from ..timestamp_index import TimestampIndex, format_timestamp, parse_timestamp
+
+SEGMENTS = [
+    (10.0, 'First caption'),
+    (20.0, 'Second caption'),
+    (40.0, 'Third caption'),
+    (95.5, 'Last caption'),
+]
+
+
+def highlight(timestamp):
+    return {'agent': 'The Teacher', 'timestamp': timestamp, 'title': 'Point', 'description': 'About it.'}
+
+
+class TimestampParsingTests(SimpleTestCase):
+    def test_formats(self):
+        self.assertEqual(parse_timestamp('02:35'), 155)
+        self.assertEqual(parse_timestamp('1:02:03'), 3723)
+        self.assertEqual(parse_timestamp('around 4:05 in'), 245)
+        self.assertIsNone(parse_timestamp('soon'))
+        self.assertEqual(format_timestamp(3723.9), '62:03')
+
+
+class SnapTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = TimestampIndex(SEGMENTS)
+
+    def snap_one(self, timestamp, index=None):
+        return (index or self.index).snap([highlight(timestamp)])[0]
+
+    def test_moves_to_the_nearest_segment(self):
+        snapped = self.snap_one('00:37')
+        self.assertEqual((snapped['timestamp'], snapped['seconds']), ('00:40', 40))
+        self.assertTrue(snapped['excerpt'].startswith('Third caption'))
+
+    def test_before_the_first_caption(self):
+        self.assertEqual(self.snap_one('00:00')['seconds'], 10)
+
+    def test_after_the_last_caption(self):
+        snapped = self.snap_one('59:00')
+        self.assertEqual((snapped['timestamp'], snapped['seconds']), ('01:35', 95))
+
+    def test_tie_goes_to_the_earlier_caption(self):
+        self.assertEqual(self.snap_one('00:30')['seconds'], 20)
+        self.assertEqual(self.snap_one('00:15')['seconds'], 10)
+
+    def test_out_of_order_segments_are_sorted(self):
+        self.assertEqual(self.snap_one('00:19', TimestampIndex(list(reversed(SEGMENTS))))['seconds'], 20)
+
+    def test_unreadable_timestamps_are_left_alone(self):
+        original = highlight('whenever')
+        self.assertEqual(self.index.snap([original, 'not a dict']), [original, 'not a dict'])
+
+    def test_input_is_not_modified(self):
+        original = highlight('00:37')
+        self.index.snap([original])
+        self.assertEqual(original, highlight('00:37'))
+
+
+class ExcerptTests(SimpleTestCase):
+    def test_excerpt_running_past_the_end_stops_at_the_last_caption(self):
+        index = TimestampIndex(SEGMENTS)
+        self.assertEqual(index.excerpt(2), 'Third caption Last caption')
+        self.assertEqual(index.excerpt(3), 'Last caption')
+
+    def test_long_excerpt_is_cut_at_a_word(self):
+        index = TimestampIndex([(float(second), 'word ' * 10) for second in range(100)])
+        excerpt = index.excerpt(0, max_chars=32)
+        self.assertEqual(excerpt, 'word word word word word word…')
+
+    def test_blank_captions_are_skipped(self):
+        index = TimestampIndex([(0.0, '  '), (5.0, 'Spoken\n  words')])
+        self.assertEqual(index.excerpt(0), 'Spoken words')
+
+
+class NoTranscriptTests(SimpleTestCase):
+    def test_empty_transcript_leaves_highlights_alone(self):
+        highlights = [highlight('02:35')]
+        self.assertIs(snap_to_transcript(highlights, []), highlights)
+        self.assertEqual(TimestampIndex([]).snap(highlights), highlights)
+
+    def test_placeholder_transcript_leaves_highlights_alone(self):
+        # Without captions the pipeline analyzes the placeholder, which has no segments
+        metadata = {
+            'title': 'A video', 'duration': '10:00', 'thumbnailUrl': '', 'thumbnail_url': '',
+            'transcript': PLACEHOLDER_TRANSCRIPT, 'segments': [],
+        }
+        with mock.patch.object(analysis_core, 'client_initialized', True), \
+                mock.patch.object(analysis_core, 'get_transcript_and_metadata', return_value=metadata), \
+                mock.patch.object(analysis_core, 'run_gemini_agent_workflow', return_value=[highlight('02:35')]):
+            result = analysis_core.orchestrate_analysis('https://www.youtube.com/watch?v=aaaaaaaaaaa')
+        self.assertEqual(result['highlights'], [highlight('02:35')])
+
+    def test_fallback_highlights_are_not_snapped(self):
+        self.assertIs(snap_to_transcript(FALLBACK_HIGHLIGHTS, SEGMENTS), FALLBACK_HIGHLIGHTS)
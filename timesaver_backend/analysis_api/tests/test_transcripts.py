@@ -0,0 +1,131 @@
+# analysis_api/tests/test_transcripts.py
+import copy
+import os
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from .. import analysis_core, bulk_analysis, transcript_index, video_content
+from .helpers import DEVICE_ID, OTHER_DEVICE_ID, IsolatedRuntimeMixin, make_analysis, make_highlights
+
+BAKING = 'aaaaaaaaaaa'
+RUNNING = 'bbbbbbbbbbb'
+TRANSCRIPTS = {
+    BAKING: [
+        (0.0, 'Welcome back to the kitchen'),
+        (12.5, 'Today we feed the sourdough starter'),
+        (75.0, 'A sourdough starter loves warm water, and sourdough needs flour'),
+        (130.0, 'Thanks for watching'),
+    ],
+    RUNNING: [
+        (5.0, 'Long runs build the base'),
+        (40.0, 'Carbs like sourdough toast before a race'),
+    ],
+}
+
+
+def metadata(video_id):
+    return {
+        'title': f'Video {video_id}', 'duration': '10:00',
+        'thumbnailUrl': f'https://img.youtube.com/vi/{video_id}/hqdefault.jpg',
+        'thumbnail_url': f'https://img.youtube.com/vi/{video_id}/hqdefault.jpg',
+        'transcript': ' '.join(text for _, text in TRANSCRIPTS[video_id]),
+        'segments': TRANSCRIPTS[video_id],
+    }
+
+
+def indexed_rows(video_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {transcript_index.FTS_TABLE} WHERE video_id = %s", [video_id])
+        return cursor.fetchone()[0]
+
+
+class TranscriptSearchTests(IsolatedRuntimeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(analysis_core, 'client_initialized', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def analyze(self, video_id, device_id=DEVICE_ID):
+        with mock.patch.object(analysis_core, 'get_transcript_and_metadata', return_value=metadata(video_id)), \
+                mock.patch.object(analysis_core, 'run_gemini_agent_workflow', return_value=make_highlights()):
+            response = self.client.post(
+                '/api/analyze/', {'url': f'https://www.youtube.com/watch?v={video_id}'},
+                content_type='application/json', HTTP_X_DEVICE_ID=device_id,
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def search(self, query, device_id=DEVICE_ID, **params):
+        response = self.client.get('/api/transcripts/search/', {'q': query, **params}, HTTP_X_DEVICE_ID=device_id)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_analyze_indexes_the_transcript(self):
+        analysis = self.analyze(BAKING)
+        self.assertEqual(indexed_rows(BAKING), 4)
+        self.assertEqual(self.search('kitchen'), [{
+            'video_id': BAKING, 'seconds': 0, 'timestamp': '00:00', 'snippet': 'Welcome back to the [kitchen]',
+            'analysis_id': analysis['id'], 'title': f'Video {BAKING}',
+        }])
+
+    def test_hits_are_ranked(self):
+        self.analyze(BAKING)
+        hits = self.search('sourdough')
+        # The segment saying it twice first; the rest in time order
+        self.assertEqual([hit['seconds'] for hit in hits], [75, 12])
+        self.assertEqual(hits[0]['timestamp'], '01:15')
+        self.assertEqual(self.search('"sourdough starter"')[0]['seconds'], 12)  # Phrase, shorter segment
+
+    def test_devices_only_search_their_own_videos(self):
+        self.analyze(BAKING)
+        self.analyze(RUNNING, device_id=OTHER_DEVICE_ID)
+        self.assertEqual({hit['video_id'] for hit in self.search('sourdough')}, {BAKING})
+        self.assertEqual({hit['video_id'] for hit in self.search('sourdough', OTHER_DEVICE_ID)}, {RUNNING})
+        self.assertEqual(self.search('sourdough', video_id=RUNNING), [])
+
+    def test_a_video_is_indexed_once(self):
+        self.analyze(BAKING)
+        self.analyze(BAKING, device_id=OTHER_DEVICE_ID)
+        self.assertEqual(indexed_rows(BAKING), 4)
+        self.assertEqual(len(self.search('sourdough', OTHER_DEVICE_ID)), 2)
+        self.assertEqual(transcript_index.index_transcripts({BAKING: TRANSCRIPTS[BAKING]}), 0)
+
+    def test_deleted_analyses_are_not_searched_and_pruning_drops_the_transcript(self):
+        analysis = self.analyze(BAKING)
+        self.analyze(RUNNING)
+        response = self.client.delete(f"/api/analysis/{analysis['id']}/", HTTP_X_DEVICE_ID=DEVICE_ID)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({hit['video_id'] for hit in self.search('sourdough')}, {RUNNING})
+
+        video_content.prune_orphans()
+        self.assertEqual(indexed_rows(BAKING), 0)
+        self.assertEqual(indexed_rows(RUNNING), 2)
+
+    def test_query_without_words_finds_nothing(self):
+        self.analyze(BAKING)
+        self.assertEqual(self.search('"" *'), [])
+        response = self.client.get('/api/transcripts/search/', HTTP_X_DEVICE_ID=DEVICE_ID)
+        self.assertEqual(response.status_code, 400)
+
+
+def fake_metadata(video_id):
+    return copy.deepcopy(metadata(video_id))
+
+
+@mock.patch.object(bulk_analysis, 'run_gemini_agent_workflow', return_value=make_highlights())
+@mock.patch.object(bulk_analysis, 'get_transcript_and_metadata', side_effect=fake_metadata)
+class BulkTranscriptTests(IsolatedRuntimeMixin, TransactionTestCase):
+    def test_bulk_store_indexes_transcripts(self, *mocks):
+        checkpoint = bulk_analysis.Checkpoint(os.path.join(self.runtime_dir, 'checkpoint.jsonl'))
+        bulk_analysis.run([BAKING, RUNNING], checkpoint, workers=2, batch_size=2,
+                          fetches_per_minute=0, llm_calls_per_minute=0)
+        self.addCleanup(transcript_index.remove_videos, [BAKING, RUNNING])
+        self.assertEqual((indexed_rows(BAKING), indexed_rows(RUNNING)), (4, 2))
+
+        # A device that analyzes the video later searches the same rows
+        make_analysis(video_id=RUNNING)
+        hits = transcript_index.search_device(DEVICE_ID, 'race')
+        self.assertEqual([(hit['video_id'], hit['seconds']) for hit in hits], [(RUNNING, 40)])
@@ -0,0 +1,100 @@
+# analysis_api/timestamp_index.py
+"""
+Snapping Gemini's highlight timestamps onto real transcript positions.
+
+The model writes timestamps like "02:35" that often match no caption
+(rounded, shifted, or past the end of the video). TimestampIndex keeps the
+transcript's segment start times sorted, so each highlight is moved to the
+segment starting nearest its timestamp with one binary search, O(log n)
+however long the video, and gains the exact second for deep links
+("seconds") and the caption text it points at ("excerpt").
+"""
+import bisect
+import re
+
+EXCERPT_CHARS = 280
+
+_TIMESTAMP = re.compile(r'(\d+):(\d{1,2})(?::(\d{1,2}))?')
+
+
+def parse_timestamp(text):
+    """Seconds for "MM:SS" or "H:MM:SS" (the first one in text), or None."""
+    match = _TIMESTAMP.search(str(text))
+    if not match:
+        return None
+    first, second, third = match.groups()
+    if third is None:
+        return int(first) * 60 + int(second)
+    return (int(first) * 60 + int(second)) * 60 + int(third)
+
+
+def format_timestamp(seconds):
+    """The transcript's own "MM:SS" format (minutes may exceed 59)."""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class TimestampIndex:
+    """A transcript's segments ordered by start time."""
+
+    __slots__ = ('starts', 'texts')
+
+    def __init__(self, segments):
+        # Captions arrive in order, which sorted() handles in one pass
+        ordered = sorted(segments, key=lambda segment: segment[0])
+        self.starts = [float(start) for start, _ in ordered]
+        self.texts = [text for _, text in ordered]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def nearest(self, seconds):
+        """Position of the segment starting closest to seconds (the earlier one on a tie)."""
+        position = bisect.bisect_left(self.starts, seconds)
+        if position == 0:
+            return 0
+        if position == len(self.starts):
+            return position - 1
+        before, after = self.starts[position - 1], self.starts[position]
+        return position if after - seconds < seconds - before else position - 1
+
+    def excerpt(self, position, max_chars=EXCERPT_CHARS):
+        """Caption text from the segment at position on, cut at a word near max_chars."""
+        parts, length = [], 0
+        # Index instead of slicing: copying the rest of a long transcript is O(n)
+        for index in range(position, len(self.texts)):
+            text = ' '.join(self.texts[index].split())
+            if not text:
+                continue
+            parts.append(text)
+            length += len(text) + 1
+            if length > max_chars:
+                break
+        excerpt = ' '.join(parts)
+        if len(excerpt) > max_chars:
+            excerpt = excerpt[:max_chars].rsplit(' ', 1)[0] + '…'
+        return excerpt
+
+    def snap(self, highlights):
+        """
+        Copies of highlights moved onto their nearest segment, with "seconds"
+        and "excerpt" added. Highlights without a readable timestamp are
+        returned as they are.
+        """
+        if not self.starts:
+            return list(highlights)
+        snapped = []
+        for highlight in highlights:
+            seconds = parse_timestamp(highlight.get('timestamp', '')) if isinstance(highlight, dict) else None
+            if seconds is None:
+                snapped.append(highlight)
+                continue
+            position = self.nearest(seconds)
+            start = int(self.starts[position])
+            snapped.append({
+                **highlight,
+                'timestamp': format_timestamp(start),
+                'seconds': start,
+                'excerpt': self.excerpt(position),
+            })
+        return snapped
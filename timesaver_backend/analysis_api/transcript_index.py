@@ -0,0 +1,164 @@
+# analysis_api/transcript_index.py
+"""
+Full-text search over video transcripts, backed by an SQLite FTS5 table.
+
+Each caption segment is one row holding its text and start time, so a hit
+says where in the video something was said. Transcripts belong to the
+video rather than to a device or an analysis: a video is indexed once, the
+first time an analysis of it lands with captions, and every device that
+analyzed it searches the same rows. A search is scoped to a device by
+intersecting the query with the video tokens of that device's analyses,
+so it costs what the matches in those videos cost, however many other
+transcripts the index holds. Hits are ranked with bm25, best first; that
+scores every match in the device's videos, not just the first page.
+"""
+import hashlib
+import re
+
+from django.db import connection, transaction
+
+from .models import VideoAnalysis
+from .timestamp_index import format_timestamp
+
+FTS_TABLE = 'analysis_api_transcript_fts'
+
+# The table itself is created by migration 0010
+_INSERT_SQL = f"INSERT INTO {FTS_TABLE} (text, video_token, video_id, start) VALUES (%s, %s, %s, %s)"
+
+# Column weights for bm25: text, video token
+_BM25_WEIGHTS = '1.0, 0.0'
+
+# A quoted phrase (optionally followed by *) or a bare word
+_QUERY_PART = re.compile(r'"([^"]*)"(\*?)|(\S+)')
+
+_fts_available = None
+
+
+def is_available() -> bool:
+    """True if the default database has the transcript FTS table (SQLite with FTS5)."""
+    global _fts_available
+    if _fts_available is None:
+        if connection.vendor != 'sqlite':
+            _fts_available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def video_token(video_id: str) -> str:
+    """Single alphanumeric token identifying a video inside the index."""
+    return 'v' + hashlib.sha1(video_id.encode()).hexdigest()[:20]
+
+
+def _tokens_query(video_ids) -> str:
+    return ' OR '.join(f'"{video_token(video_id)}"' for video_id in video_ids)
+
+
+def _is_indexed(cursor, video_id) -> bool:
+    cursor.execute(
+        f"SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT 1",
+        [f'video_token : "{video_token(video_id)}"'],
+    )
+    return cursor.fetchone() is not None
+
+
+def index_transcripts(transcripts):
+    """
+    Index {video_id: [(start seconds, text), ...]} for the videos not
+    indexed yet; a video's transcript is only stored once. Returns the
+    number of videos added.
+    """
+    if not is_available():
+        return 0
+    added = 0
+    # The check and the insert share a transaction, so concurrent
+    # analyses of one video can't index it twice
+    with transaction.atomic(), connection.cursor() as cursor:
+        for video_id, segments in transcripts.items():
+            if not segments or _is_indexed(cursor, video_id):
+                continue
+            token = video_token(video_id)
+            cursor.executemany(_INSERT_SQL, [
+                (text, token, video_id, float(start)) for start, text in segments if text and text.strip()
+            ])
+            added += 1
+    return added
+
+
+def remove_videos(video_ids):
+    """Drop the transcripts of video_ids from the index."""
+    video_ids = list(video_ids)
+    if not is_available() or not video_ids:
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(video_ids), 500):
+            # Found through the token index; video_id is an unindexed column
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                f"(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+                [f'video_token : ({_tokens_query(video_ids[start:start + 500])})'],
+            )
+
+
+def build_match_query(query: str, video_ids) -> str:
+    """
+    Turn free text into an FTS5 query over the transcripts of video_ids.
+    "Quoted words" match as a phrase, other words must all appear, and a
+    word (or phrase) ending in * matches as a prefix, as does the last bare
+    word (search-as-you-type). User input never reaches FTS5 syntax
+    unquoted. Returns '' if nothing searchable is left.
+    """
+    parts = list(_QUERY_PART.finditer(query))
+    terms = []
+    for position, part in enumerate(parts):
+        phrase, phrase_prefix, word = part.groups()
+        if word is not None:
+            words = re.findall(r'\w+', word.lower())
+            prefix = word.endswith('*') or position == len(parts) - 1
+        else:
+            words = re.findall(r'\w+', phrase.lower())
+            prefix = bool(phrase_prefix)
+        if words:
+            terms.append('"' + ' '.join(words) + '"' + ('*' if prefix else ''))
+    if not terms or not video_ids:
+        return ''
+    return f"text : ({' AND '.join(terms)}) AND video_token : ({_tokens_query(video_ids)})"
+
+
+def search(video_ids, query, limit=50):
+    """
+    Segments of the transcripts of video_ids matching query, best match
+    first (ties in video and time order). Each hit has video_id, seconds,
+    timestamp and a snippet with the matched words in [brackets].
+    """
+    if not is_available():
+        return []
+    match_query = build_match_query(query, video_ids)
+    if not match_query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT video_id, start, snippet({FTS_TABLE}, 0, '[', ']', '…', 16) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {_BM25_WEIGHTS}), rowid LIMIT %s",
+            [match_query, limit],
+        )
+        rows = cursor.fetchall()
+    return [
+        {'video_id': video_id, 'seconds': int(start), 'timestamp': format_timestamp(start), 'snippet': snippet}
+        for video_id, start, snippet in rows
+    ]
+
+
+def search_device(device_id, query, video_id=None, limit=50):
+    """search() over a device's analyses (or just its analysis of video_id); hits also carry analysis_id."""
+    analyses = VideoAnalysis.objects.filter(device_id=device_id)
+    if video_id is not None:
+        analyses = analyses.filter(video_id=video_id)
+    analysis_ids = dict(analyses.values_list('video_id', 'id'))
+    hits = search(list(analysis_ids), query, limit)
+    for hit in hits:
+        hit['analysis_id'] = analysis_ids[hit['video_id']]
+    return hits
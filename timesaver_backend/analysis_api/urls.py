@@ -13,16 +13,27 @@ urlpatterns = [
     # New database-powered endpoints
     path('history/', views.get_analysis_history, name='get_history'),
     path('search/', views.search_analyses, name='search_analyses'),
-    path('analysis/<int:analysis_id>/', views.delete_analysis, name='delete_analysis'),
+    path('transcripts/search/', views.search_transcripts, name='search_transcripts'),
+    path('analysis/<int:analysis_id>/', views.analysis_detail, name='analysis_detail'),
     path('stats/', views.get_stats, name='get_stats'),
+    path('sync/', views.sync_changes, name='sync_changes'),
+    path('export/', views.export_history, name='export_history'),
+    path('import/', views.import_history, name='import_history'),
     
     # Bookmark endpoints
     path('bookmark/', views.toggle_bookmark, name='toggle_bookmark'),
     path('bookmarks/', views.get_bookmarks, name='get_bookmarks'),
     path('bookmark/<int:bookmark_id>/', views.remove_bookmark, name='remove_bookmark'),
     path('bookmark/status/<int:analysis_id>/', views.check_bookmark_status, name='check_bookmark_status'),
+    path('bookmarks/status/', views.bulk_bookmark_status, name='bulk_bookmark_status'),
+    path('bookmarks/bulk/', views.bulk_bookmarks, name='bulk_bookmarks'),
     
     # Development/testing endpoints
     path('test/', views.mobile_connection_test, name='mobile_test'),
     path('debug/', views.debug_test, name='debug_test'),
+    
+    # Observability endpoints
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('admin/profiles/', views.list_profiles_view, name='list_profiles'),
+    path('admin/profiles/<str:profile_id>/', views.profile_detail_view, name='profile_detail'),
 ]
\ No newline at end of file
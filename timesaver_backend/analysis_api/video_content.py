@@ -0,0 +1,232 @@
+# analysis_api/video_content.py
+"""
+Shared analysis content.
+
+The title, duration, thumbnail and highlights of an analysis live in a
+VideoContent row that every device's VideoAnalysis references, instead of
+being copied into one row per device. Rows are identified by a hash of
+their content, so storing a result that already exists reuses the row,
+and a video already analyzed with the current model and prompt version is
+reused for other devices instead of being analyzed again. Content rows
+are never modified; a row left without references stays available for
+reuse until prune_orphans() removes it (and the video's indexed
+transcript, once no content of the video is left).
+
+Payloads of content nobody has read for COLD_STORAGE['AFTER_DAYS'] days
+are moved into a compressed column by compact_cold_storage() (see
+cold_storage.py) and moved back once they are read again. Reads are
+stamped by mark_read(), at most once a day per row.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, TextField
+from django.db.models.functions import Cast, Coalesce, Length
+from django.utils import timezone
+
+from . import transcript_index
+from .models import VideoContent
+
+
+def content_hash(video_id, title, duration, thumbnail_url, highlights, analysis_summary='',
+                 model_name='', prompt_version='') -> str:
+    """Stable digest of a result; identical results hash the same."""
+    payload = json.dumps(
+        [video_id, title, duration, thumbnail_url, highlights, analysis_summary, model_name, prompt_version],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def store(video_id, title, duration, thumbnail_url, highlights, analysis_summary='',
+          model_name='', prompt_version=''):
+    """The content row holding this result, created unless an identical one exists."""
+    digest = content_hash(
+        video_id, title, duration, thumbnail_url, highlights, analysis_summary, model_name, prompt_version
+    )
+    content, _ = VideoContent.objects.get_or_create(content_hash=digest, defaults={
+        'video_id': video_id,
+        'title': title,
+        'duration': duration,
+        'thumbnail_url': thumbnail_url,
+        'highlights_data': highlights,
+        'summary_data': analysis_summary,
+        'model_name': model_name,
+        'prompt_version': prompt_version,
+    })
+    return content
+
+
+def store_many(results):
+    """
+    store() for many results at once: one lookup for the existing rows and
+    one insert for the rest. results are dicts of store()'s arguments; the
+    content rows are returned in the same order.
+    """
+    digests = [content_hash(**result) for result in results]
+    found = VideoContent.objects.in_bulk(set(digests), field_name='content_hash')
+    missing = {}
+    for digest, result in zip(digests, results):
+        if digest not in found and digest not in missing:
+            missing[digest] = VideoContent(
+                content_hash=digest,
+                video_id=result['video_id'],
+                title=result['title'],
+                duration=result['duration'],
+                thumbnail_url=result['thumbnail_url'],
+                highlights_data=result['highlights'],
+                summary_data=result.get('analysis_summary', ''),
+                model_name=result.get('model_name', ''),
+                prompt_version=result.get('prompt_version', ''),
+            )
+    if missing:
+        # ignore_conflicts (another writer may insert the same content
+        # meanwhile) leaves the ids unset; only they are read back
+        VideoContent.objects.bulk_create(missing.values(), ignore_conflicts=True)
+        ids = VideoContent.objects.filter(content_hash__in=list(missing)).values_list('content_hash', 'id')
+        for digest, content_id in ids.iterator(chunk_size=2000):
+            missing[digest].id = content_id
+            missing[digest]._state.adding = False
+        found.update(missing)
+    return [found[digest] for digest in digests]
+
+
+def reusable(video_id, model_name, prompt_version):
+    """
+    Newest content for the video produced by this model and prompt version,
+    or None. Results built on stand-in data are stored without a model name
+    (see analysis_core.unusable_reason), so they are never returned.
+    """
+    if not model_name:
+        return None
+    return (
+        VideoContent.objects.filter(video_id=video_id, model_name=model_name, prompt_version=prompt_version)
+        .order_by('-id').first()
+    )
+
+
+def storage_report():
+    """
+    Content rows vs. the per-device copies they replace. Sizes are the
+    stored length of the shared columns (characters, about bytes; cold
+    rows count their compressed payload).
+    """
+    size = (
+        Length('title') + Length('duration') + Length('thumbnail_url') + Length('summary_data')
+        + Coalesce(Length(Cast('highlights_data', TextField())), 0) + Coalesce(Length('cold_payload'), 0)
+    )
+    rows = VideoContent.objects.order_by().annotate(references=Count('analyses'), size=size)
+
+    report = {
+        'content_rows': 0, 'references': 0, 'orphaned_rows': 0,
+        'cold_rows': VideoContent.objects.filter(cold_payload__isnull=False).count(),
+        'stored_bytes': 0, 'undeduplicated_bytes': 0,
+    }
+    for references, row_size in rows.values_list('references', 'size').iterator(chunk_size=2000):
+        report['content_rows'] += 1
+        report['references'] += references
+        report['orphaned_rows'] += references == 0
+        report['stored_bytes'] += row_size or 0
+        report['undeduplicated_bytes'] += (row_size or 0) * references
+    report['saved_bytes'] = report['undeduplicated_bytes'] - report['stored_bytes']
+    return report
+
+
+def prune_orphans(keep_reusable=None):
+    """
+    Delete content no analysis references any more. keep_reusable, a
+    (model_name, prompt_version) pair, spares content reusable() would
+    still hand out (e.g. pre-warmed by bulk_analysis). Returns the number deleted.
+    """
+    orphans = VideoContent.objects.filter(analyses__isnull=True)
+    if keep_reusable is not None:
+        model_name, prompt_version = keep_reusable
+        orphans = orphans.exclude(model_name=model_name, prompt_version=prompt_version)
+    video_ids = list(set(orphans.values_list('video_id', flat=True)))
+    deleted, _ = orphans.delete()
+    # Transcripts belong to the video; drop those with no content left
+    remaining = set()
+    for start in range(0, len(video_ids), 500):
+        remaining.update(VideoContent.objects.filter(
+            video_id__in=video_ids[start:start + 500],
+        ).values_list('video_id', flat=True))
+    transcript_index.remove_videos([video_id for video_id in video_ids if video_id not in remaining])
+    return deleted
+
+
+# --- Cold storage ---
+
+READ_STAMP_INTERVAL = timezone.timedelta(days=1)
+
+
+def _cold_config():
+    config = getattr(settings, 'COLD_STORAGE', {})
+    return {
+        'after_days': config.get('AFTER_DAYS', 30),
+        'batch_size': config.get('BATCH_SIZE', 200),
+    }
+
+
+def mark_read(analyses):
+    """
+    Stamp the content of analyses being served as read. Rows stamped within
+    READ_STAMP_INTERVAL are skipped, so this is usually free. The analyses
+    must have their content loaded (select_related).
+    """
+    now = timezone.now()
+    stale_before = now - READ_STAMP_INTERVAL
+    content_ids = {
+        analysis.content_id for analysis in analyses
+        if analysis.content.last_read_at is None or analysis.content.last_read_at < stale_before
+    }
+    if content_ids:
+        VideoContent.objects.filter(id__in=content_ids).update(last_read_at=now)
+
+
+def _in_batches(queryset, change, batch_size, max_batches, pause):
+    """Apply change() to queryset's rows in id order, one transaction per batch."""
+    changed = 0
+    last_id = 0
+    batches = 0
+    queryset = queryset.only('id', 'highlights_data', 'summary_data', 'cold_payload').order_by('id')
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for content in batch:
+                change(content)
+            VideoContent.objects.bulk_update(batch, ['highlights_data', 'summary_data', 'cold_payload'])
+        changed += len(batch)
+        last_id = batch[-1].id
+        batches += 1
+        if pause:
+            # Let request threads take the write lock between batches
+            time.sleep(pause)
+    return changed
+
+
+def compact_cold_storage(after_days=None, batch_size=None, max_batches=None, pause=0.0):
+    """
+    Compress the payload of content not read for after_days days, and
+    decompress cold content that has been read since. Works in batches of
+    batch_size rows (at most max_batches of each kind). Returns (frozen, thawed).
+    """
+    config = _cold_config()
+    after_days = config['after_days'] if after_days is None else after_days
+    batch_size = batch_size or config['batch_size']
+    cutoff = timezone.now() - timezone.timedelta(days=after_days)
+
+    idle = Q(last_read_at__lt=cutoff) | Q(last_read_at__isnull=True, created_at__lt=cutoff)
+    frozen = _in_batches(
+        VideoContent.objects.filter(idle, cold_payload__isnull=True),
+        VideoContent.freeze, batch_size, max_batches, pause,
+    )
+    thawed = _in_batches(
+        VideoContent.objects.filter(cold_payload__isnull=False, last_read_at__gte=cutoff),
+        VideoContent.thaw, batch_size, max_batches, pause,
+    )
+    return frozen, thawed
@@ -5,19 +5,26 @@ from rest_framework import status
 import json
 import logging
 import time
+from django.db import transaction
 from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 
 # Import the updated core logic
-from .analysis_core import orchestrate_analysis, extract_youtube_id
+from .analysis_core import orchestrate_analysis, extract_youtube_id, GEMINI_MODEL, PROMPT_VERSION
 from .simple_progress import create_job, get_job_progress, cleanup_old_jobs
-from .models import VideoAnalysis, UserSession, VideoBookmark
+from .models import VideoAnalysis, UserSession, VideoBookmark, ChangeLogEntry
 from .decorators import add_rate_limit_headers
+from . import backup, conditional, device_stats, embeddings, fieldsets, fragments, metrics, pagination, profiling, quota, search_index, sync, transcript_index, video_content
+from . import log_events as events
+from .log_events import log_event
 
 logger = logging.getLogger(__name__)
 
 @api_view(['POST'])
 @add_rate_limit_headers
+@metrics.timed_view
+@profiling.profile_request
 def analyze_video(request):
     """
     Receives a YouTube URL and initiates the AI agent analysis using Gemini.
@@ -41,56 +48,91 @@ def analyze_video(request):
         
         # Check if this device already analyzed this video
         try:
-            existing_analysis = VideoAnalysis.objects.get(
-                video_id=video_id, 
-                device_id=device_id
-            )
-            logger.info(f"Returning cached analysis for device {device_id[:8]}... video: {video_id}")
-            
-            # Add agent status for UI compatibility
-            result_data = existing_analysis.to_dict()
-            result_data['agents'] = [
-                {"name": "The Teacher", "status": "Completed", "progress": 1.0},
-                {"name": "The Analyst", "status": "Completed", "progress": 1.0},
-                {"name": "The Explorer", "status": "Completed", "progress": 1.0},
-            ]
-            
-            return Response(result_data, status=status.HTTP_200_OK)
+            with metrics.stage_timer('cache_lookup'):
+                existing_analysis = VideoAnalysis.objects.select_related('content').get(
+                    video_id=video_id, 
+                    device_id=device_id
+                )
+            metrics.inc(metrics.CACHE_HITS, kind='analysis')
+            log_event(logger, events.ANALYSIS_CACHE_HIT, device=device_id[:8], video_id=video_id)
+            return _cached_analysis_response(request, device_id, existing_analysis)
             
         except VideoAnalysis.DoesNotExist:
             # Video not analyzed by this device before, proceed with new analysis
-            logger.info(f"Starting new analysis for device {device_id[:8]}... video: {video_id}")
             pass
             
     except Exception as e:
-        logger.error(f"Error extracting video ID from {youtube_url}: {str(e)}")
+        log_event(logger, events.INVALID_URL, level=logging.WARNING, url=youtube_url, error=e)
         return Response({"error": "Invalid YouTube URL format."}, status=status.HTTP_400_BAD_REQUEST)
     
+    # Another device may have analyzed this video with the current model and
+    # prompt; reference that result instead of running the analysis again
+    try:
+        with metrics.stage_timer('cache_lookup'):
+            shared_content = video_content.reusable(video_id, GEMINI_MODEL, PROMPT_VERSION)
+        if shared_content is not None:
+            with metrics.stage_timer('db_save'):
+                analysis = VideoAnalysis.objects.create(
+                    device_id=device_id,
+                    video_url=youtube_url,
+                    video_id=video_id,
+                    content=shared_content,
+                    analysis_status='completed'
+                )
+            metrics.inc(metrics.CACHE_HITS, kind='shared_content')
+            log_event(logger, events.ANALYSIS_CACHE_HIT, device=device_id[:8], video_id=video_id, shared=True)
+            return _cached_analysis_response(request, device_id, analysis)
+    except Exception as e:
+        # Fall through to a fresh analysis
+        log_event(logger, events.ANALYSIS_SAVE_FAILED, level=logging.ERROR, device=device_id[:8], error=e)
+    
     # 3. Run New Analysis
     try:
-        logger.info(f"Starting Gemini analysis for URL: {youtube_url}")
+        log_event(logger, events.ANALYSIS_STARTED, device=device_id[:8], video_id=video_id)
         
-        result_data = orchestrate_analysis(youtube_url)
+        # Charge the device for the fetches and tokens this analysis used,
+        # whether or not it succeeded
+        with quota.metered() as work:
+            try:
+                result_data = orchestrate_analysis(youtube_url, with_segments=True)
+            finally:
+                quota.attach_budget(request, *quota.charge(device_id, work.units()))
+        
+        segments = result_data.pop('segments')
+        unusable_reason = result_data.pop('unusable_reason')
         
         # 4. Save analysis to database with device association
         try:
-            analysis = VideoAnalysis.objects.create(
-                device_id=device_id,
-                video_url=youtube_url,
-                video_id=video_id,
-                title=result_data['title'],
-                duration=result_data['duration'],
-                thumbnail_url=result_data['thumbnailUrl'],
-                highlights=result_data['highlights'],
-                analysis_status='completed'
-            )
-            logger.info(f"Saved analysis to database for device {device_id[:8]}... ID: {analysis.id}")
+            with metrics.stage_timer('db_save'):
+                # Results built on stand-in data stay with this device: an
+                # untagged row is never handed out by video_content.reusable()
+                content = video_content.store(
+                    video_id,
+                    title=result_data['title'],
+                    duration=result_data['duration'],
+                    thumbnail_url=result_data['thumbnailUrl'],
+                    highlights=result_data['highlights'],
+                    model_name='' if unusable_reason else GEMINI_MODEL,
+                    prompt_version='' if unusable_reason else PROMPT_VERSION,
+                )
+                # Make the transcript searchable before the analysis exists,
+                # so no search ETag is issued for the device without it
+                # (only the first analysis of a video stores it)
+                transcript_index.index_transcripts({video_id: segments})
+                analysis = VideoAnalysis.objects.create(
+                    device_id=device_id,
+                    video_url=youtube_url,
+                    video_id=video_id,
+                    content=content,
+                    analysis_status='completed'
+                )
+            log_event(logger, events.ANALYSIS_SAVED, device=device_id[:8], analysis_id=analysis.id, shared=not unusable_reason)
             
             # Add the database ID to the response data for bookmark functionality
             result_data['id'] = analysis.id
             
         except Exception as db_error:
-            logger.error(f"Failed to save analysis to database: {str(db_error)}")
+            log_event(logger, events.ANALYSIS_SAVE_FAILED, level=logging.ERROR, device=device_id[:8], error=db_error)
             # Continue anyway - return results even if DB save fails
         
         # Add agent status for the Flutter UI's AgentCard progress display
@@ -103,7 +145,7 @@ def analyze_video(request):
         return Response(result_data, status=status.HTTP_200_OK)
 
     except Exception as e:
-        logger.error(f"Full analysis failed for {youtube_url}: {str(e)}")
+        log_event(logger, events.ANALYSIS_FAILED, level=logging.ERROR, url=youtube_url, error=e)
         # Check if the error is due to a missing API key or an invalid request
         error_message = "Failed to complete AI analysis. Ensure GEMINI_API_KEY is set and the URL is valid."
         if "API_KEY" in str(e) or "Authentication" in str(e):
@@ -114,7 +156,25 @@ def analyze_video(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def _cached_analysis_response(request, device_id, analysis):
+    """Answer /api/analyze/ from a stored analysis (charged as a cache hit)"""
+    cache_hit_units = quota.cache_hit_units()
+    if cache_hit_units:
+        quota.attach_budget(request, *quota.charge(device_id, cache_hit_units))
+    video_content.mark_read([analysis])
+    
+    # Add agent status for UI compatibility
+    result_data = fragments.render_analysis(analysis, extra={'agents': [
+        {"name": "The Teacher", "status": "Completed", "progress": 1.0},
+        {"name": "The Analyst", "status": "Completed", "progress": 1.0},
+        {"name": "The Explorer", "status": "Completed", "progress": 1.0},
+    ]})
+    
+    return Response(result_data, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
+@metrics.timed_view
+@profiling.profile_request
 def start_analysis_view(request):
     """
     Start async analysis and return job ID for progress tracking.
@@ -135,7 +195,7 @@ def start_analysis_view(request):
         # Start the analysis
         job_id = create_job(youtube_url)
         
-        logger.info(f"Started async analysis with job ID: {job_id}")
+        log_event(logger, events.JOB_CREATED, job_id=job_id)
         
         return Response({
             "job_id": job_id,
@@ -144,13 +204,14 @@ def start_analysis_view(request):
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        logger.error(f"Failed to start analysis for {youtube_url}: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='start_analysis', url=youtube_url, error=e)
         return Response(
             {"error": "Failed to start analysis", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 @api_view(['GET'])
+@metrics.timed_view
 def get_progress(request, job_id):
     """
     Get current progress for a specific job.
@@ -158,13 +219,14 @@ def get_progress(request, job_id):
     try:
         progress_data = get_job_progress(job_id)
         
-        if 'error' in progress_data:
-            return Response(progress_data, status=status.HTTP_404_NOT_FOUND)
+        # Every job has an 'error' key (None until it fails), so check for the job itself
+        if progress_data is None:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
         
         return Response(progress_data, status=status.HTTP_200_OK)
         
     except Exception as e:
-        logger.error(f"Failed to get progress for job {job_id}: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='get_progress', job_id=job_id, error=e)
         return Response(
             {"error": "Failed to get progress", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -193,37 +255,110 @@ def debug_test(request):
         "headers": dict(request.headers)
     })
 
+def metrics_view(request):
+    """Prometheus scrape endpoint aggregating stage timers across all workers (bearer token required)"""
+    if not metrics.is_authorized_scrape(request):
+        return HttpResponse('Metrics token required\n', status=403, content_type='text/plain; charset=utf-8')
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+@api_view(['GET'])
+def list_profiles_view(request):
+    """List stored request profiles (admin token required)"""
+    if not profiling.is_admin_request(request):
+        return Response({"error": "Admin token required"}, status=status.HTTP_403_FORBIDDEN)
+    
+    profiles = profiling.list_profiles()
+    return Response({
+        'profiles': profiles,
+        'total_count': len(profiles),
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+def profile_detail_view(request, profile_id):
+    """Return one profile summary, or the raw .prof dump with ?download=1 (admin token required)"""
+    if not profiling.is_admin_request(request):
+        return Response({"error": "Admin token required"}, status=status.HTTP_403_FORBIDDEN)
+    
+    if request.GET.get('download'):
+        path = profiling.profile_path(profile_id)
+        if path is None:
+            return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof')
+    
+    summary = profiling.load_profile(profile_id)
+    if summary is None:
+        return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(summary, status=status.HTTP_200_OK)
+
 # ===== NEW DATABASE-POWERED ENDPOINTS =====
 
 @api_view(['GET'])
 @add_rate_limit_headers
+@metrics.timed_view
+@profiling.profile_request
+@conditional.etag_on_device_version
 def get_analysis_history(request):
-    """Get analysis history for the authenticated device"""
+    """
+    Get analysis history for the authenticated device, newest first.
+    Pages with ?cursor= (keyset, returned as next_cursor) or the legacy
+    ?offset=. ?fields= picks the keys per analysis; ?view=summary is the
+    list-screen fieldset without highlights.
+    """
     try:
         device_id = request.device_id  # From middleware
         
         # Get query parameters
-        limit = int(request.GET.get('limit', 20))
-        offset = int(request.GET.get('offset', 0))
-        
-        # Get analyses for this device only
-        analyses = VideoAnalysis.objects.filter(device_id=device_id)[offset:offset + limit]
-        total_count = VideoAnalysis.objects.filter(device_id=device_id).count()
+        cursor = request.GET.get('cursor')
+        try:
+            limit = pagination.page_size(request.GET.get('limit'))
+            offset = pagination.page_offset(request.GET['offset']) if 'offset' in request.GET else None
+            fields = fieldsets.parse_fields(request.GET.get('fields'))
+        except pagination.InvalidPageParam as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except fieldsets.InvalidFields as e:
+            return Response(fieldsets.error_payload(e), status=status.HTTP_400_BAD_REQUEST)
+        if fields is None and request.GET.get('view') == 'summary':
+            fields = fieldsets.SUMMARY_FIELDS
+        
+        # Get analyses for this device only, loading just the requested
+        # columns plus the pagination key
+        analyses = VideoAnalysis.objects.filter(device_id=device_id).select_related('content')
+        if fields:
+            analyses = analyses.only(*fieldsets.model_fields(fields, extra=['created_at']))
+        
+        # Total comes from the maintained per-device stats instead of a COUNT
+        total_count = device_stats.for_request(request).analysis_count
+        
+        if offset is not None and not cursor:
+            page = list(analyses[offset:offset + limit])
+            has_more = offset + limit < total_count
+            next_cursor = None
+        else:
+            try:
+                page, next_cursor = pagination.keyset_page(analyses, cursor, limit)
+            except pagination.InvalidCursor:
+                return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+            has_more = next_cursor is not None
         
-        # Convert to list for JSON response
-        analyses_data = [analysis.to_dict() for analysis in analyses]
+        # Convert to list for JSON response (cached pre-encoded fragments)
+        analyses_data = fragments.render_analyses(page, fields)
+        video_content.mark_read(page)
         
-        logger.info(f"Returned {len(analyses_data)} analyses for device {device_id[:8]}...")
+        log_event(logger, events.HISTORY_SERVED, device=device_id[:8], count=len(analyses_data))
         
         return Response({
             'analyses': analyses_data,
             'total_count': total_count,
-            'has_more': offset + limit < total_count,
+            'has_more': has_more,
+            'next_cursor': next_cursor,
             'device_id': device_id[:8] + '...'  # For debugging
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        logger.error(f"Failed to get analysis history: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='get_analysis_history', error=e)
         return Response(
             {"error": "Failed to retrieve analysis history", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -231,52 +366,147 @@ def get_analysis_history(request):
 
 @api_view(['GET'])
 @add_rate_limit_headers
+@metrics.timed_view
+@profiling.profile_request
+@conditional.etag_on_device_version
 def search_analyses(request):
-    """Search through analysis history for the authenticated device"""
+    """
+    Search through analysis history for the authenticated device.
+    ?mode=semantic ranks by meaning (local embeddings) instead of keywords;
+    if NumPy is missing it falls back to keyword search, reported in 'mode'
+    and counted in the fallbacks metric.
+    """
     try:
         device_id = request.device_id  # From middleware
         query = request.GET.get('q', '').strip()
         if not query:
             return Response({"error": "Search query is required"}, status=status.HTTP_400_BAD_REQUEST)
+        mode = request.GET.get('mode', 'keyword')
+        if mode not in ('keyword', 'semantic'):
+            return Response({"error": "mode must be 'keyword' or 'semantic'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = fieldsets.parse_fields(request.GET.get('fields'))
+        except fieldsets.InvalidFields as e:
+            return Response(fieldsets.error_payload(e), status=status.HTTP_400_BAD_REQUEST)
+        
+        analyses = VideoAnalysis.objects.select_related('content')
+        if fields:
+            analyses = analyses.only(*fieldsets.model_fields(fields))
+        if mode == 'semantic' and embeddings.is_available():
+            analyses, matches = embeddings.search_analyses(
+                analyses, device_id, query, device_stats.for_request(request).analysis_count, limit=50
+            )
+        else:
+            if mode == 'semantic':
+                metrics.inc(metrics.FALLBACKS, kind='semantic_search')
+            # Ranked full-text search over title and highlights for this device only
+            mode = 'keyword'
+            analyses, matches = search_index.search_analyses(
+                analyses, device_id, query, limit=50  # Limit to 50 results
+            )
         
-        # Search in title and highlights content for this device only
-        analyses = VideoAnalysis.objects.filter(
-            device_id=device_id
-        ).filter(
-            Q(title__icontains=query) |
-            Q(highlights__icontains=query)
-        ).order_by('-created_at')[:50]  # Limit to 50 results
-        
-        # Convert to list for JSON response
-        results = [analysis.to_dict() for analysis in analyses]
+        # Convert to list for JSON response, with the highlight that matched
+        results = fragments.render_analyses(analyses, fields, extras=[
+            {'match': matches[analysis.id]} if analysis.id in matches else None
+            for analysis in analyses
+        ])
+        video_content.mark_read(analyses)
         
-        logger.info(f"Search '{query}' returned {len(results)} results for device {device_id[:8]}...")
+        log_event(logger, events.SEARCH_SERVED, device=device_id[:8], count=len(results), mode=mode)
         
         return Response({
             'results': results,
             'total_count': len(results),
             'search_query': query,
+            'mode': mode,
             'device_id': device_id[:8] + '...'  # For debugging
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        logger.error(f"Search failed for query '{request.GET.get('q', '')}': {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='search_analyses', error=e)
         return Response(
             {"error": "Search failed", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-@api_view(['DELETE'])
+@api_view(['GET'])
+@add_rate_limit_headers
+@metrics.timed_view
+@conditional.etag_on_device_version
+def search_transcripts(request):
+    """
+    Find where words were said in the transcripts of the device's analyses
+    (?video_id= for one of them). "Quoted words" match as a phrase and a
+    trailing * as a prefix. Hits are time-coded segments, best match first.
+    """
+    try:
+        device_id = request.device_id  # From middleware
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return Response({"error": "Search query is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = pagination.page_size(request.GET.get('limit'), default=50)
+        except pagination.InvalidPageParam as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        hits = transcript_index.search_device(device_id, query, video_id=request.GET.get('video_id'), limit=limit)
+        titles = dict(
+            VideoAnalysis.objects.filter(id__in={hit['analysis_id'] for hit in hits}).values_list('id', 'content__title')
+        )
+        for hit in hits:
+            hit['title'] = titles.get(hit['analysis_id'])
+        
+        log_event(logger, events.TRANSCRIPT_SEARCH_SERVED, device=device_id[:8], count=len(hits))
+        
+        return Response({
+            'results': hits,
+            'total_count': len(hits),
+            'search_query': query,
+            'device_id': device_id[:8] + '...'  # For debugging
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='search_transcripts', error=e)
+        return Response(
+            {"error": "Transcript search failed", "details": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET', 'DELETE'])
+@add_rate_limit_headers
+@metrics.timed_view
+def analysis_detail(request, analysis_id):
+    """Get the full analysis, or delete it (only if owned by authenticated device)"""
+    if request.method == 'DELETE':
+        return delete_analysis(request, analysis_id)
+    
+    try:
+        device_id = request.device_id  # From middleware
+        analysis = VideoAnalysis.objects.select_related('content').get(id=analysis_id, device_id=device_id)
+        video_content.mark_read([analysis])
+        return Response(fragments.render_analysis(analysis), status=status.HTTP_200_OK)
+        
+    except VideoAnalysis.DoesNotExist:
+        return Response({
+            "error": "Analysis not found or not owned by this device"
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='analysis_detail', analysis_id=analysis_id, error=e)
+        return Response(
+            {"error": "Failed to retrieve analysis", "details": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 def delete_analysis(request, analysis_id):
     """Delete a specific analysis (only if owned by authenticated device)"""
     try:
         device_id = request.device_id  # From middleware
         
         # Only allow deletion of analyses owned by this device
-        analysis = VideoAnalysis.objects.get(id=analysis_id, device_id=device_id)
+        analysis = VideoAnalysis.objects.select_related('content').get(id=analysis_id, device_id=device_id)
         analysis.delete()
         
-        logger.info(f"Deleted analysis {analysis_id} for device {device_id[:8]}...")
+        log_event(logger, events.ANALYSIS_DELETED, device=device_id[:8], analysis_id=analysis_id)
         return Response({"message": "Analysis deleted successfully"}, status=status.HTTP_200_OK)
         
     except VideoAnalysis.DoesNotExist:
@@ -284,45 +514,40 @@ def delete_analysis(request, analysis_id):
             "error": "Analysis not found or not owned by this device"
         }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        logger.error(f"Failed to delete analysis {analysis_id}: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='delete_analysis', analysis_id=analysis_id, error=e)
         return Response(
             {"error": "Failed to delete analysis", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 @api_view(['GET'])
+@metrics.timed_view
+@conditional.etag_on_device_version
 def get_stats(request):
     """Get comprehensive analytics for the authenticated device"""
     try:
         device_id = request.device_id  # From middleware
         
-        # Get stats for this device only
-        total_analyses = VideoAnalysis.objects.filter(device_id=device_id).count()
-        recent_analyses = VideoAnalysis.objects.filter(
-            device_id=device_id,
-            created_at__gte=timezone.now() - timezone.timedelta(days=7)
-        ).count()
+        # Single primary-key read of the maintained aggregates
+        stats = device_stats.for_request(request)
+        total_analyses = stats.analysis_count
+        total_highlights = stats.highlight_count
+        recent_analyses = device_stats.recent_count(stats)
         
-        # Calculate total highlights across all analyses for this device
-        total_highlights = 0
-        device_analyses = VideoAnalysis.objects.filter(device_id=device_id)
-        for analysis in device_analyses:
-            if isinstance(analysis.highlights, list):
-                total_highlights += len(analysis.highlights)
-        
-        logger.info(f"Stats for device {device_id[:8]}...: {total_analyses} analyses, {total_highlights} highlights")
+        log_event(logger, events.STATS_SERVED, device=device_id[:8], analyses=total_analyses, highlights=total_highlights)
         
         return Response({
             'total_analyses': total_analyses,
             'recent_analyses': recent_analyses,
             'total_highlights': total_highlights,
             'this_week': recent_analyses,
+            'total_minutes_analyzed': stats.total_seconds // 60,
             'database_status': 'healthy',
             'device_id': device_id[:8] + '...'  # For debugging
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        logger.error(f"Failed to get stats: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='get_stats', error=e)
         return Response(
             {"error": "Failed to retrieve statistics", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -330,6 +555,7 @@ def get_stats(request):
 
 @api_view(['POST'])
 @add_rate_limit_headers
+@metrics.timed_view
 def toggle_bookmark(request):
     """Add or remove a bookmark for a video analysis"""
     try:
@@ -357,7 +583,7 @@ def toggle_bookmark(request):
         
         if created:
             # Bookmark was created
-            logger.info(f"Created bookmark for device {device_id[:8]}... analysis: {analysis_id}")
+            log_event(logger, events.BOOKMARK_ADDED, device=device_id[:8], analysis_id=analysis_id)
             return Response({
                 "message": "Bookmark added successfully",
                 "bookmarked": True,
@@ -366,7 +592,7 @@ def toggle_bookmark(request):
         else:
             # Bookmark already exists, remove it (toggle behavior)
             bookmark.delete()
-            logger.info(f"Removed bookmark for device {device_id[:8]}... analysis: {analysis_id}")
+            log_event(logger, events.BOOKMARK_REMOVED, device=device_id[:8], analysis_id=analysis_id)
             return Response({
                 "message": "Bookmark removed successfully",
                 "bookmarked": False
@@ -375,7 +601,7 @@ def toggle_bookmark(request):
     except json.JSONDecodeError:
         return Response({"error": "Invalid JSON format in request body."}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        logger.error(f"Failed to toggle bookmark: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='toggle_bookmark', error=e)
         return Response(
             {"error": "Failed to toggle bookmark", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -383,23 +609,43 @@ def toggle_bookmark(request):
 
 @api_view(['GET'])
 @add_rate_limit_headers
+@metrics.timed_view
+@conditional.etag_on_device_version
 def get_bookmarks(request):
     """Get all bookmarks for the authenticated device with optional search"""
     try:
         device_id = request.device_id  # From middleware
         query = request.GET.get('query', '').strip()
-        limit = int(request.GET.get('limit', 50))
-        offset = int(request.GET.get('offset', 0))
+        try:
+            limit = pagination.page_size(request.GET.get('limit'), default=50)
+            offset = pagination.page_offset(request.GET.get('offset'))
+        except pagination.InvalidPageParam as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = fieldsets.parse_fields(request.GET.get('fields'))
+        except fieldsets.InvalidFields as e:
+            return Response(fieldsets.error_payload(e), status=status.HTTP_400_BAD_REQUEST)
         
         # Get bookmarks for this device
-        bookmarks = VideoBookmark.objects.filter(session_id=device_id).select_related('video_analysis')
+        bookmarks = VideoBookmark.objects.filter(session_id=device_id).select_related('video_analysis__content')
+        if fields:
+            bookmarks = bookmarks.only(
+                'id', 'bookmarked_at', 'video_analysis',
+                *fieldsets.model_fields(fields, prefix='video_analysis__'),
+            )
         
         # Apply search filter if query provided
         if query:
-            bookmarks = bookmarks.filter(
-                Q(video_analysis__title__icontains=query) |
-                Q(video_analysis__highlights__icontains=query)
-            )
+            # Match only among this device's bookmarks so none are cut off
+            bookmarked = VideoBookmark.objects.filter(session_id=device_id).values('video_analysis_id')
+            matching_ids = search_index.matching_analysis_ids(device_id, query, among=bookmarked)
+            if matching_ids is not None:
+                bookmarks = bookmarks.filter(video_analysis_id__in=matching_ids)
+            else:
+                bookmarks = bookmarks.filter(
+                    Q(video_analysis__content__title__icontains=query) |
+                    Q(video_analysis__content__highlights_data__icontains=query)
+                )
         
         # Order by most recently bookmarked
         bookmarks = bookmarks.order_by('-bookmarked_at')
@@ -409,14 +655,17 @@ def get_bookmarks(request):
         bookmarks = bookmarks[offset:offset + limit]
         
         # Convert to response format
-        bookmarks_data = []
-        for bookmark in bookmarks:
-            analysis_data = bookmark.video_analysis.to_dict()
-            analysis_data['bookmark_id'] = bookmark.id
-            analysis_data['bookmarked_at'] = bookmark.bookmarked_at.isoformat()
-            bookmarks_data.append(analysis_data)
+        bookmarks = list(bookmarks)
+        bookmarks_data = fragments.render_analyses(
+            [bookmark.video_analysis for bookmark in bookmarks], fields,
+            extras=[
+                {'bookmark_id': bookmark.id, 'bookmarked_at': bookmark.bookmarked_at.isoformat()}
+                for bookmark in bookmarks
+            ],
+        )
+        video_content.mark_read([bookmark.video_analysis for bookmark in bookmarks])
         
-        logger.info(f"Retrieved {len(bookmarks_data)} bookmarks for device {device_id[:8]}... (query: '{query}')")
+        log_event(logger, events.BOOKMARKS_SERVED, device=device_id[:8], count=len(bookmarks_data), filtered=bool(query))
         
         return Response({
             'bookmarks': bookmarks_data,
@@ -425,7 +674,7 @@ def get_bookmarks(request):
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        logger.error(f"Failed to get bookmarks: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='get_bookmarks', error=e)
         return Response(
             {"error": "Failed to retrieve bookmarks", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -433,6 +682,7 @@ def get_bookmarks(request):
 
 @api_view(['DELETE'])
 @add_rate_limit_headers
+@metrics.timed_view
 def remove_bookmark(request, bookmark_id):
     """Remove a specific bookmark"""
     try:
@@ -445,7 +695,7 @@ def remove_bookmark(request, bookmark_id):
         )
         
         bookmark.delete()
-        logger.info(f"Removed bookmark {bookmark_id} for device {device_id[:8]}...")
+        log_event(logger, events.BOOKMARK_REMOVED, device=device_id[:8], bookmark_id=bookmark_id)
         
         return Response({"message": "Bookmark removed successfully"}, status=status.HTTP_200_OK)
         
@@ -454,7 +704,7 @@ def remove_bookmark(request, bookmark_id):
             "error": "Bookmark not found or not owned by this device"
         }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        logger.error(f"Failed to remove bookmark {bookmark_id}: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='remove_bookmark', bookmark_id=bookmark_id, error=e)
         return Response(
             {"error": "Failed to remove bookmark", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -462,25 +712,22 @@ def remove_bookmark(request, bookmark_id):
 
 @api_view(['GET'])
 @add_rate_limit_headers
+@metrics.timed_view
 def check_bookmark_status(request, analysis_id):
     """Check if an analysis is bookmarked by the current device"""
     try:
         device_id = request.device_id  # From middleware
         
-        # Check if bookmark exists
-        bookmark_exists = VideoBookmark.objects.filter(
+        # One indexed lookup on (session_id, video_analysis)
+        bookmark_id = VideoBookmark.objects.filter(
             session_id=device_id,
             video_analysis_id=analysis_id
-        ).exists()
+        ).values_list('id', flat=True).first()
         
-        if bookmark_exists:
-            bookmark = VideoBookmark.objects.get(
-                session_id=device_id,
-                video_analysis_id=analysis_id
-            )
+        if bookmark_id is not None:
             return Response({
                 "bookmarked": True,
-                "bookmark_id": bookmark.id
+                "bookmark_id": bookmark_id
             }, status=status.HTTP_200_OK)
         else:
             return Response({
@@ -488,8 +735,230 @@ def check_bookmark_status(request, analysis_id):
             }, status=status.HTTP_200_OK)
             
     except Exception as e:
-        logger.error(f"Failed to check bookmark status: {str(e)}")
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='check_bookmark_status', error=e)
+        return Response(
+            {"error": "Failed to check bookmark status", "details": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+# Most analysis ids accepted by the batch bookmark endpoints per request
+BULK_BOOKMARK_MAX_IDS = 500
+
+def _parse_analysis_ids(values):
+    """Validate a list of analysis ids (ints or numeric strings); raises ValueError"""
+    ids = [int(value) for value in values]
+    if len(ids) > BULK_BOOKMARK_MAX_IDS:
+        raise ValueError(f"At most {BULK_BOOKMARK_MAX_IDS} ids per request")
+    return list(dict.fromkeys(ids))
+
+def _bookmark_statuses(device_id, analysis_ids):
+    """{analysis_id: status} for many analyses in one indexed query"""
+    bookmarked = dict(
+        VideoBookmark.objects.filter(session_id=device_id, video_analysis_id__in=analysis_ids)
+        .values_list('video_analysis_id', 'id')
+    )
+    return {
+        str(analysis_id): (
+            {"bookmarked": True, "bookmark_id": bookmarked[analysis_id]}
+            if analysis_id in bookmarked else {"bookmarked": False}
+        )
+        for analysis_id in analysis_ids
+    }
+
+@api_view(['GET', 'POST'])
+@add_rate_limit_headers
+@metrics.timed_view
+def bulk_bookmark_status(request):
+    """
+    Bookmark status for many analyses at once: GET ?ids=1,2,3 or POST
+    {"analysis_ids": [...]} for long lists. Answers with one query.
+    """
+    try:
+        device_id = request.device_id  # From middleware
+        if request.method == 'POST':
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                return Response({"error": "Request body must be a JSON object."}, status=status.HTTP_400_BAD_REQUEST)
+            raw_ids = data.get('analysis_ids') or []
+        else:
+            raw_ids = [value for value in request.GET.get('ids', '').split(',') if value.strip()]
+        try:
+            analysis_ids = _parse_analysis_ids(raw_ids)
+        except (TypeError, ValueError) as e:
+            return Response({"error": "Invalid 'ids' parameter.", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            "statuses": _bookmark_statuses(device_id, analysis_ids)
+        }, status=status.HTTP_200_OK)
+        
+    except json.JSONDecodeError:
+        return Response({"error": "Invalid JSON format in request body."}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='bulk_bookmark_status', error=e)
         return Response(
             {"error": "Failed to check bookmark status", "details": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@api_view(['POST'])
+@add_rate_limit_headers
+@metrics.timed_view
+def bulk_bookmarks(request):
+    """
+    Add and/or remove many bookmarks in one transaction:
+    {"add": [analysis ids], "remove": [analysis ids]}. Ids not owned by the
+    device are reported in not_found; the final statuses are returned.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return Response({"error": "Request body must be a JSON object."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            add_ids = _parse_analysis_ids(data.get('add') or [])
+            remove_ids = _parse_analysis_ids(data.get('remove') or [])
+        except (TypeError, ValueError) as e:
+            return Response({"error": "Invalid 'add' or 'remove' list.", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not add_ids and not remove_ids:
+            return Response({"error": "Provide 'add' and/or 'remove' analysis ids."}, status=status.HTTP_400_BAD_REQUEST)
+        
+        device_id = request.device_id  # From middleware
+        with transaction.atomic():
+            # Only analyses owned by this device can be bookmarked
+            owned = set(VideoAnalysis.objects.filter(
+                device_id=device_id, id__in=add_ids + remove_ids
+            ).values_list('id', flat=True))
+            
+            existing = set(VideoBookmark.objects.filter(
+                session_id=device_id, video_analysis_id__in=add_ids
+            ).values_list('video_analysis_id', flat=True))
+            added = [analysis_id for analysis_id in add_ids if analysis_id in owned and analysis_id not in existing]
+            VideoBookmark.objects.bulk_create(
+                [VideoBookmark(session_id=device_id, video_analysis_id=analysis_id) for analysis_id in added],
+                ignore_conflicts=True,
+            )
+            if added:
+                # bulk_create skips the signals that mark the device's data as
+                # changed and log it for sync (and sets no ids with ignore_conflicts)
+                device_stats.bump_version(device_id)
+                sync.record(device_id, ChangeLogEntry.KIND_BOOKMARK, VideoBookmark.objects.filter(
+                    session_id=device_id, video_analysis_id__in=added
+                ).values_list('id', flat=True), ChangeLogEntry.OP_CREATE)
+            
+            removed_bookmarks = VideoBookmark.objects.filter(session_id=device_id, video_analysis_id__in=remove_ids)
+            bookmarked = set(removed_bookmarks.values_list('video_analysis_id', flat=True))
+            removed = [analysis_id for analysis_id in remove_ids if analysis_id in bookmarked]
+            removed_bookmarks.delete()
+        
+        log_event(logger, events.BOOKMARKS_BULK_UPDATED, device=device_id[:8], added=len(added), removed=len(removed))
+        
+        requested = list(dict.fromkeys(add_ids + remove_ids))
+        return Response({
+            "added": added,
+            "removed": removed,
+            "not_found": [analysis_id for analysis_id in requested if analysis_id not in owned],
+            "statuses": _bookmark_statuses(device_id, requested),
+        }, status=status.HTTP_200_OK)
+        
+    except json.JSONDecodeError:
+        return Response({"error": "Invalid JSON format in request body."}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='bulk_bookmarks', error=e)
+        return Response(
+            {"error": "Failed to update bookmarks", "details": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@add_rate_limit_headers
+@metrics.timed_view
+@conditional.etag_on_device_version
+def sync_changes(request):
+    """
+    Delta sync: analyses and bookmarks created, updated or deleted after
+    ?cursor= (the cursor from the previous sync). Without a cursor, or when
+    it predates compaction, full_resync is true and the response pages
+    through the complete state. Follow has_more with the returned cursor.
+    """
+    try:
+        device_id = request.device_id  # From middleware
+        cursor = request.GET.get('cursor') or '0'
+        try:
+            fields = fieldsets.parse_fields(request.GET.get('fields'))
+        except fieldsets.InvalidFields as e:
+            return Response(fieldsets.error_payload(e), status=status.HTTP_400_BAD_REQUEST)
+        
+        analyses = VideoAnalysis.objects.select_related('content')
+        if fields:
+            analyses = analyses.only(*fieldsets.model_fields(fields))
+        
+        try:
+            if sync.is_snapshot_token(cursor):
+                # Next page of a snapshot in progress
+                changes = sync.snapshot(device_id, analyses, cursor)
+            else:
+                log_cursor = int(cursor)
+                changes = sync.changes_since(device_id, log_cursor, analyses) if log_cursor > 0 else None
+                if changes is None:
+                    changes = sync.snapshot(device_id, analyses)
+        except ValueError:  # Includes pagination.InvalidCursor
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        for key in ('created', 'updated'):
+            video_content.mark_read(changes['analyses'][key])
+            changes['analyses'][key] = fragments.render_analyses(changes['analyses'][key], fields)
+        
+        log_event(logger, events.SYNC_SERVED, device=device_id[:8], cursor=cursor, full=changes['full_resync'])
+        return Response(changes, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='sync_changes', error=e)
+        return Response(
+            {"error": "Failed to sync changes", "details": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@add_rate_limit_headers
+@metrics.timed_view
+def export_history(request):
+    """
+    The device's analyses and bookmarks as NDJSON (see backup.py), streamed
+    so memory use doesn't grow with the history. Exporting doesn't count as
+    reading the analyses for cold storage.
+    """
+    device_id = request.device_id  # From middleware
+    response = StreamingHttpResponse(backup.export_lines(device_id), content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="timesaver-history.ndjson"'
+    log_event(logger, events.HISTORY_EXPORTED, device=device_id[:8])
+    return response
+
+@api_view(['POST'])
+@add_rate_limit_headers
+@metrics.timed_view
+def import_history(request):
+    """
+    Import an NDJSON export (the request body) into the device's history.
+    Videos already in the history are skipped, so retrying is safe.
+    """
+    try:
+        device_id = request.device_id  # From middleware
+        if request.stream is None:
+            return Response({"error": "Request body is empty"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            summary = backup.import_lines(device_id, backup.read_lines(request.stream))
+        except backup.InvalidImport as e:
+            return Response({"error": "Invalid history export", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        log_event(
+            logger, events.HISTORY_IMPORTED, device=device_id[:8],
+            analyses=summary['imported']['analyses'], bookmarks=summary['imported']['bookmarks'],
+            errors=summary['error_count'],
+        )
+        return Response(summary, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        log_event(logger, events.REQUEST_FAILED, level=logging.ERROR, view='import_history', error=e)
+        return Response(
+            {"error": "Failed to import history", "details": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
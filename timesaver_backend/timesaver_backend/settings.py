@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "analysis_api.compression.CompressionMiddleware",  # brotli/gzip for large bodies
     "analysis_api.middleware.DeviceAuthenticationMiddleware",  # Add device auth
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -86,10 +87,17 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Take the write lock when a transaction starts: a read-then-write
+            # transaction can't wait for it later and fails with "database is
+            # locked" under concurrent writes
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
     }
 }
 
-# Cache configuration for rate limiting
+# Cache configuration (per-process; rate limit counters live in RATE_LIMIT_BACKEND)
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -155,13 +163,127 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'events': {
+            '()': 'analysis_api.log_events.JsonEventFormatter',
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            # Records are queued and written by a background thread
+            'class': 'analysis_api.log_events.NonBlockingStreamHandler',
+            'formatter': 'events',
         },
     },
     'root': {
         'handlers': ['console'],
         'level': 'INFO',
     },
-}
\ No newline at end of file
+}
+# Runtime state shared by every worker process on this node
+RUNTIME_DIR = os.getenv('TIMESAVER_RUNTIME_DIR', os.path.join(BASE_DIR, 'var'))
+
+# Stage-level latency metrics, merged across workers at /api/metrics/
+# (scrape with "Authorization: Bearer <METRICS_ADMIN_TOKEN>"; closed while unset)
+METRICS_ADMIN_TOKEN = os.getenv('METRICS_ADMIN_TOKEN', '')
+METRICS_DIR = os.path.join(RUNTIME_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5.0  # seconds between per-worker snapshots
+METRICS_STALE_AFTER = 60.0  # snapshots not rewritten for this long belong to dead workers
+
+# On-demand request profiling: send X-Profile-Token with this token, or
+# sample a fraction of requests. Profiles rotate within PROFILING_DIR.
+PROFILING_ADMIN_TOKEN = os.getenv('PROFILING_ADMIN_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_DIR = os.path.join(RUNTIME_DIR, 'profiles')
+PROFILING_MAX_FILES = 50
+
+# Fraction of INFO/DEBUG events kept per event name (WARNING+ is never sampled)
+LOG_EVENT_SAMPLING = {
+    'device.authenticated': 0.01,
+    'rate_limit.passed': 0.01,
+    'job.polled': 0.01,
+    'job.progress': 0.05,
+}
+
+# Shared storage for rate limit counters so every worker enforces the same
+# limit. SQLite is shared by all workers on this node; set REDIS_URL (and
+# `pip install redis`) to share counters across nodes. Falls back to
+# per-process counters on errors.
+if os.getenv('REDIS_URL'):
+    RATE_LIMIT_BACKEND = {
+        'BACKEND': 'analysis_api.rate_limit_backends.RedisBackend',
+        'OPTIONS': {'url': os.getenv('REDIS_URL')},
+    }
+else:
+    RATE_LIMIT_BACKEND = {
+        'BACKEND': 'analysis_api.rate_limit_backends.SQLiteBackend',
+        'OPTIONS': {'path': os.path.join(RUNTIME_DIR, 'ratelimit.sqlite3')},
+    }
+
+# Rolling per-device work budget for /api/analyze/, charged in work units
+# (tokens sent/received, outbound fetches); cached results are free.
+# See analysis_api/quota.py for the cost table.
+WORK_QUOTA = {
+    'BUDGET': 300,
+    'WINDOW_SECONDS': 86400,
+    'COSTS': {},  # Overrides for quota.DEFAULT_COSTS
+}
+
+# API JSON goes through orjson (falls back to DRF's encoder if not installed)
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'analysis_api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'analysis_api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Responses at least this large are brotli/gzip compressed when the client
+# accepts it (brotli needs the `brotli` package). gzip runs below Django's
+# default level 6, which costs ~5x the CPU on large pages for ~5% smaller bodies.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+COMPRESSION_GZIP_LEVEL = 4
+
+# Content not read for AFTER_DAYS days has its highlights/summary compressed
+# by `manage.py compact_cold_storage`, BATCH_SIZE rows per transaction
+COLD_STORAGE = {
+    'AFTER_DAYS': 30,
+    'BATCH_SIZE': 200,
+}
+
+# `manage.py bulk_analyze` pre-warms shared content: WORKERS videos in
+# flight, results stored BATCH_SIZE at a time, and at most *_PER_MINUTE
+# YouTube requests / Gemini calls across all workers (a video takes 2-6
+# YouTube requests: metadata plus transcript probes)
+BULK_ANALYSIS = {
+    'WORKERS': 4,
+    'BATCH_SIZE': 50,
+    'FETCHES_PER_MINUTE': 60,
+    'LLM_CALLS_PER_MINUTE': 60,
+}
+
+# Local semantic search (?mode=semantic, needs `numpy`): each
+# device's embeddings live under DIR as a memory-mapped float32 matrix.
+# EMBEDDER is a dotted path to f(texts, dim) -> array, e.g. a local model;
+# changing it or DIM re-embeds on the next search. Hits scoring below
+# MIN_SCORE (cosine similarity) are left out.
+SEMANTIC_SEARCH = {
+    'DIR': os.path.join(RUNTIME_DIR, 'embeddings'),
+    'EMBEDDER': 'analysis_api.embeddings.hashed_embedding',
+    'DIM': 256,
+    'MIN_SCORE': 0.1,
+}
+
+# Local stand-ins for YouTube and Gemini, for load tests without API keys
+# or network (see analysis_api/provider_stubs.py and load_test.py). Never
+# enable in production.
+PROVIDER_STUBS = {
+    'ENABLED': os.getenv('TIMESAVER_PROVIDER_STUBS') == '1',
+    'YOUTUBE_LATENCY_MS': int(os.getenv('TIMESAVER_STUB_YOUTUBE_MS', '150')),
+    'GEMINI_LATENCY_MS': int(os.getenv('TIMESAVER_STUB_GEMINI_MS', '1500')),
+}